@@ -9,7 +9,7 @@ routines are useful specifically for dealing with the 3D code.
 """
 from typing import Union, List
 import numpy as np
-from . import bsparse
+from . import bsparse, gf2
 from scipy.sparse import csr_matrix
 
 
@@ -175,10 +175,7 @@ def get_effective_error(
     elif n_logical == 1:
         effective = np.array([effective_X, effective_Z]).T
     else:
-        effective = np.array([
-            np.concatenate([effective_X[:, i], effective_Z[:, i]])
-            for i in range(num_total_errors)
-        ])
+        effective = np.concatenate([effective_X.T, effective_Z.T], axis=1)
 
     # Flatten the array if only one total error is given.
     effective = effective.reshape(final_shape)
@@ -231,13 +228,12 @@ def gf2_rank(rows):
 
 
 def brank(matrix):
-    """Rank of a binary matrix."""
+    """Rank of a binary matrix, dense or sparse."""
 
-    matrix = bsparse.to_array(matrix)
+    if not bsparse.is_sparse(matrix):
+        matrix = np.asarray(matrix)
 
-    # Convert to list of binary numbers.
-    rows = [int(''.join(map(str, row)), 2) for row in matrix.astype(int)]
-    return gf2_rank(rows)
+    return gf2.rank(matrix)
 
 
 def apply_deformation(
@@ -50,20 +50,30 @@ def start_gui(port: Optional[int]):
 @click.option(
     '-n', '--n_runs', default=None, type=click.INT, show_default=True
 )
+@click.option(
+    '-b', '--batch_size', default=20, type=click.INT, show_default=True,
+    help='Number of trials run at once for each simulation'
+)
+@click.option(
+    '-w', '--workers', default=1, type=click.INT, show_default=True,
+    help='Number of worker processes to run the simulations'
+)
 def run(
     ctx,
     file_: Optional[str],
     trials: int,
     start: Optional[int],
     n_runs: Optional[int],
-    output_dir: Optional[str]
+    output_dir: Optional[str],
+    batch_size: int,
+    workers: int
 ):
     """Run a single job or run many jobs from input file."""
     if file_ is not None:
         run_file(
             os.path.abspath(file_), trials,
             start=start, n_runs=n_runs, progress=tqdm,
-            output_dir=output_dir
+            output_dir=output_dir, batch_size=batch_size, workers=workers
         )
     else:
         print(ctx.get_help())
@@ -3,6 +3,7 @@ List of all stabilizer codes
 """
 
 from .base._stabilizer_code import StabilizerCode  # noqa
+from .base._code_cache import get_code_cache_dir, set_code_cache_dir  # noqa
 from .surface_2d._toric_2d_code import Toric2DCode  # noqa
 from .surface_2d._planar_2d_code import Planar2DCode  # noqa
 from .surface_2d._rotated_planar_2d_code import RotatedPlanar2DCode  # noqa
@@ -23,5 +24,7 @@ __all__ = [
     "RotatedPlanar3DCode",
     "RhombicCode",
     "RotatedToric3DCode",
-    "XCubeCode"
+    "XCubeCode",
+    "get_code_cache_dir",
+    "set_code_cache_dir"
 ]
\ No newline at end of file
@@ -0,0 +1,196 @@
+"""
+Opt-in on-disk cache of the matrices of stabilizer codes.
+
+Building the stabilizer matrix and the logicals of a large lattice from the
+dictionaries returned by `get_stabilizer` can take minutes, and every job
+using the same lattice would otherwise rebuild them.
+When the environment variable `PANQEC_CODE_CACHE_DIR` points to a directory,
+the matrices are stored there as uncompressed `.npy` files, one directory per
+code, and loaded back as memory-mapped arrays by every later code with the
+same class, size and deformed axis. All the processes using the same code,
+such as the workers of a parallel run, therefore share one copy of its
+matrices in the page cache.
+
+The cache key also contains a hash of the source code of the class and its
+parents, so that entries are not reused after the lattice definition changes.
+"""
+from typing import Dict, Optional
+import os
+import hashlib
+import inspect
+import functools
+import shutil
+import tempfile
+import numpy as np
+from scipy.sparse import csr_matrix
+
+CODE_CACHE_ENV = 'PANQEC_CODE_CACHE_DIR'
+
+# Arrays stored in the directory of each code.
+_ARRAY_NAMES = [
+    'H_data', 'H_indices', 'H_indptr', 'H_shape', 'logicals_x',
+    'logicals_z', 'x_indices', 'z_indices'
+]
+
+
+def get_code_cache_dir() -> Optional[str]:
+    """Directory of the code cache, or None if the cache is disabled."""
+    cache_dir = os.getenv(CODE_CACHE_ENV)
+    if not cache_dir:
+        return None
+    return os.path.abspath(cache_dir)
+
+
+def set_code_cache_dir(cache_dir: Optional[str]):
+    """Enable the code cache in a given directory, or disable it if None.
+
+    The setting is stored in the environment, so it is inherited by the
+    worker processes of a parallel run.
+
+    Parameters
+    ----------
+    cache_dir : Optional[str]
+        Directory where the matrices are stored. It is created if it does
+        not exist yet.
+    """
+    if cache_dir is None:
+        os.environ.pop(CODE_CACHE_ENV, None)
+    else:
+        os.environ[CODE_CACHE_ENV] = os.path.abspath(cache_dir)
+
+
+@functools.lru_cache(maxsize=None)
+def get_source_hash(code_class: type) -> Optional[str]:
+    """Hash of the source code of a code class and of its parent classes.
+
+    Returns None if the source is not available, in which case the class
+    is not cached.
+    """
+    hasher = hashlib.sha256()
+    for cls in code_class.__mro__:
+        if cls is object:
+            continue
+        try:
+            hasher.update(inspect.getsource(cls).encode())
+        except (OSError, TypeError):
+            return None
+    return hasher.hexdigest()[:16]
+
+
+def get_cache_path(code) -> Optional[str]:
+    """Path of the cache directory of a code, or None if the cache is
+    disabled.
+
+    Parameters
+    ----------
+    code : StabilizerCode
+        The code whose matrices are cached.
+
+    Returns
+    -------
+    cache_path : Optional[str]
+        Path of the form
+        `{cache_dir}/{class}_{size}_{deformed_axis}_{source_hash}`.
+    """
+    cache_dir = get_code_cache_dir()
+    if cache_dir is None:
+        return None
+
+    code_class: type = type(code)
+    source_hash = get_source_hash(code_class)
+    if source_hash is None:
+        return None
+
+    size = 'x'.join(str(L) for L in code.size)
+    file_name = '{}_{}_{}_{}'.format(
+        type(code).__name__, size, code._deformed_axis, source_hash
+    )
+    return os.path.join(cache_dir, file_name)
+
+
+def load_code_matrices(cache_path: str) -> Optional[Dict]:
+    """Load the matrices of a code from the cache, as memory-mapped arrays.
+
+    Parameters
+    ----------
+    cache_path : str
+        Path of the cache directory, given by `get_cache_path`.
+
+    Returns
+    -------
+    matrices : Optional[Dict]
+        Dictionary with keys 'stabilizer_matrix', 'logicals_x',
+        'logicals_z', 'x_indices' and 'z_indices', or None if the directory
+        does not exist or cannot be read.
+    """
+    if not os.path.isdir(cache_path):
+        return None
+
+    try:
+        data = {
+            name: np.load(
+                os.path.join(cache_path, f'{name}.npy'), mmap_mode='r'
+            )
+            for name in _ARRAY_NAMES
+        }
+        stabilizer_matrix = csr_matrix(
+            (data['H_data'], data['H_indices'], data['H_indptr']),
+            shape=tuple(data['H_shape'])
+        )
+    except (OSError, ValueError):
+        return None
+
+    return {
+        'stabilizer_matrix': stabilizer_matrix,
+        'logicals_x': data['logicals_x'],
+        'logicals_z': data['logicals_z'],
+        'x_indices': data['x_indices'],
+        'z_indices': data['z_indices'],
+    }
+
+
+def save_code_matrices(cache_path: str, matrices: Dict):
+    """Save the matrices of a code to the cache.
+
+    The files are first written in a temporary directory, which is then
+    moved in place, so that concurrent jobs never read a partially written
+    entry. If another job saved the same entry in the meantime, it is kept.
+
+    Parameters
+    ----------
+    cache_path : str
+        Path of the cache directory, given by `get_cache_path`.
+    matrices : Dict
+        Dictionary with the same keys as returned by `load_code_matrices`.
+    """
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    stabilizer_matrix = matrices['stabilizer_matrix']
+    arrays = {
+        'H_data': stabilizer_matrix.data,
+        'H_indices': stabilizer_matrix.indices,
+        'H_indptr': stabilizer_matrix.indptr,
+        'H_shape': np.array(stabilizer_matrix.shape),
+        'logicals_x': matrices['logicals_x'],
+        'logicals_z': matrices['logicals_z'],
+        'x_indices': matrices['x_indices'],
+        'z_indices': matrices['z_indices'],
+    }
+    tmp_path = tempfile.mkdtemp(dir=cache_dir, suffix='.tmp')
+    try:
+        for name in _ARRAY_NAMES:
+            np.save(os.path.join(tmp_path, f'{name}.npy'), arrays[name])
+        try:
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            # The entry was either saved by another job or is corrupted.
+            if load_code_matrices(cache_path) is not None:
+                return
+            if os.path.isdir(cache_path):
+                shutil.rmtree(cache_path)
+            else:
+                os.remove(cache_path)
+            os.replace(tmp_path, cache_path)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
@@ -0,0 +1,179 @@
+"""
+Derivation of logical operators from the parity-check matrix of a code.
+
+For codes that do not supply their logical operators, a basis of logicals
+is computed with GF(2) elimination on the stabilizer matrix:
+the normalizer of the stabilizer group is the kernel of the symplectic
+product with the stabilizers, and the logicals are the normalizer elements
+independent from the stabilizers, paired so that the i-th logical X only
+anticommutes with the i-th logical Z.
+"""
+from typing import Tuple
+import numpy as np
+from scipy.sparse import csr_matrix, hstack
+
+from panqec import gf2
+
+
+def _symplectic_product(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Symplectic product modulo 2 of each row of a with each row of b."""
+    n = a.shape[1] // 2
+    a = a.astype(int)
+    b = b.astype(int)
+    return (a[:, :n].dot(b[:, n:].T) + a[:, n:].dot(b[:, :n].T)) % 2
+
+
+def symplectic_pairs(candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symplectic Gram-Schmidt on a basis of logicals modulo stabilizers.
+
+    Parameters
+    ----------
+    candidates : np.ndarray
+        Array of shape (2k, 2n) of independent logical operators in the
+        binary symplectic format. If all the X-type operators come before the
+        Z-type ones, the output logicals X and Z are of X and Z type.
+
+    Returns
+    -------
+    logicals_x : np.ndarray
+        Array of shape (k, 2n).
+    logicals_z : np.ndarray
+        Array of shape (k, 2n), such that logicals_x[i] anticommutes with
+        logicals_z[j] if and only if i == j.
+    """
+    remaining = candidates.astype(np.uint8) % 2
+    logicals_x = []
+    logicals_z = []
+
+    while len(remaining) > 0:
+        a = remaining[0]
+        products = _symplectic_product(a[None, :], remaining)[0]
+        partners = np.flatnonzero(products)
+        if len(partners) == 0:
+            raise ValueError('Candidates are not independent modulo the '
+                             'stabilizers')
+        b = remaining[partners[0]]
+        remaining = np.delete(remaining, [0, partners[0]], axis=0)
+
+        # Make the other candidates commute with both a and b.
+        with_b = _symplectic_product(remaining, b[None, :])[:, 0]
+        with_a = _symplectic_product(remaining, a[None, :])[:, 0]
+        remaining = (
+            remaining
+            + np.outer(with_b, a).astype(np.uint8)
+            + np.outer(with_a, b).astype(np.uint8)
+        ) % 2
+
+        logicals_x.append(a)
+        logicals_z.append(b)
+
+    n_cols = candidates.shape[1]
+    return (
+        np.array(logicals_x, dtype=np.uint8).reshape(-1, n_cols),
+        np.array(logicals_z, dtype=np.uint8).reshape(-1, n_cols)
+    )
+
+
+def derive_logicals(
+    stabilizer_matrix: csr_matrix, is_css: bool
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Basis of logical operators of a stabilizer code.
+
+    Parameters
+    ----------
+    stabilizer_matrix : csr_matrix
+        Parity-check matrix of shape (m, 2n) in the binary symplectic format.
+    is_css : bool
+        If True, the logical X operators only contain X and the logical Z
+        operators only contain Z.
+
+    Returns
+    -------
+    logicals_x : np.ndarray
+        Array of shape (k, 2n) and dtype uint8.
+    logicals_z : np.ndarray
+        Array of shape (k, 2n) and dtype uint8, paired with `logicals_x`.
+    """
+    H = csr_matrix(stabilizer_matrix)
+    n = H.shape[1] // 2
+    H_x = H[:, :n]
+    H_z = H[:, n:]
+
+    if is_css:
+        x_rows = H_x[H_x.getnnz(1) > 0]
+        z_rows = H_z[H_z.getnnz(1) > 0]
+
+        # X-type logicals commute with Z stabilizers and vice versa.
+        x_part = gf2.complement_basis(gf2.kernel(z_rows), x_rows)
+        z_part = gf2.complement_basis(gf2.kernel(x_rows), z_rows)
+        candidates = np.vstack([
+            np.hstack([x_part, np.zeros_like(x_part)]),
+            np.hstack([np.zeros_like(z_part), z_part]),
+        ])
+    else:
+        # Vectors v with H_x.v_z + H_z.v_x = 0.
+        normalizer = gf2.kernel(hstack([H_z, H_x], format='csr'))
+        candidates = gf2.complement_basis(normalizer, H)
+
+    return symplectic_pairs(candidates)
+
+
+def reduce_weight(
+    logicals: np.ndarray, stabilizer_matrix: csr_matrix
+) -> np.ndarray:
+    """Lower the weight of logical operators by multiplying them with
+    stabilizers, greedily, until no stabilizer reduces the weight.
+
+    This does not change the commutation relations between the logicals,
+    but it is only a heuristic and does not guarantee minimum weight.
+
+    Parameters
+    ----------
+    logicals : np.ndarray
+        Array of shape (k, 2n) of logicals in the binary symplectic format.
+    stabilizer_matrix : csr_matrix
+        Parity-check matrix of shape (m, 2n).
+
+    Returns
+    -------
+    reduced : np.ndarray
+        Array of shape (k, 2n) and dtype uint8 of equivalent logicals.
+    """
+    H = csr_matrix(stabilizer_matrix)
+    n = H.shape[1] // 2
+
+    # Pauli of each stabilizer on each qubit, encoded as x + 2z.
+    paulis = csr_matrix(
+        H[:, :n].astype(np.int8) + 2*H[:, n:].astype(np.int8)
+    )
+    paulis.eliminate_zeros()
+    rows = np.repeat(np.arange(H.shape[0]), np.diff(paulis.indptr))
+
+    reduced = np.zeros((len(logicals), 2*n), dtype=np.uint8)
+    for i_logical, logical in enumerate(logicals):
+        codes = (logical[:n] + 2*logical[n:]).astype(np.int8)
+        while True:
+            on_support = codes[paulis.indices]
+            change = (
+                ((on_support ^ paulis.data) != 0).astype(int)
+                - (on_support != 0)
+            )
+            gains = np.bincount(rows, weights=change, minlength=H.shape[0])
+            improving = np.flatnonzero(gains < 0)
+            if len(improving) == 0:
+                break
+
+            # Apply the improving stabilizers with disjoint supports, starting
+            # from the largest improvement.
+            touched = np.zeros(n, dtype=bool)
+            for row in improving[np.argsort(gains[improving])]:
+                start, stop = paulis.indptr[row], paulis.indptr[row + 1]
+                qubits = paulis.indices[start:stop]
+                if not np.any(touched[qubits]):
+                    codes[qubits] ^= paulis.data[start:stop]
+                    touched[qubits] = True
+
+        reduced[i_logical, :n] = codes & 1
+        reduced[i_logical, n:] = codes >> 1
+
+    return reduced
@@ -1,4 +1,4 @@
-from typing import Dict, Tuple, Optional, List
+from typing import Dict, Tuple, Optional, List, Union
 import os
 from abc import ABCMeta, abstractmethod
 import numpy as np
@@ -8,6 +8,14 @@ from scipy.sparse import csr_matrix, dok_matrix
 import panqec
 from panqec.bpauli import bcommute, get_effective_error
 from panqec import bsparse
+from ._code_cache import (
+    get_cache_path, load_code_matrices, save_code_matrices
+)
+from ._logicals import derive_logicals, reduce_weight
+from ._stencil import (
+    Stencil, array_to_coordinates, coordinates_to_array,
+    build_coordinate_grid, lookup_grid, build_stencil_matrix
+)
 
 os.environ['PANQEC_ROOT_DIR'] = os.path.dirname(panqec.__file__)
 
@@ -29,12 +37,29 @@ class StabilizerCode(metaclass=ABCMeta):
     Using only those methods, a StabilizerCode will then automatically create
     the corresponding parity-check matrix (in self.stabilizers) and can be used
     to make a visualization in the GUI or calculate thresholds.
+
+    For large lattices, a subclass can also implement the optional array
+    protocol:
+    - get_qubit_coordinates() and get_stabilizer_coordinates() can return
+      (N, d) integer arrays instead of lists of tuples
+    - get_stencils() can describe the stabilizers as families sharing the
+      same offsets to their qubits, and `periods` can give the periods of the
+      lattice for periodic boundary conditions.
+    The parity-check matrix is then assembled with NumPy index arithmetic
+    instead of calling get_stabilizer() on every stabilizer.
+
+    Codes that do not override get_logicals_x() and get_logicals_z() get a
+    basis of logicals computed from the parity-check matrix (see
+    `derive_logicals`), whose weight is greedily reduced if the class
+    attribute `min_weight_logicals` is True.
     """
 
     X_AXIS = 0
     Y_AXIS = 1
     Z_AXIS = 2
 
+    min_weight_logicals: bool = True
+
     def __init__(
         self, L_x: int,
         L_y: Optional[int] = None,
@@ -75,6 +100,10 @@ class StabilizerCode(metaclass=ABCMeta):
 
         self._qubit_coordinates: List = []
         self._stabilizer_coordinates: List[Tuple] = []
+        self._qubit_array: Optional[np.ndarray] = None
+        self._qubit_grid: Optional[np.ndarray] = None
+        self._stabilizer_grids: Optional[Dict[int, np.ndarray]] = None
+        self._stabilizer_type_codes: Optional[np.ndarray] = None
 
         self._qubit_index: Dict[Tuple, int] = {}
         self._stabilizer_index: Dict[Tuple, int] = {}
@@ -89,6 +118,7 @@ class StabilizerCode(metaclass=ABCMeta):
         self._z_indices: Optional[np.ndarray] = None
         self._d: Optional[int] = None
         self._stabilizer_types: Optional[List[str]] = None
+        self._cache_checked = False
 
         self.colormap = {'red': '0xFF4B3E',
                          'blue': '0x48BEFF',
@@ -102,6 +132,38 @@ class StabilizerCode(metaclass=ABCMeta):
                          'light-orange': '0xFA824C',
                          'orange': '0xfa7921'}
 
+    def __getstate__(self) -> dict:
+        """Only pickle the size and deformed axis of the code, and its
+        matrices if they cannot be loaded back from the code cache.
+
+        With the code cache enabled, the matrices are saved to it before
+        pickling, so that the processes unpickling the code load them from
+        the same file instead of receiving a copy. Otherwise, the matrices
+        already built are pickled, since building them again is slower.
+        """
+        state = {'size': self._size, 'deformed_axis': self._deformed_axis}
+        if get_cache_path(self) is not None:
+            self._load_from_cache()
+            return state
+
+        if not bsparse.is_empty(self._stabilizer_matrix):
+            state['stabilizer_matrix'] = self._stabilizer_matrix
+        for key in ['logicals_x', 'logicals_z', 'x_indices', 'z_indices']:
+            if getattr(self, f'_{key}') is not None:
+                state[key] = getattr(self, f'_{key}')
+        return state
+
+    def __setstate__(self, state: dict):
+        L_x, L_y, L_z = tuple(state['size']) + (None,)*(3 - len(state['size']))
+        type(self).__init__(
+            self, L_x, L_y, L_z, deformed_axis=state['deformed_axis']
+        )
+        if 'stabilizer_matrix' in state:
+            self._stabilizer_matrix = state['stabilizer_matrix']
+        for key in ['logicals_x', 'logicals_z', 'x_indices', 'z_indices']:
+            if key in state:
+                setattr(self, f'_{key}', state[key])
+
     @property
     @abstractmethod
     def dimension(self) -> int:
@@ -156,7 +218,11 @@ class StabilizerCode(metaclass=ABCMeta):
         """List of all the coordinates that contain a qubit"""
 
         if len(self._qubit_coordinates) == 0:
-            self._qubit_coordinates = self.get_qubit_coordinates()
+            coordinates = self.get_qubit_coordinates()
+            if isinstance(coordinates, np.ndarray):
+                self._qubit_array = coordinates
+                coordinates = array_to_coordinates(coordinates)
+            self._qubit_coordinates = coordinates
 
         return self._qubit_coordinates
 
@@ -165,7 +231,10 @@ class StabilizerCode(metaclass=ABCMeta):
         """List of all the coordinates that contain a stabilizer"""
 
         if len(self._stabilizer_coordinates) == 0:
-            self._stabilizer_coordinates = self.get_stabilizer_coordinates()
+            coordinates = self.get_stabilizer_coordinates()
+            if isinstance(coordinates, np.ndarray):
+                coordinates = array_to_coordinates(coordinates)
+            self._stabilizer_coordinates = coordinates
 
         return self._stabilizer_coordinates
 
@@ -191,10 +260,101 @@ class StabilizerCode(metaclass=ABCMeta):
 
         return self._stabilizer_index
 
+    @property
+    def qubit_grid(self) -> np.ndarray:
+        """Dense array indexed by lattice coordinates, giving the index of
+        the qubit at each site, or -1 if there is no qubit.
+        Lattice coordinates are assumed to be non-negative integers."""
+
+        if self._qubit_grid is None:
+            if self._qubit_array is None:
+                self._qubit_array = coordinates_to_array(
+                    self.qubit_coordinates
+                )
+            self._qubit_grid = build_coordinate_grid(self._qubit_array)
+
+        return self._qubit_grid
+
+    @property
+    def stabilizer_grids(self) -> Dict[int, np.ndarray]:
+        """Dense arrays indexed by stabilizer coordinates, giving the index
+        of the stabilizer at each site, or -1 if there is no stabilizer.
+        There is one array per length of coordinates, since some codes mix
+        locations such as (x, y, z) for cubes and (axis, x, y, z) for faces.
+        """
+
+        if self._stabilizer_grids is None:
+            coordinates_by_length: Dict[int, List] = dict()
+            for i, location in enumerate(self.stabilizer_coordinates):
+                coordinates_by_length.setdefault(len(location), []).append(
+                    (i, location)
+                )
+            self._stabilizer_grids = dict()
+            for length, entries in coordinates_by_length.items():
+                indices, coordinates = zip(*entries)
+                self._stabilizer_grids[length] = build_coordinate_grid(
+                    coordinates_to_array(coordinates), np.array(indices)
+                )
+
+        return self._stabilizer_grids
+
+    def qubit_indices(self, locations: np.ndarray) -> np.ndarray:
+        """Vectorized version of `qubit_index`.
+
+        Parameters
+        ----------
+        locations: np.ndarray
+            Integer array of shape (..., d) of qubit coordinates.
+
+        Returns
+        -------
+        indices: np.ndarray
+            Array of shape (...) with the index of each qubit, or -1 for the
+            locations that do not contain a qubit.
+        """
+        return lookup_grid(self.qubit_grid, locations)
+
+    def stabilizer_indices(self, locations: np.ndarray) -> np.ndarray:
+        """Vectorized version of `stabilizer_index`.
+
+        Parameters
+        ----------
+        locations: np.ndarray
+            Integer array of shape (..., D) of stabilizer coordinates.
+
+        Returns
+        -------
+        indices: np.ndarray
+            Array of shape (...) with the index of each stabilizer, or -1 for
+            the locations that do not contain a stabilizer.
+        """
+        locations = np.asarray(locations)
+        grid = self.stabilizer_grids.get(locations.shape[-1])
+        if grid is None:
+            return -np.ones(locations.shape[:-1], dtype=np.int32)
+        return lookup_grid(grid, locations)
+
+    @property
+    def stabilizer_type_codes(self) -> np.ndarray:
+        """Type of each stabilizer, as an array of indices in
+        `stabilizer_types`."""
+
+        if self._stabilizer_type_codes is None:
+            type_codes = {
+                stab_type: code
+                for code, stab_type in enumerate(self.stabilizer_types)
+            }
+            self._stabilizer_type_codes = np.array([
+                type_codes[self.stabilizer_type(location)]
+                for location in self.stabilizer_coordinates
+            ], dtype=np.int8)
+
+        return self._stabilizer_type_codes
+
     @property
     def n_stabilizers(self) -> int:
         """Number of stabilizer generators"""
-        return len(self.stabilizer_index)
+        return len(self.stabilizer_coordinates)
 
     @property
     def logicals_x(self) -> np.ndarray:
@@ -202,14 +362,19 @@ class StabilizerCode(metaclass=ABCMeta):
         symplectic format, where k is the number of logical X operators,
         and n the number of qubits.
         """
-        if self._logicals_x is None:
+        if self._logicals_x is None and not self._load_from_cache():
             logical_ops = self.get_logicals_x()
+            if logical_ops is None:
+                self._logicals_x, self._logicals_z = self.derive_logicals()
+                return self._logicals_x
+
             k = len(logical_ops)
             self._logicals_x = np.zeros((k, 2*self.n), dtype='uint8')
 
             for i, logical_op in enumerate(logical_ops):
                 self._logicals_x[i] = self.to_bsf(logical_op)
 
+        assert self._logicals_x is not None
         return self._logicals_x
 
     @property
@@ -218,14 +383,19 @@ class StabilizerCode(metaclass=ABCMeta):
         It is a sparse matrix of dimension k x 2n, where k is the number
         of Z logicals and n the number of qubits.
         """
-        if self._logicals_z is None:
+        if self._logicals_z is None and not self._load_from_cache():
             logical_ops = self.get_logicals_z()
+            if logical_ops is None:
+                self._logicals_x, self._logicals_z = self.derive_logicals()
+                return self._logicals_z
+
             k = len(logical_ops)
             self._logicals_z = np.zeros((k, 2*self.n), dtype='uint8')
 
             for i, logical_op in enumerate(logical_ops):
                 self._logicals_z[i] = self.to_bsf(logical_op)
 
+        assert self._logicals_z is not None
         return self._logicals_z
 
     @property
@@ -247,39 +417,83 @@ class StabilizerCode(metaclass=ABCMeta):
         of stabilizers and n the number of qubits
         """
 
-        if bsparse.is_empty(self._stabilizer_matrix):
-            sparse_dict: Dict = dict()
-            self._stabilizer_matrix = dok_matrix(
-                (self.n_stabilizers, 2*self.n),
-                dtype='uint8'
-            )
+        if (
+            bsparse.is_empty(self._stabilizer_matrix)
+            and not self._load_from_cache()
+        ):
+            stencils = self.get_stencils()
+            if stencils is None:
+                self._stabilizer_matrix = self._build_stabilizer_matrix()
+            else:
+                self._stabilizer_matrix = self._build_stencil_matrix(stencils)
 
-            for i_stab, stabilizer_location in enumerate(
-                self.stabilizer_coordinates
-            ):
-                stabilizer_op = self.get_stabilizer(
-                    stabilizer_location, deformed_axis=self._deformed_axis
-                )
+        return self._stabilizer_matrix
 
-                for qubit_location in stabilizer_op.keys():
-                    if stabilizer_op[qubit_location] in ['X', 'Y']:
-                        i_qubit = self.qubit_index[qubit_location]
-                        if (i_stab, i_qubit) in sparse_dict.keys():
-                            sparse_dict[(i_stab, i_qubit)] += 1
-                        else:
-                            sparse_dict[(i_stab, i_qubit)] = 1
-                    if stabilizer_op[qubit_location] in ['Y', 'Z']:
-                        i_qubit = self.n + self.qubit_index[qubit_location]
-                        if (i_stab, i_qubit) in sparse_dict.keys():
-                            sparse_dict[(i_stab, i_qubit)] += 1
-                        else:
-                            sparse_dict[(i_stab, i_qubit)] = 1
-
-            self._stabilizer_matrix._update(sparse_dict)
-            self._stabilizer_matrix = self._stabilizer_matrix.tocsr()
-            self._stabilizer_matrix.data %= 2
+    def _build_stabilizer_matrix(self) -> csr_matrix:
+        """Parity-check matrix built from the dictionaries returned by
+        `get_stabilizer` for each stabilizer location."""
+        sparse_dict: Dict = dict()
+        stabilizer_matrix = dok_matrix(
+            (self.n_stabilizers, 2*self.n),
+            dtype='uint8'
+        )
 
-        return self._stabilizer_matrix
+        for i_stab, stabilizer_location in enumerate(
+            self.stabilizer_coordinates
+        ):
+            stabilizer_op = self.get_stabilizer(
+                stabilizer_location, deformed_axis=self._deformed_axis
+            )
+
+            for qubit_location in stabilizer_op.keys():
+                if stabilizer_op[qubit_location] in ['X', 'Y']:
+                    i_qubit = self.qubit_index[qubit_location]
+                    if (i_stab, i_qubit) in sparse_dict.keys():
+                        sparse_dict[(i_stab, i_qubit)] += 1
+                    else:
+                        sparse_dict[(i_stab, i_qubit)] = 1
+                if stabilizer_op[qubit_location] in ['Y', 'Z']:
+                    i_qubit = self.n + self.qubit_index[qubit_location]
+                    if (i_stab, i_qubit) in sparse_dict.keys():
+                        sparse_dict[(i_stab, i_qubit)] += 1
+                    else:
+                        sparse_dict[(i_stab, i_qubit)] = 1
+
+        stabilizer_matrix._update(sparse_dict)
+        stabilizer_matrix = stabilizer_matrix.tocsr()
+        stabilizer_matrix.data %= 2
+
+        return stabilizer_matrix
+
+    def _build_stencil_matrix(self, stencils: List[Stencil]) -> csr_matrix:
+        """Parity-check matrix assembled from the stencils of the array
+        protocol (see `get_stencils`)."""
+        stabilizer_rows = [
+            self.stabilizer_indices(locations) for locations, _, _ in stencils
+        ]
+        all_rows = np.concatenate(stabilizer_rows)
+        if (
+            np.any(all_rows < 0)
+            or len(np.unique(all_rows)) != self.n_stabilizers
+            or len(all_rows) != self.n_stabilizers
+        ):
+            raise ValueError(
+                f'The stencils of {self.id} do not cover each stabilizer '
+                'exactly once'
+            )
+
+        deformed_qubits = None
+        if self._deformed_axis is not None:
+            deformed_qubits = np.array([
+                self.qubit_axis(location) == self._deformed_axis
+                for location in self.qubit_coordinates
+            ], dtype=bool)
+
+        return build_stencil_matrix(
+            stencils, stabilizer_rows, self.qubit_grid,
+            self.n_stabilizers, self.n,
+            periods=self.periods, deformed_qubits=deformed_qubits
+        )
 
     @property
     def size(self) -> Tuple:
@@ -326,10 +540,11 @@ class StabilizerCode(metaclass=ABCMeta):
         as a boolean array s.t. x_indices[i] is True if stabilizer H[i]
         only contain X operators and False otherwise"""
 
-        if self._x_indices is None:
+        if self._x_indices is None and not self._load_from_cache():
             Hx = self.stabilizer_matrix[:, :self.n]
             self._x_indices = (Hx.getnnz(1) > 0)
 
+        assert self._x_indices is not None
         return self._x_indices
 
     @property
@@ -338,12 +553,122 @@ class StabilizerCode(metaclass=ABCMeta):
         as a boolean array s.t. z_indices[i] is True if stabilizer H[i]
         only contain Z operators and False otherwise"""
 
-        if self._z_indices is None:
+        if self._z_indices is None and not self._load_from_cache():
             Hz = self.stabilizer_matrix[:, self.n:]
             self._z_indices = (Hz.getnnz(1) > 0)
 
+        assert self._z_indices is not None
         return self._z_indices
 
+    @property
+    def periods(self) -> Optional[Tuple[int, ...]]:
+        """Periods of the lattice coordinates along each axis, for codes with
+        periodic boundary conditions, or None otherwise.
+        Used by the array protocol to wrap the stencils around the lattice.
+        """
+        return None
+
+    def get_stencils(self) -> Optional[List[Stencil]]:
+        """Optional array protocol to build the parity-check matrix without
+        calling `get_stabilizer` on every stabilizer.
+
+        Each stencil is a tuple `(locations, offsets, pauli)`, where
+        `locations` is an (m, D) integer array of stabilizer coordinates,
+        `offsets` is an (s, d) integer array of the offsets from the last d
+        coordinates of each location to the qubits in its support, and
+        `pauli` is the Pauli ('X', 'Y' or 'Z') applied on those qubits before
+        any Clifford deformation.
+        Offsets landing outside the lattice or on a site without a qubit are
+        ignored, and each stabilizer must belong to exactly one stencil.
+
+        Returns
+        -------
+        stencils: Optional[List[Stencil]]
+            List of stencils, or None (default) to build the stabilizers from
+            `get_stabilizer`.
+        """
+        return None
+
+    def _load_from_cache(self) -> bool:
+        """Load the stabilizer matrix, the logicals and the X/Z indices
+        from the on-disk code cache, if it is enabled (see `_code_cache`).
+
+        On a cache miss, all of them are built and saved, so that later jobs
+        using the same lattice can load them.
+        The cache is only looked up once per code instance, from the first
+        call with the cache enabled.
+
+        Returns
+        -------
+        loaded : bool
+            Whether the matrices have been filled by this call.
+        """
+        if self._cache_checked:
+            return False
+
+        cache_path = get_cache_path(self)
+        if cache_path is None:
+            return False
+        self._cache_checked = True
+
+        matrices = load_code_matrices(cache_path)
+        if matrices is None:
+            matrices = {
+                'stabilizer_matrix': self.stabilizer_matrix,
+                'logicals_x': self.logicals_x,
+                'logicals_z': self.logicals_z,
+                'x_indices': self.x_indices,
+                'z_indices': self.z_indices,
+            }
+            save_code_matrices(cache_path, matrices)
+        else:
+            self._stabilizer_matrix = matrices['stabilizer_matrix']
+            self._logicals_x = matrices['logicals_x']
+            self._logicals_z = matrices['logicals_z']
+            self._x_indices = matrices['x_indices']
+            self._z_indices = matrices['z_indices']
+
+        return True
+
+    def derive_logicals(
+        self, min_weight: Optional[bool] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Compute a basis of logical operators from the parity-check
+        matrix, with GF(2) elimination.
+
+        The i-th logical X only anticommutes with the i-th logical Z, and
+        for CSS codes the logical X (resp. Z) operators only contain X
+        (resp. Z).
+
+        Parameters
+        ----------
+        min_weight: bool, optional
+            Whether to greedily reduce the weight of the logicals by
+            multiplying them with stabilizers. Defaults to the class
+            attribute `min_weight_logicals`.
+
+        Returns
+        -------
+        logicals_x: np.ndarray
+            Logical X operators, as a k x 2n array in the binary symplectic
+            format.
+        logicals_z: np.ndarray
+            Logical Z operators, as a k x 2n array in the binary symplectic
+            format.
+        """
+        if min_weight is None:
+            min_weight = self.min_weight_logicals
+
+        logicals_x, logicals_z = derive_logicals(
+            self.stabilizer_matrix, self.is_css
+        )
+
+        if min_weight:
+            logicals_x = reduce_weight(logicals_x, self.stabilizer_matrix)
+            logicals_z = reduce_weight(logicals_z, self.stabilizer_matrix)
+
+        return logicals_x, logicals_z
+
     def in_codespace(self, error: np.ndarray) -> bool:
         """Check whether or not a given error is in the codespace,
         i.e. whether it has a zero syndrome or not.
@@ -458,12 +783,17 @@ class StabilizerCode(metaclass=ABCMeta):
             (where n is the number of qubits)
         """
         bsf_operator = np.zeros(2*self.n, dtype=np.uint)
+        if len(operator) == 0:
+            return bsf_operator
+
+        locations = list(operator.keys())
+        paulis = np.array(list(operator.values()))
+        indices = self.qubit_indices(coordinates_to_array(locations))
+        if np.any(indices < 0):
+            raise KeyError(locations[np.flatnonzero(indices < 0)[0]])
 
-        for qubit_location in operator.keys():
-            if operator[qubit_location] in ['X', 'Y']:
-                bsf_operator[self.qubit_index[qubit_location]] += 1
-            if operator[qubit_location] in ['Y', 'Z']:
-                bsf_operator[self.n + self.qubit_index[qubit_location]] += 1
+        bsf_operator[indices[(paulis == 'X') | (paulis == 'Y')]] = 1
+        bsf_operator[self.n + indices[(paulis == 'Y') | (paulis == 'Z')]] = 1
 
         return bsf_operator
 
@@ -514,27 +844,39 @@ class StabilizerCode(metaclass=ABCMeta):
         ----------
         error: np.ndarray
             Error given as an array of dimension 2n in the binary
-            symplectic format.
+            symplectic format, or a batch of errors given as an array
+            of shape (n_shots, 2n).
 
         Returns
         -------
         syndrome: np.ndarray
             Syndrome, as an array of dimension m (where m is the number
-            of stabilizers)
+            of stabilizers), or of shape (n_shots, m) for a batch of errors.
         """
 
+        if len(error.shape) == 2:
+            # One sparse product for the whole batch.
+            H = self.stabilizer_matrix
+            syndromes = (
+                H[:, :self.n].dot(error[:, self.n:].T)
+                + H[:, self.n:].dot(error[:, :self.n].T)
+            ) % 2
+            return np.asarray(syndromes.T, dtype='uint8')
+
         return bcommute(self.stabilizer_matrix, error)
 
     def is_stabilizer(self, location: Tuple, stab_type: str = None):
         """Returns whether a given location in the coordinate system
         corresponds to a stabilizer or not
         """
-        _is_stabilizer = (
-            (location in self.stabilizer_index) and
-            (stab_type is None or self.stabilizer_type(location) == stab_type)
-        )
+        index = self.stabilizer_index.get(location)
+        if index is None:
+            return False
+        if stab_type is None:
+            return True
 
-        return _is_stabilizer
+        type_code = self.stabilizer_type_codes[index]
+        return self.stabilizer_types[type_code] == stab_type
 
     def is_qubit(self, location: Tuple):
         """Returns whether a given location in the coordinate system
@@ -554,7 +896,7 @@ class StabilizerCode(metaclass=ABCMeta):
         return location in self.qubit_index
 
     @abstractmethod
-    def get_qubit_coordinates(self) -> List[Tuple]:
+    def get_qubit_coordinates(self) -> Union[List[Tuple], np.ndarray]:
         """Give the list of all the qubit coordinates, in a coordinate system
         that should contain both the qubits and the stabilizers.
         This function is used to set the attributes `self.qubit_coordinates`
@@ -562,16 +904,18 @@ class StabilizerCode(metaclass=ABCMeta):
 
         Returns
         -------
-        qubit_coordinates: List[Tuple]
-            List of coordinates
+        qubit_coordinates: Union[List[Tuple], np.ndarray]
+            List of coordinates, or (n, d) integer array of coordinates
         """
 
     @abstractmethod
-    def get_stabilizer_coordinates(self) -> List[Tuple]:
+    def get_stabilizer_coordinates(self) -> Union[List[Tuple], np.ndarray]:
         """Create list of stabilizer coordinates, in a coordinate system
         that should contain both the qubits and the stabilizers.
         This function is used to set the attributes
         `self.stabilizer_coordinates` and `self.stabilizer_index`.
+        The coordinates can also be given as an (m, d) integer array when
+        they all have the same length.
         """
 
     @abstractmethod
@@ -633,8 +977,7 @@ class StabilizerCode(metaclass=ABCMeta):
             qubit location in the support of the stabilizer
         """
 
-    @abstractmethod
-    def get_logicals_x(self) -> List[Operator]:
+    def get_logicals_x(self) -> Optional[List[Operator]]:
         """Returns the list of logical X operators, where each operator is a
         dictionary that assigns a Pauli operator ('X', 'Y' or 'Z') to each
         qubit location in its support.
@@ -644,11 +987,12 @@ class StabilizerCode(metaclass=ABCMeta):
         logicals: List[Dict[Tuple, str]]
             List of dictionaries, where each dictionary assign a Pauli
             operator ('X', 'Y' or 'Z') to each qubit location in the support
-            of the logical operator.
+            of the logical operator, or None (default) to compute them from
+            the parity-check matrix with `derive_logicals`.
         """
+        return None
 
-    @abstractmethod
-    def get_logicals_z(self) -> List[Operator]:
+    def get_logicals_z(self) -> Optional[List[Operator]]:
         """Returns the list of logical Z operators, where each operator is a
         dictionary that assigns a Pauli operator ('X', 'Y' or 'Z') to each
         qubit location in its support.
@@ -658,8 +1002,10 @@ class StabilizerCode(metaclass=ABCMeta):
         logicals: List[Dict[Tuple, str]]
             List of dictionaries, where each dictionary assign a Pauli
             operator ('X', 'Y' or 'Z') to each qubit location in the support
-            of the logical operator.
+            of the logical operator, or None (default) to compute them from
+            the parity-check matrix with `derive_logicals`.
         """
+        return None
 
     def stabilizer_representation(self,
                                   location: Tuple,
@@ -783,16 +1129,23 @@ class StabilizerCode(metaclass=ABCMeta):
             Dictionary of qubit indices for each stabilizer location that
             matches the given type.
         """
+        if stab_type not in self.stabilizer_types:
+            return dict()
+
+        type_code = self.stabilizer_types.index(stab_type)
+        indices = np.flatnonzero(self.stabilizer_type_codes == type_code)
+
         return {
-            location: index
-            for index, location in enumerate(self.stabilizer_coordinates)
-            if self.stabilizer_type(location) == stab_type
+            self.stabilizer_coordinates[index]: int(index)
+            for index in indices
         }
 
     @property
     def stabilizer_types(self):
+        """List of the different stabilizer types, in order of first
+        appearance in the stabilizer coordinates."""
         if self._stabilizer_types is None:
-            self._stabilizer_types = list(set(
+            self._stabilizer_types = list(dict.fromkeys(
                 self.stabilizer_type(location)
                 for location in self.stabilizer_coordinates
             ))
@@ -0,0 +1,184 @@
+"""
+Array-based construction of the parity-check matrix of a stabilizer code.
+
+Instead of building each stabilizer as a dictionary with `get_stabilizer`,
+a code can describe its stabilizers as stencils, i.e. families of
+stabilizers that share the same set of offsets to their qubits.
+The parity-check matrix is then assembled for a whole family at once with
+NumPy index arithmetic, using a dense grid that maps lattice coordinates to
+qubit indices.
+"""
+from typing import Tuple, List, Optional, Sequence
+import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix
+
+# (locations, offsets, pauli) where locations is an (m, D) array of
+# stabilizer coordinates, offsets an (s, d) array of qubit offsets relative to
+# the last d coordinates of each location, and pauli is 'X', 'Y' or 'Z'.
+Stencil = Tuple[np.ndarray, np.ndarray, str]
+
+
+def lattice_points(*ranges: range) -> np.ndarray:
+    """All the points of the product of the given ranges, in the same order
+    as `itertools.product`.
+
+    Parameters
+    ----------
+    *ranges : range
+        One range per coordinate.
+
+    Returns
+    -------
+    points : np.ndarray
+        Integer array of shape (N, len(ranges)).
+    """
+    grids = np.meshgrid(*[np.arange(r.start, r.stop, r.step) for r in ranges],
+                        indexing='ij')
+    return np.stack([grid.ravel() for grid in grids], axis=1)
+
+
+def coordinates_to_array(coordinates: Sequence[Tuple]) -> np.ndarray:
+    """Convert a list of coordinate tuples with the same length into an
+    (N, d) integer array."""
+    return np.array(coordinates, dtype=int).reshape(len(coordinates), -1)
+
+
+def array_to_coordinates(array: np.ndarray) -> List[Tuple]:
+    """Convert an (N, d) integer array into a list of coordinate tuples."""
+    return list(map(tuple, np.asarray(array).tolist()))
+
+
+def build_coordinate_grid(
+    coordinates: np.ndarray, indices: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Dense grid indexed by lattice coordinates, giving the index of each
+    coordinate and -1 for the empty sites.
+
+    Parameters
+    ----------
+    coordinates : np.ndarray
+        Non-negative integer array of shape (N, d).
+    indices : np.ndarray, optional
+        Index to store at each coordinate. By default, the row number of the
+        coordinate in `coordinates`.
+
+    Returns
+    -------
+    grid : np.ndarray
+        Array of dimension d and dtype int32, whose shape is one more than
+        the largest coordinate along each axis.
+    """
+    if indices is None:
+        indices = np.arange(len(coordinates))
+    shape = tuple(np.max(coordinates, axis=0) + 1)
+    grid = -np.ones(shape, dtype=np.int32)
+    grid[tuple(coordinates.T)] = indices
+    return grid
+
+
+def lookup_grid(grid: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Indices of an array of points in a coordinate grid.
+
+    Parameters
+    ----------
+    grid : np.ndarray
+        Grid built by `build_coordinate_grid`.
+    points : np.ndarray
+        Integer array of shape (..., d).
+
+    Returns
+    -------
+    indices : np.ndarray
+        Array of shape (...) with the index of each point, or -1 if it is
+        not in the grid.
+    """
+    points = np.asarray(points)
+    if points.shape[-1] != grid.ndim:
+        return -np.ones(points.shape[:-1], dtype=np.int32)
+    inside = np.all((points >= 0) & (points < grid.shape), axis=-1)
+    indices = -np.ones(points.shape[:-1], dtype=np.int32)
+    indices[inside] = grid[tuple(points[inside].T)]
+    return indices
+
+
+def build_stencil_matrix(
+    stencils: List[Stencil],
+    stabilizer_rows: List[np.ndarray],
+    qubit_grid: np.ndarray,
+    n_stabilizers: int,
+    n_qubits: int,
+    periods: Optional[Tuple[int, ...]] = None,
+    deformed_qubits: Optional[np.ndarray] = None
+) -> csr_matrix:
+    """Assemble the parity-check matrix in the binary symplectic format from
+    a list of stencils.
+
+    Offsets that point outside the lattice or to a site without a qubit are
+    ignored, and each qubit appears at most once in each stabilizer, as in
+    the dictionary-based construction.
+
+    Parameters
+    ----------
+    stencils : List[Stencil]
+        Stencils covering all the stabilizers of the code.
+    stabilizer_rows : List[np.ndarray]
+        Row of the parity-check matrix of each stabilizer, one array per
+        stencil.
+    qubit_grid : np.ndarray
+        Grid mapping qubit coordinates to qubit indices.
+    n_stabilizers : int
+        Number of rows of the matrix.
+    n_qubits : int
+        Number of qubits, the matrix having 2*n_qubits columns.
+    periods : Tuple[int, ...], optional
+        If given, the qubit coordinates are taken modulo these periods.
+    deformed_qubits : np.ndarray, optional
+        Boolean array of size n_qubits, True for the qubits on which the
+        Paulis X and Z are swapped (Clifford deformation).
+
+    Returns
+    -------
+    stabilizer_matrix : csr_matrix
+        Sparse matrix of shape (n_stabilizers, 2*n_qubits) and dtype uint8.
+    """
+    all_rows = []
+    all_cols = []
+    for (locations, offsets, pauli), rows in zip(stencils, stabilizer_rows):
+        offsets = np.asarray(offsets)
+        d = offsets.shape[1]
+        centers = np.asarray(locations)[:, -d:]
+
+        support = centers[:, None, :] + offsets[None, :, :]
+        if periods is not None:
+            support = support % np.array(periods)
+
+        qubits = lookup_grid(qubit_grid, support)
+        rows = np.broadcast_to(np.asarray(rows)[:, None], qubits.shape)
+        is_qubit = qubits >= 0
+        qubits = qubits[is_qubit]
+        rows = rows[is_qubit]
+
+        has_x = np.full(len(qubits), pauli in ('X', 'Y'))
+        has_z = np.full(len(qubits), pauli in ('Y', 'Z'))
+        if deformed_qubits is not None and pauli != 'Y':
+            deformed = deformed_qubits[qubits]
+            has_x ^= deformed
+            has_z ^= deformed
+
+        all_rows += [rows[has_x], rows[has_z]]
+        all_cols += [qubits[has_x], n_qubits + qubits[has_z]]
+
+    rows = np.concatenate(all_rows).astype(np.int64)
+    cols = np.concatenate(all_cols).astype(np.int64)
+
+    # On small periodic lattices, two offsets can wrap to the same qubit,
+    # which appears only once in the dictionary of `get_stabilizer`.
+    entries = np.unique(rows*2*n_qubits + cols)
+    rows, cols = np.divmod(entries, 2*n_qubits)
+
+    stabilizer_matrix = coo_matrix(
+        (np.ones(len(rows), dtype='uint8'), (rows, cols)),
+        shape=(n_stabilizers, 2*n_qubits)
+    ).tocsr()
+
+    return stabilizer_matrix
@@ -1,6 +1,9 @@
-import itertools
 from typing import Tuple, Dict, List
+import numpy as np
 from panqec.codes import StabilizerCode
+from panqec.codes.base._stencil import (
+    Stencil, lattice_points, array_to_coordinates
+)
 
 Operator = Dict[Tuple, str]  # Location to pauli ('X', 'Y' or 'Z')
 Coordinates = List[Tuple]  # List of locations
@@ -13,45 +16,68 @@ class XCubeCode(StabilizerCode):
     def label(self) -> str:
         return 'XCube {}x{}x{}'.format(*self.size)
 
-    def get_qubit_coordinates(self) -> Coordinates:
-        coordinates = []
+    @property
+    def periods(self) -> Tuple[int, int, int]:
         Lx, Ly, Lz = self.size
+        return (2*Lx, 2*Ly, 2*Lz)
 
-        # Qubits along e_x
-        for x in range(1, 2*Lx, 2):
-            for y in range(0, 2*Ly, 2):
-                for z in range(0, 2*Lz, 2):
-                    coordinates.append((x, y, z))
+    def get_qubit_coordinates(self) -> np.ndarray:
+        Lx, Ly, Lz = self.size
 
-        # Qubits along e_y
-        for x in range(0, 2*Lx, 2):
-            for y in range(1, 2*Ly, 2):
-                for z in range(0, 2*Lz, 2):
-                    coordinates.append((x, y, z))
+        return np.concatenate([
+            # Qubits along e_x
+            lattice_points(
+                range(1, 2*Lx, 2), range(0, 2*Ly, 2), range(0, 2*Lz, 2)
+            ),
 
-        # Qubits along e_z
-        for x in range(0, 2*Lx, 2):
-            for y in range(0, 2*Ly, 2):
-                for z in range(1, 2*Lz, 2):
-                    coordinates.append((x, y, z))
+            # Qubits along e_y
+            lattice_points(
+                range(0, 2*Lx, 2), range(1, 2*Ly, 2), range(0, 2*Lz, 2)
+            ),
 
-        return coordinates
+            # Qubits along e_z
+            lattice_points(
+                range(0, 2*Lx, 2), range(0, 2*Ly, 2), range(1, 2*Lz, 2)
+            ),
+        ])
 
     def get_stabilizer_coordinates(self) -> Coordinates:
-        coordinates = []
         Lx, Ly, Lz = self.size
 
         # Cubes
-        ranges = [range(1, 2*Lx, 2), range(1, 2*Ly, 2), range(1, 2*Lz, 2)]
-        for x, y, z in itertools.product(*ranges):
-            coordinates.append((x, y, z))
+        cubes = lattice_points(
+            range(1, 2*Lx, 2), range(1, 2*Ly, 2), range(1, 2*Lz, 2)
+        )
 
         # Faces
-        ranges = [range(3), range(0, 2*Lx, 2), range(0, 2*Ly, 2), range(0, 2*Lz, 2)]
-        for axis, x, y, z in itertools.product(*ranges):
-            coordinates.append((axis, x, y, z))
+        faces = lattice_points(
+            range(3), range(0, 2*Lx, 2), range(0, 2*Ly, 2), range(0, 2*Lz, 2)
+        )
+
+        return array_to_coordinates(cubes) + array_to_coordinates(faces)
+
+    def get_stencils(self) -> List[Stencil]:
+        Lx, Ly, Lz = self.size
 
-        return coordinates
+        cubes = lattice_points(
+            range(1, 2*Lx, 2), range(1, 2*Ly, 2), range(1, 2*Lz, 2)
+        )
+        cube_delta = [(1, 1, 0), (-1, -1, 0), (1, -1, 0), (-1, 1, 0),
+                      (-1, 0, -1), (1, 0, -1), (0, -1, -1), (0, 1, -1),
+                      (-1, 0, 1), (1, 0, 1), (0, -1, 1), (0, 1, 1)]
+        stencils = [(cubes, np.array(cube_delta), 'Z')]
+
+        face_delta = {
+            self.X_AXIS: [(0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1)],
+            self.Y_AXIS: [(1, 0, 0), (-1, 0, 0), (0, 0, 1), (0, 0, -1)],
+            self.Z_AXIS: [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0)],
+        }
+        for axis, delta in face_delta.items():
+            faces = lattice_points(range(axis, axis + 1), range(0, 2*Lx, 2),
+                                   range(0, 2*Ly, 2), range(0, 2*Lz, 2))
+            stencils.append((faces, np.array(delta), 'X'))
+
+        return stencils
 
     def stabilizer_type(self, location: Tuple[int, int, int]) -> str:
         if not self.is_stabilizer(location):
@@ -1,7 +1,9 @@
-import itertools
 from typing import Tuple, Dict, List
 import numpy as np
 from panqec.codes import StabilizerCode
+from panqec.codes.base._stencil import (
+    Stencil, lattice_points, array_to_coordinates
+)
 
 Operator = Dict[Tuple, str]  # Location to pauli ('X', 'Y' or 'Z')
 Coordinates = List[Tuple]  # List of locations
@@ -14,48 +16,77 @@ class RhombicCode(StabilizerCode):
     def label(self) -> str:
         return 'Rhombic {}x{}x{}'.format(*self.size)
 
-    def get_qubit_coordinates(self):
-        coordinates = []
+    @property
+    def periods(self) -> Tuple[int, int, int]:
         Lx, Ly, Lz = self.size
+        return (2*Lx, 2*Ly, 2*Lz)
 
-        # Qubits along e_x
-        for x in range(1, 2*Lx, 2):
-            for y in range(0, 2*Ly, 2):
-                for z in range(0, 2*Lz, 2):
-                    coordinates.append((x, y, z))
+    def get_qubit_coordinates(self) -> np.ndarray:
+        Lx, Ly, Lz = self.size
 
-        # Qubits along e_y
-        for x in range(0, 2*Lx, 2):
-            for y in range(1, 2*Ly, 2):
-                for z in range(0, 2*Lz, 2):
-                    coordinates.append((x, y, z))
+        return np.concatenate([
+            # Qubits along e_x
+            lattice_points(
+                range(1, 2*Lx, 2), range(0, 2*Ly, 2), range(0, 2*Lz, 2)
+            ),
 
-        # Qubits along e_z
-        for x in range(0, 2*Lx, 2):
-            for y in range(0, 2*Ly, 2):
-                for z in range(1, 2*Lz, 2):
-                    coordinates.append((x, y, z))
+            # Qubits along e_y
+            lattice_points(
+                range(0, 2*Lx, 2), range(1, 2*Ly, 2), range(0, 2*Lz, 2)
+            ),
 
-        return coordinates
+            # Qubits along e_z
+            lattice_points(
+                range(0, 2*Lx, 2), range(0, 2*Ly, 2), range(1, 2*Lz, 2)
+            ),
+        ])
 
-    def get_stabilizer_coordinates(self) -> Coordinates:
-        coordinates: List[Tuple] = []
+    def _get_cubes(self) -> np.ndarray:
         Lx, Ly, Lz = self.size
+        cubes = lattice_points(
+            range(1, 2*Lx, 2), range(1, 2*Ly, 2), range(1, 2*Lz, 2)
+        )
+        return cubes[np.sum(cubes, axis=1) % 4 == 1]
 
-        # Cubes
-        ranges = [range(1, 2*Lx, 2), range(1, 2*Ly, 2), range(1, 2*Lz, 2)]
-        for x, y, z in itertools.product(*ranges):
-            if (x + y + z) % 4 == 1:
-                coordinates.append((x, y, z))
-
-        # Triangles
-        ranges = [
+    def _get_triangles(self) -> np.ndarray:
+        Lx, Ly, Lz = self.size
+        return lattice_points(
             range(4), range(0, 2*Lx, 2), range(0, 2*Ly, 2), range(0, 2*Lz, 2)
-        ]
-        for axis, x, y, z in itertools.product(*ranges):
-            coordinates.append((axis, x, y, z))
+        )
+
+    def get_stabilizer_coordinates(self) -> Coordinates:
+        return (
+            array_to_coordinates(self._get_cubes())
+            + array_to_coordinates(self._get_triangles())
+        )
+
+    def get_stencils(self) -> List[Stencil]:
+        cube_delta = [(1, 1, 0), (-1, -1, 0), (1, -1, 0), (-1, 1, 0),
+                      (1, 0, 1), (-1, 0, -1), (1, 0, -1), (-1, 0, 1),
+                      (0, 1, 1), (0, -1, -1), (0, -1, 1), (0, 1, -1)]
+        stencils = [(self._get_cubes(), np.array(cube_delta), 'X')]
+
+        # Triangle offsets for each axis, depending on (x + y + z) % 4.
+        delta_axis = {
+            True: [[(1, 0, 0), (0, 1, 0), (0, 0, 1)],
+                   [(-1, 0, 0), (0, -1, 0), (0, 0, 1)],
+                   [(1, 0, 0), (0, -1, 0), (0, 0, -1)],
+                   [(-1, 0, 0), (0, 1, 0), (0, 0, -1)]],
+            False: [[(1, 0, 0), (0, 1, 0), (0, 0, -1)],
+                    [(-1, 0, 0), (0, -1, 0), (0, 0, -1)],
+                    [(1, 0, 0), (0, -1, 0), (0, 0, 1)],
+                    [(-1, 0, 0), (0, 1, 0), (0, 0, 1)]]
+        }
+        triangles = self._get_triangles()
+        is_multiple_of_4 = np.sum(triangles[:, 1:], axis=1) % 4 == 0
+        for parity, deltas in delta_axis.items():
+            for axis, delta in enumerate(deltas):
+                selection = (triangles[:, 0] == axis) & (
+                    is_multiple_of_4 == parity
+                )
+                stencils.append((triangles[selection], np.array(delta), 'Z'))
 
-        return coordinates
+        return stencils
 
     def stabilizer_type(self, location: Tuple) -> str:
         if not self.is_stabilizer(location):
@@ -1,6 +1,7 @@
 from typing import Tuple, Dict, List
 import numpy as np
 from panqec.codes import StabilizerCode
+from panqec.codes.base._stencil import Stencil, lattice_points
 
 Operator = Dict[Tuple[int, int], str]  # Location to pauli ('X', 'Y' or 'Z')
 Coordinates = List[Tuple[int, int]]  # List of locations
@@ -13,34 +14,30 @@ class RotatedPlanar2DCode(StabilizerCode):
     def label(self) -> str:
         return 'Rotated Planar {}x{}'.format(*self.size)
 
-    def get_qubit_coordinates(self) -> Operator:
-        coordinates = []
+    def get_qubit_coordinates(self) -> np.ndarray:
         Lx, Ly = self.size
 
         # Qubits along e_x
-        for x in range(1, 2*Lx+1, 2):
-            for y in range(1, 2*Ly+1, 2):
-                coordinates.append((x, y))
+        return lattice_points(range(1, 2*Lx+1, 2), range(1, 2*Ly+1, 2))
 
-        return coordinates
+    def get_stabilizer_coordinates(self) -> np.ndarray:
+        return np.concatenate([
+            locations for locations, _, _ in self.get_stencils()
+        ])
 
-    def get_stabilizer_coordinates(self) -> Coordinates:
-        coordinates = []
+    def get_stencils(self) -> List[Stencil]:
         Lx, Ly = self.size
+        delta = np.array([(-1, -1), (-1, 1), (1, -1), (1, 1)])
 
         # Vertices
-        for x in range(2, 2*Lx, 2):
-            for y in range(0, 2*Ly+1, 2):
-                if (x + y) % 4 == 2:
-                    coordinates.append((x, y))
+        vertices = lattice_points(range(2, 2*Lx, 2), range(0, 2*Ly+1, 2))
+        vertices = vertices[(vertices[:, 0] + vertices[:, 1]) % 4 == 2]
 
         # Faces
-        for x in range(0, 2*Lx+1, 2):
-            for y in range(2, 2*Ly, 2):
-                if (x + y) % 4 == 0:
-                    coordinates.append((x, y))
+        faces = lattice_points(range(0, 2*Lx+1, 2), range(2, 2*Ly, 2))
+        faces = faces[(faces[:, 0] + faces[:, 1]) % 4 == 0]
 
-        return coordinates
+        return [(vertices, delta, 'Z'), (faces, delta, 'X')]
 
     def stabilizer_type(self, location: Tuple[int, int]):
         if not self.is_stabilizer(location):
@@ -1,6 +1,7 @@
 from typing import Tuple, Dict, List
 import numpy as np
 from panqec.codes import StabilizerCode
+from panqec.codes.base._stencil import Stencil, lattice_points
 
 Operator = Dict[Tuple, str]  # Location to pauli ('X', 'Y' or 'Z')
 Coordinates = List[Tuple]  # List of locations
@@ -13,49 +14,72 @@ class RotatedPlanar3DCode(StabilizerCode):
     def label(self) -> str:
         return 'Rotated Planar {}x{}x{}'.format(*self.size)
 
-    def get_qubit_coordinates(self) -> Coordinates:
+    def get_qubit_coordinates(self) -> np.ndarray:
         Lx, Ly, Lz = self.size
 
-        coordinates: Coordinates = []
-
         # Horizontal
-        for x in range(1, 2*Lx, 2):
-            for y in range(1, 2*Ly, 2):
-                for z in range(1, 2*Lz, 2):
-                    coordinates.append((x, y, z))
+        horizontal = lattice_points(
+            range(1, 2*Lx, 2), range(1, 2*Ly, 2), range(1, 2*Lz, 2)
+        )
 
         # Vertical
-        for x in range(2, 2*Lx, 2):
-            for y in range(0, 2*Ly + 1, 2):
-                for z in range(2, 2*Lz, 2):
-                    if (x + y) % 4 == 2:
-                        coordinates.append((x, y, z))
-        return coordinates
-
-    def get_stabilizer_coordinates(self) -> Coordinates:
-        coordinates: Coordinates = []
+        vertical = lattice_points(
+            range(2, 2*Lx, 2), range(0, 2*Ly + 1, 2), range(2, 2*Lz, 2)
+        )
+        vertical = vertical[(vertical[:, 0] + vertical[:, 1]) % 4 == 2]
+
+        return np.concatenate([horizontal, vertical])
+
+    def _get_stabilizer_families(self) -> Tuple[np.ndarray, ...]:
         Lx, Ly, Lz = self.size
 
         # Vertices
-        for x in range(2, 2*Lx, 2):
-            for y in range(0, 2*Ly+1, 2):
-                for z in range(1, 2*Lz, 2):
-                    if (x + y) % 4 == 2:
-                        coordinates.append((x, y, z))
+        vertices = lattice_points(
+            range(2, 2*Lx, 2), range(0, 2*Ly+1, 2), range(1, 2*Lz, 2)
+        )
+        vertices = vertices[(vertices[:, 0] + vertices[:, 1]) % 4 == 2]
 
         # Horizontal faces
-        for x in range(0, 2*Lx+1, 2):
-            for y in range(2, 2*Ly, 2):
-                for z in range(1, 2*Lz, 2):
-                    if (x + y) % 4 == 0:
-                        coordinates.append((x, y, z))
+        horizontal_faces = lattice_points(
+            range(0, 2*Lx+1, 2), range(2, 2*Ly, 2), range(1, 2*Lz, 2)
+        )
+        horizontal_faces = horizontal_faces[
+            (horizontal_faces[:, 0] + horizontal_faces[:, 1]) % 4 == 0
+        ]
 
         # Vertical faces
-        for x in range(1, 2*Lx+1, 2):
-            for y in range(1, 2*Ly, 2):
-                for z in range(2, 2*Lz, 2):
-                    coordinates.append((x, y, z))
-        return coordinates
+        vertical_faces = lattice_points(
+            range(1, 2*Lx+1, 2), range(1, 2*Ly, 2), range(2, 2*Lz, 2)
+        )
+
+        return vertices, horizontal_faces, vertical_faces
+
+    def get_stabilizer_coordinates(self) -> np.ndarray:
+        return np.concatenate(self._get_stabilizer_families())
+
+    def get_stencils(self) -> List[Stencil]:
+        vertices, horizontal_faces, vertical_faces = (
+            self._get_stabilizer_families()
+        )
+        is_x_normal = (vertical_faces[:, 0] + vertical_faces[:, 1]) % 4 == 0
+
+        vertex_delta = [
+            (-1, -1, 0), (-1, 1, 0), (1, -1, 0), (1, 1, 0), (0, 0, -1),
+            (0, 0, 1)
+        ]
+        # z-normal so face is xy-plane.
+        xy_delta = [(-1, -1, 0), (1, 1, 0), (-1, 1, 0), (1, -1, 0)]
+        # x-normal so face is in yz-plane.
+        yz_delta = [(-1, -1, 0), (1, 1, 0), (0, 0, -1), (0, 0, 1)]
+        # y-normal so face is in zx-plane.
+        zx_delta = [(-1, 1, 0), (1, -1, 0), (0, 0, -1), (0, 0, 1)]
+
+        return [
+            (vertices, np.array(vertex_delta), 'Z'),
+            (horizontal_faces, np.array(xy_delta), 'X'),
+            (vertical_faces[is_x_normal], np.array(yz_delta), 'X'),
+            (vertical_faces[~is_x_normal], np.array(zx_delta), 'X'),
+        ]
 
     def stabilizer_type(self, location: Tuple) -> str:
         if not self.is_stabilizer(location):
@@ -113,7 +137,7 @@ class RotatedPlanar3DCode(StabilizerCode):
     def qubit_axis(self, location):
         x, y, z = location
 
-        if location not in self.qubit_coordinates:
+        if not self.is_qubit(location):
             raise ValueError(
                 f'Location {location} does not correspond to a qubit'
             )
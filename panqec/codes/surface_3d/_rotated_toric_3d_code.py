@@ -149,7 +149,7 @@ class RotatedToric3DCode(StabilizerCode):
     def qubit_axis(self, location: Location) -> str:
         x, y, z = location
 
-        if location not in self.qubit_coordinates:
+        if not self.is_qubit(location):
             raise ValueError(
                 f'Location {location} does not correspond to a qubit'
             )
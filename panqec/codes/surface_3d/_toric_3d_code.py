@@ -1,6 +1,7 @@
 from typing import Tuple, Dict, List
 import numpy as np
 from panqec.codes import StabilizerCode
+from panqec.codes.base._stencil import Stencil, lattice_points
 
 Operator = Dict[Tuple[int, int, int], str]  # Location to pauli ('X', 'Y' or 'Z')
 Coordinates = List[Tuple[int, int, int]]  # List of locations
@@ -13,59 +14,72 @@ class Toric3DCode(StabilizerCode):
     def label(self) -> str:
         return 'Toric {}x{}x{}'.format(*self.size)
 
-    def get_qubit_coordinates(self) -> Coordinates:
-        coordinates = []
+    @property
+    def periods(self) -> Tuple[int, int, int]:
         Lx, Ly, Lz = self.size
+        return (2*Lx, 2*Ly, 2*Lz)
 
-        # Qubits along e_x
-        for x in range(1, 2*Lx, 2):
-            for y in range(0, 2*Ly, 2):
-                for z in range(0, 2*Lz, 2):
-                    coordinates.append((x, y, z))
-
-        # Qubits along e_y
-        for x in range(0, 2*Lx, 2):
-            for y in range(1, 2*Ly, 2):
-                for z in range(0, 2*Lz, 2):
-                    coordinates.append((x, y, z))
-
-        # Qubits along e_z
-        for x in range(0, 2*Lx, 2):
-            for y in range(0, 2*Ly, 2):
-                for z in range(1, 2*Lz, 2):
-                    coordinates.append((x, y, z))
-
-        return coordinates
+    def get_qubit_coordinates(self) -> np.ndarray:
+        Lx, Ly, Lz = self.size
 
-    def get_stabilizer_coordinates(self) -> Coordinates:
-        coordinates = []
+        return np.concatenate([
+            # Qubits along e_x
+            lattice_points(
+                range(1, 2*Lx, 2), range(0, 2*Ly, 2), range(0, 2*Lz, 2)
+            ),
+
+            # Qubits along e_y
+            lattice_points(
+                range(0, 2*Lx, 2), range(1, 2*Ly, 2), range(0, 2*Lz, 2)
+            ),
+
+            # Qubits along e_z
+            lattice_points(
+                range(0, 2*Lx, 2), range(0, 2*Ly, 2), range(1, 2*Lz, 2)
+            ),
+        ])
+
+    def get_stabilizer_coordinates(self) -> np.ndarray:
+        return np.concatenate([
+            locations for locations, _, _ in self.get_stencils()
+        ])
+
+    def get_stencils(self) -> List[Stencil]:
         Lx, Ly, Lz = self.size
 
         # Vertices
-        for x in range(0, 2*Lx, 2):
-            for y in range(0, 2*Ly, 2):
-                for z in range(0, 2*Lz, 2):
-                    coordinates.append((x, y, z))
+        vertices = lattice_points(
+            range(0, 2*Lx, 2), range(0, 2*Ly, 2), range(0, 2*Lz, 2)
+        )
+        vertex_delta = [
+            (-1, 0, 0), (1, 0, 0), (0, -1, 0), (0, 1, 0),
+            (0, 0, -1), (0, 0, 1)
+        ]
 
         # Face in xy plane
-        for x in range(1, 2*Lx, 2):
-            for y in range(1, 2*Ly, 2):
-                for z in range(0, 2*Lz, 2):
-                    coordinates.append((x, y, z))
+        xy_faces = lattice_points(
+            range(1, 2*Lx, 2), range(1, 2*Ly, 2), range(0, 2*Lz, 2)
+        )
+        xy_delta = [(-1, 0, 0), (1, 0, 0), (0, -1, 0), (0, 1, 0)]
 
         # Face in yz plane
-        for x in range(0, 2*Lx, 2):
-            for y in range(1, 2*Ly, 2):
-                for z in range(1, 2*Lz, 2):
-                    coordinates.append((x, y, z))
+        yz_faces = lattice_points(
+            range(0, 2*Lx, 2), range(1, 2*Ly, 2), range(1, 2*Lz, 2)
+        )
+        yz_delta = [(0, -1, 0), (0, 1, 0), (0, 0, -1), (0, 0, 1)]
 
         # Face in xz plane
-        for x in range(1, 2*Lx, 2):
-            for y in range(0, 2*Ly, 2):
-                for z in range(1, 2*Lz, 2):
-                    coordinates.append((x, y, z))
-
-        return coordinates
+        xz_faces = lattice_points(
+            range(1, 2*Lx, 2), range(0, 2*Ly, 2), range(1, 2*Lz, 2)
+        )
+        xz_delta = [(-1, 0, 0), (1, 0, 0), (0, 0, -1), (0, 0, 1)]
+
+        return [
+            (vertices, np.array(vertex_delta), 'Z'),
+            (xy_faces, np.array(xy_delta), 'X'),
+            (yz_faces, np.array(yz_delta), 'X'),
+            (xz_faces, np.array(xz_delta), 'X'),
+        ]
 
     def stabilizer_type(self, location: Tuple[int, int, int]) -> str:
         if not self.is_stabilizer(location):
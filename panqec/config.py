@@ -5,6 +5,7 @@ Settings from environmental variables and config files.
     Eric Huang
 """
 import os
+from typing import Dict, Type
 from dotenv import load_dotenv
 from .codes import (
     Toric3DCode, Toric2DCode,
@@ -12,7 +13,7 @@ from .codes import (
     RotatedToric3DCode, RhombicCode
 )
 from .decoders import (
-    Toric3DMatchingDecoder, SweepMatchDecoder,
+    BaseDecoder, Toric3DMatchingDecoder, SweepMatchDecoder,
     RotatedSweepMatchDecoder, RotatedInfiniteZBiasDecoder
 )
 from .decoders.bposd.bposd_decoder import BeliefPropagationOSDDecoder
@@ -24,7 +25,8 @@ from .error_models import (
 )
 from .decoders import (
     DeformedSweepMatchDecoder, FoliatedMatchingDecoder,
-    DeformedRotatedSweepMatchDecoder
+    DeformedRotatedSweepMatchDecoder, UnionFindDecoder, CascadeDecoder,
+    LookupTableDecoder
 )
 from .error_models import PauliErrorModel
 
@@ -69,7 +71,7 @@ ERROR_MODELS = {
     'DeformedXYErrorModel': DeformedXYErrorModel,
     'DeformedRhombicErrorModel': DeformedRhombicErrorModel,
 }
-DECODERS = {
+DECODERS: Dict[str, Type[BaseDecoder]] = {
     'Toric2DMatchingDecoder': Toric2DMatchingDecoder,
     'Toric3DMatchingDecoder': Toric3DMatchingDecoder,
     'SweepMatchDecoder': SweepMatchDecoder,
@@ -79,7 +81,10 @@ DECODERS = {
     'DeformedRotatedSweepMatchDecoder': DeformedRotatedSweepMatchDecoder,
     'BeliefPropagationOSDDecoder': BeliefPropagationOSDDecoder,
     'MemoryBeliefPropagationDecoder': MemoryBeliefPropagationDecoder,
-    'RotatedInfiniteZBiasDecoder': RotatedInfiniteZBiasDecoder
+    'RotatedInfiniteZBiasDecoder': RotatedInfiniteZBiasDecoder,
+    'UnionFindDecoder': UnionFindDecoder,
+    'CascadeDecoder': CascadeDecoder,
+    'LookupTableDecoder': LookupTableDecoder,
 }
 
 # Slurm automation config.
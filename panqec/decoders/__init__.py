@@ -1,4 +1,5 @@
 from .base._base_decoder import BaseDecoder  # noqa
+from .base._memoized_decoder import MemoizedDecoder  # noqa
 
 from .bposd.bposd_decoder import BeliefPropagationOSDDecoder  # noqa
 from .bposd.mbp_decoder import MemoryBeliefPropagationDecoder  # noqa
@@ -19,13 +20,20 @@ from .sweepmatch._deformed_decoder import (  # noqa
 
 from .optimal._rotated_infzbias_decoder import (  # noqa
     ZMatchingDecoder, RotatedInfiniteZBiasDecoder,
-    split_posts_at_active_fences
+    split_posts_at_active_fences, alternating_segment_posts
 )
 
 from .foliated._foliated_decoder import FoliatedMatchingDecoder  # noqa
 
+from .union_find._union_find_decoder import UnionFindDecoder  # noqa
+
+from .cascade._cascade_decoder import CascadeDecoder  # noqa
+
+from .lookup._lookup_table_decoder import LookupTableDecoder  # noqa
+
 __all__ = [
     "BaseDecoder",
+    "MemoizedDecoder",
     "BeliefPropagationOSDDecoder",
     "MemoryBeliefPropagationDecoder",
 
@@ -43,4 +51,7 @@ __all__ = [
     "ZMatchingDecoder",
     "RotatedInfiniteZBiasDecoder",
     "FoliatedMatchingDecoder",
+    "UnionFindDecoder",
+    "CascadeDecoder",
+    "LookupTableDecoder",
 ]
@@ -5,7 +5,13 @@ import numpy as np
 
 
 class BaseDecoder(metaclass=ABCMeta):
-    """Base class for decoders"""
+    """Base class for decoders
+
+    Decoders are pickled with all their attributes, except for the native
+    objects that cannot be pickled (matching graphs, ldpc decoders, ...),
+    which the decoders holding them leave out in `__getstate__` and build
+    again in `__setstate__`.
+    """
 
     def __init__(self,
                  code: StabilizerCode,
@@ -22,6 +28,23 @@ class BaseDecoder(metaclass=ABCMeta):
         E.g. 'Toric 2D Matching'
         """
 
+    @property
+    def statistics(self) -> dict:
+        """Statistics gathered by the decoder since it was created, saved
+        with the results of the simulations. Empty by default."""
+        return {}
+
+    def add_statistics(self, counts: dict):
+        """Add the counts gathered by a copy of the decoder, such as the one
+        of a worker process, to the statistics of the decoder.
+
+        Parameters
+        ----------
+        counts : dict
+            Counts with the keys of `statistics`. The entries that are not
+            counts are missing.
+        """
+
     @abstractmethod
     def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
         """Given a code and a syndrome, returns a correction to apply
@@ -43,3 +66,31 @@ class BaseDecoder(metaclass=ABCMeta):
             Correction as an array of size 2n (with n the number of qubits)
             in the binary symplectic format.
         """
+
+    def decode_batch(self, syndromes: np.ndarray, **kwargs) -> np.ndarray:
+        """Decode a batch of syndromes at once.
+
+        By default, it calls `decode` on each syndrome, so decoders only need
+        to override it if they can decode many syndromes at once.
+
+        Parameters
+        ----------
+        syndromes: np.ndarray
+            Syndromes as an array of shape (n_shots, m), where m is the
+            number of stabilizers.
+
+        kwargs: dict
+            Decoder-specific parameters (implemented by subclasses)
+
+        Returns
+        -------
+        corrections : np.ndarray
+            Corrections as an array of shape (n_shots, 2n), where each row is
+            in the binary symplectic format.
+        """
+        if len(syndromes) == 0:
+            return np.zeros((0, 2*self.code.n), dtype=np.uint)
+        corrections = [
+            self.decode(syndrome, **kwargs) for syndrome in syndromes
+        ]
+        return np.array(corrections)
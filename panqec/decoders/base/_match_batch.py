@@ -0,0 +1,36 @@
+"""
+Batch decoding with the matchers of PyMatching.
+"""
+
+import numpy as np
+from pymatching import Matching
+
+
+def match_batch(matcher: Matching, syndromes: np.ndarray) -> np.ndarray:
+    """Decode a batch of syndromes with a PyMatching matcher.
+
+    The whole batch goes through `Matching.decode_batch` in a single call
+    when the installed PyMatching provides it, otherwise each syndrome is
+    decoded in turn with the same matcher.
+
+    Parameters
+    ----------
+    matcher : Matching
+        The matcher of the check matrix.
+    syndromes : np.ndarray
+        Syndromes as an array of shape (n_shots, n_checks).
+
+    Returns
+    -------
+    corrections : np.ndarray
+        Corrections as an array of shape (n_shots, n_qubits).
+    """
+    syndromes = np.asarray(syndromes, dtype=np.uint8)
+    if hasattr(matcher, 'decode_batch'):
+        return np.asarray(matcher.decode_batch(syndromes))
+    corrections = np.zeros(
+        (syndromes.shape[0], matcher.num_fault_ids), dtype=np.uint8
+    )
+    for i_shot, syndrome in enumerate(syndromes):
+        corrections[i_shot] = matcher.decode(syndrome, num_neighbours=None)
+    return corrections
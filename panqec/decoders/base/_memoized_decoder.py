@@ -0,0 +1,119 @@
+from collections import OrderedDict
+import numpy as np
+from ._base_decoder import BaseDecoder
+
+
+class MemoizedDecoder(BaseDecoder):
+    """Decoder remembering the corrections of the most recent syndromes of
+    another decoder.
+
+    At low error rates, many shots have the same few syndromes, which are
+    then only decoded once. The all-zero syndrome is never decoded at all,
+    its correction being zero.
+    The corrections are kept in a least recently used cache indexed by the
+    packed bits of the syndromes.
+
+    Since the correction of a syndrome is only computed once, the decoders
+    with a random component, such as the sweep decoders, always give the
+    same correction for a syndrome while it stays in the cache.
+
+    In input files, it is enabled with the `cache_size` parameter of any
+    decoder.
+
+    Parameters
+    ----------
+    decoder : BaseDecoder
+        Decoder whose corrections are remembered.
+    cache_size : int
+        Largest number of syndromes remembered.
+    """
+
+    def __init__(self, decoder: BaseDecoder, cache_size: int):
+        if cache_size <= 0:
+            raise ValueError('The cache size must be positive')
+        super().__init__(decoder.code, decoder.error_model, decoder.error_rate)
+        self.decoder = decoder
+        self.cache_size = cache_size
+        self._cache: OrderedDict = OrderedDict()
+
+        # Number of shots with a zero syndrome, and with a nonzero syndrome
+        # found in the cache or not.
+        self.n_zero_syndromes = 0
+        self.n_cache_hits = 0
+        self.n_cache_misses = 0
+
+    @property
+    def label(self):
+        return self.decoder.label
+
+    @property
+    def statistics(self) -> dict:
+        statistics = dict(self.decoder.statistics)
+        statistics.update({
+            'zero_syndromes': self.n_zero_syndromes,
+            'cache_hits': self.n_cache_hits,
+            'cache_misses': self.n_cache_misses,
+        })
+        return statistics
+
+    def add_statistics(self, counts: dict):
+        self.decoder.add_statistics(counts)
+        self.n_zero_syndromes += counts['zero_syndromes']
+        self.n_cache_hits += counts['cache_hits']
+        self.n_cache_misses += counts['cache_misses']
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
+        """Get X and Z corrections given code and measured syndrome."""
+        if kwargs:
+            return self.decoder.decode(syndrome, **kwargs)
+        return self.decode_batch(np.asarray(syndrome)[None, :])[0]
+
+    def decode_batch(self, syndromes: np.ndarray, **kwargs) -> np.ndarray:
+        """Decode a batch of syndromes, decoding each syndrome missing from
+        the cache only once, in a single batch of the decoder."""
+        if kwargs:
+            return self.decoder.decode_batch(syndromes, **kwargs)
+
+        syndromes = np.asarray(syndromes)
+        corrections = np.zeros(
+            (len(syndromes), 2*self.code.n), dtype=np.uint
+        )
+        nonzero = np.flatnonzero(np.any(syndromes, axis=1))
+        self.n_zero_syndromes += len(syndromes) - len(nonzero)
+        if len(nonzero) == 0:
+            return corrections
+
+        packed = np.packbits(syndromes[nonzero].astype(bool), axis=1)
+        keys = [row.tobytes() for row in packed]
+
+        # The first shot of each syndrome missing from the cache.
+        new_shots = {}
+        for shot, key in zip(nonzero, keys):
+            if key in self._cache:
+                self._cache.move_to_end(key)
+            elif key not in new_shots:
+                new_shots[key] = shot
+        self.n_cache_misses += len(new_shots)
+        self.n_cache_hits += len(nonzero) - len(new_shots)
+
+        new_corrections = {}
+        if new_shots:
+            decoded = self.decoder.decode_batch(
+                syndromes[list(new_shots.values())]
+            )
+            new_corrections = dict(zip(new_shots, decoded))
+
+        for shot, key in zip(nonzero, keys):
+            if key in new_corrections:
+                corrections[shot] = new_corrections[key]
+            else:
+                corrections[shot] = self._cache[key]
+
+        for key, correction in new_corrections.items():
+            self._cache[key] = correction
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return corrections
@@ -0,0 +1,56 @@
+"""
+Concurrent decoding of the independent sectors of composite decoders.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+SECTOR_EXECUTORS = ['serial', 'thread']
+
+# Process-wide pool of threads, created the first time it is needed.
+_THREAD_POOL: Optional[ThreadPoolExecutor] = None
+
+
+def check_sector_executor(sector_executor: str):
+    """Raise a ValueError if the executor of the sectors is unknown."""
+    if sector_executor not in SECTOR_EXECUTORS:
+        raise ValueError(
+            f'Unknown sector executor {sector_executor}, '
+            f'expected one of {SECTOR_EXECUTORS}'
+        )
+
+
+def run_sectors(
+    tasks: List[Callable[[], Any]], sector_executor: str = 'serial'
+) -> List[Any]:
+    """Run the decoding of independent sectors and return their results in
+    the same order.
+
+    Parameters
+    ----------
+    tasks : List[Callable[[], Any]]
+        Functions without arguments decoding each sector.
+    sector_executor : str
+        'serial' to run them one after the other, or 'thread' to run them
+        in a pool of threads, which only helps when the sector decoders
+        spend their time in native code releasing the GIL.
+
+    Returns
+    -------
+    results : List[Any]
+        Results of the tasks.
+    """
+    global _THREAD_POOL
+    check_sector_executor(sector_executor)
+    if sector_executor == 'serial' or len(tasks) < 2:
+        return [task() for task in tasks]
+
+    if _THREAD_POOL is None:
+        _THREAD_POOL = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix='panqec-sector'
+        )
+
+    # The first task runs in the calling thread while the others run in
+    # the pool.
+    futures = [_THREAD_POOL.submit(task) for task in tasks[1:]]
+    return [tasks[0]()] + [future.result() for future in futures]
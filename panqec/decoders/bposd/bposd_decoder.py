@@ -1,11 +1,56 @@
+from typing import Dict, Optional, Tuple
 import numpy as np
-from ldpc import bposd_decoder
+from ldpc import bposd_decoder, bp_decoder
 from panqec.codes import StabilizerCode
 from panqec.error_models import BaseErrorModel
 from panqec.decoders import BaseDecoder
+from ..base._sector_executor import check_sector_executor, run_sectors
+from .cluster_osd import decode_clusters
+
+# Process-wide pool of ldpc decoders, indexed by the parity-check matrix they
+# were built from and the BP-OSD parameters, so that all the decoders of the
+# same code share them, whatever their error model and error rate.
+_DECODER_POOL: Dict[Tuple, bposd_decoder] = {}
+
+
+def decode_sector(decoder: bposd_decoder, syndrome: np.ndarray) -> np.ndarray:
+    """Correction of an ldpc decoder for the syndrome of its sector."""
+    decoder.decode(syndrome)
+    return np.array(decoder.osdw_decoding)
+
+
+def clear_decoder_pool():
+    """Remove all the ldpc decoders from the pool, to free their memory."""
+    _DECODER_POOL.clear()
 
 
 class BeliefPropagationOSDDecoder(BaseDecoder):
+    """Belief propagation with ordered statistics decoding (BP-OSD).
+
+    The ldpc decoders are only built the first time a given code is decoded
+    with given BP-OSD parameters, and are then kept in a process-wide pool.
+    Since the channel probabilities are set with `update_channel_probs`
+    before each decoding, the same ldpc decoders are used for every error
+    rate and error model of a sweep.
+
+    For CSS codes, the X and Z sectors are decoded as given by
+    `sector_executor`, 'serial' or 'thread', as in `run_sectors`. With
+    `channel_update`, the X sector depends on the Z correction, so they are
+    always decoded one after the other.
+
+    With a `cluster_radius`, OSD is not run on the whole check matrix of a
+    sector when BP does not converge. Instead, the defects are grown by
+    the radius into clusters, as in `decode_clusters`, and BP-OSD runs on
+    the small check matrix of each cluster. If the corrections of the
+    clusters do not cancel the syndrome, the sector falls back to OSD on
+    the whole check matrix. The number of sectors resolved by BP alone, by
+    the clusters and by global OSD are kept in `statistics`.
+    Since ldpc cannot run OSD on the output of an earlier BP run, this
+    fallback runs BP on the whole sector a second time, so the clusters
+    only save time when they resolve most of the sectors where BP fails,
+    that is on large codes at low error rates.
+    """
+
     label = 'BP-OSD decoder'
 
     def __init__(self,
@@ -15,22 +60,69 @@ class BeliefPropagationOSDDecoder(BaseDecoder):
                  max_bp_iter: int = 1000,
                  channel_update: bool = False,
                  osd_order: int = 10,
-                 bp_method: str = 'msl'):
+                 bp_method: str = 'msl',
+                 sector_executor: str = 'serial',
+                 cluster_radius: Optional[int] = None):
         super().__init__(code, error_model, error_rate)
+        check_sector_executor(sector_executor)
+        if cluster_radius is not None and cluster_radius < 1:
+            raise ValueError('The cluster radius must be at least 1')
+        self.sector_executor = sector_executor
         self._max_bp_iter = max_bp_iter
         self._channel_update = channel_update
         self._osd_order = osd_order
         self._bp_method = bp_method
+        self._cluster_radius = cluster_radius
+
+        # Number of sectors resolved by BP alone, by OSD on the clusters and
+        # by OSD on the whole check matrix, with a cluster radius.
+        self.n_bp_converged = 0
+        self.n_cluster_osd = 0
+        self.n_global_osd = 0
 
         # Do not initialize the decoder until we call the decode method.
         # This is required because during analysis, there is no need to
         # initialize the decoder every time.
         self._initialized = False
 
+        # Error rate and probabilities (pi, px, py, pz) last computed.
+        self._probabilities_rate = None
+        self._probabilities: Tuple = ()
+
+    def __getstate__(self) -> dict:
+        """Leave out the ldpc decoders, which cannot be pickled, and are
+        taken from the pool of the unpickling process when decoding."""
+        state = self.__dict__.copy()
+        for key in ['x_decoder', 'z_decoder', 'decoder']:
+            state.pop(key, None)
+        state['_initialized'] = False
+        return state
+
+    @property
+    def statistics(self) -> dict:
+        if self._cluster_radius is None:
+            return {}
+        return {
+            'bp_converged': self.n_bp_converged,
+            'cluster_osd': self.n_cluster_osd,
+            'global_osd': self.n_global_osd,
+        }
+
+    def add_statistics(self, counts: dict):
+        if self._cluster_radius is None:
+            return
+        self.n_bp_converged += counts['bp_converged']
+        self.n_cluster_osd += counts['cluster_osd']
+        self.n_global_osd += counts['global_osd']
+
     def get_probabilities(self):
-        pi, px, py, pz = self.error_model.probability_distribution(
-            self.code, self.error_rate
-        )
+        if self._probabilities_rate != self.error_rate:
+            self._probabilities = self.error_model.probability_distribution(
+                self.code, self.error_rate
+            )
+            self._probabilities_rate = self.error_rate
+
+        pi, px, py, pz = self._probabilities
 
         return pi, px, py, pz
 
@@ -39,50 +131,49 @@ class BeliefPropagationOSDDecoder(BaseDecoder):
                              direction: str = "x->z") -> np.ndarray:
         """Update X probabilities once a Z correction has been applied"""
 
-        n_qubits = correction.shape[0]
-
-        new_probs = np.zeros(n_qubits)
-
         if direction == "z->x":
-            for i in range(n_qubits):
-                if correction[i] == 1:
-                    if pz[i] + py[i] != 0:
-                        new_probs[i] = py[i] / (pz[i] + py[i])
-                else:
-                    new_probs[i] = px[i] / (1 - pz[i] - py[i])
-
+            p_same, p_other = px, pz
         elif direction == "x->z":
-            for i in range(n_qubits):
-                if correction[i] == 1:
-                    if px[i] + py[i] != 0:
-                        new_probs[i] = py[i] / (px[i] + py[i])
-                else:
-                    new_probs[i] = pz[i] / (1 - px[i] - py[i])
-
+            p_same, p_other = pz, px
         else:
             raise ValueError(
                 f"Unrecognized direction {direction} when "
                 "updating probabilities"
             )
 
-        return new_probs
+        # Probability of a Y error given that the other Pauli was corrected,
+        # or of an error of the same type given that it was not.
+        corrected = np.asarray(correction) == 1
+        denominator = np.where(corrected, p_other + py, 1 - p_other - py)
+        numerator = np.where(corrected, py, p_same)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            new_probs = numerator / denominator
+        new_probs[corrected & (denominator == 0)] = 0
 
-    def initialize_decoders(self):
-        is_css = self.code.is_css
+        return new_probs
 
-        if is_css:
-            self.z_decoder = bposd_decoder(
-                self.code.Hx,
+    def _get_pooled_decoder(
+        self, sector: str, parity_check_matrix, bp_only: bool = False
+    ):
+        """ldpc decoder of the pool for a given sector of the code, built
+        with the parity-check matrix returned by `parity_check_matrix` if it
+        is not in the pool yet, running BP alone if `bp_only`."""
+        key = (
+            type(self.code), self.code.size, self.code._deformed_axis, sector,
+            self._max_bp_iter, self._osd_order, self._bp_method, bp_only
+        )
+        if key not in _DECODER_POOL and bp_only:
+            _DECODER_POOL[key] = bp_decoder(
+                parity_check_matrix(),
                 error_rate=self.error_rate,
                 max_iter=self._max_bp_iter,
                 bp_method=self._bp_method,
                 ms_scaling_factor=0,
-                osd_method="osd_cs",  # Choose from: "osd_e", "osd_cs", "osd0"
-                osd_order=self._osd_order
+                input_vector_type='syndrome'
             )
-
-            self.x_decoder = bposd_decoder(
-                self.code.Hz,
+        elif key not in _DECODER_POOL:
+            _DECODER_POOL[key] = bposd_decoder(
+                parity_check_matrix(),
                 error_rate=self.error_rate,
                 max_iter=self._max_bp_iter,
                 bp_method=self._bp_method,
@@ -90,18 +181,68 @@ class BeliefPropagationOSDDecoder(BaseDecoder):
                 osd_method="osd_cs",  # Choose from: "osd_e", "osd_cs", "osd0"
                 osd_order=self._osd_order
             )
+        return _DECODER_POOL[key]
 
+    def initialize_decoders(self):
+        is_css = self.code.is_css
+
+        if is_css:
+            self.z_decoder = self._get_pooled_decoder(
+                'z', lambda: self.code.Hx
+            )
+            self.x_decoder = self._get_pooled_decoder(
+                'x', lambda: self.code.Hz
+            )
         else:
-            self.decoder = bposd_decoder(
-                self.code.stabilizer_matrix,
-                error_rate=self.error_rate,
-                max_iter=self._max_bp_iter,
-                bp_method=self._bp_method,
-                ms_scaling_factor=0,
-                osd_method="osd_cs",  # Choose from: "osd_e", "osd_cs", "osd0"
-                osd_order=self._osd_order
+            self.decoder = self._get_pooled_decoder(
+                'xz', lambda: self.code.stabilizer_matrix
             )
 
+        self._initialized = True
+
+    def _decode_sector(
+        self, sector: str, decoder: bposd_decoder, check_matrix,
+        syndrome: np.ndarray, probabilities: np.ndarray
+    ) -> Tuple[np.ndarray, str]:
+        """Correction of a sector, and whether it was found by 'bp', by
+        'cluster_osd' or by 'global_osd'.
+
+        The channel probabilities of `decoder` must already be set to
+        `probabilities`.
+        """
+        if self._cluster_radius is None:
+            return decode_sector(decoder, syndrome), 'global_osd'
+
+        bp = self._get_pooled_decoder(
+            sector, lambda: check_matrix, bp_only=True
+        )
+        bp.update_channel_probs(probabilities)
+        bp.decode(syndrome)
+        if bp.converge:
+            return np.array(bp.bp_decoding), 'bp'
+
+        correction = decode_clusters(
+            check_matrix, syndrome, probabilities,
+            radius=self._cluster_radius, max_bp_iter=self._max_bp_iter,
+            osd_order=self._osd_order, bp_method=self._bp_method
+        )
+        if correction is not None:
+            return correction, 'cluster_osd'
+
+        # The BP run above cannot be reused, so BP runs again before OSD.
+        return decode_sector(decoder, syndrome), 'global_osd'
+
+    def _count_methods(self, methods):
+        if self._cluster_radius is None:
+            return
+        for method in methods:
+            if method == 'bp':
+                self.n_bp_converged += 1
+            elif method == 'cluster_osd':
+                self.n_cluster_osd += 1
+            else:
+                self.n_global_osd += 1
+
     def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
         """Get X and Z corrections given code and measured syndrome."""
 
@@ -121,38 +262,58 @@ class BeliefPropagationOSDDecoder(BaseDecoder):
         probabilities_x = px + py
         probabilities_z = pz + py
 
-        probabilities = np.hstack([probabilities_z, probabilities_x])
-
+        # The pooled decoders may have been used by another decoder with
+        # different probabilities since the last call, so they are always
+        # updated.
         if is_css:
-            # Update probabilities (in case the distribution is new at each
-            # iteration)
             self.x_decoder.update_channel_probs(probabilities_x)
             self.z_decoder.update_channel_probs(probabilities_z)
 
-            # Decode Z errors
-            self.z_decoder.decode(syndrome_x)
-            z_correction = self.z_decoder.osdw_decoding
-
-            # Bayes update of the probability
             if self._channel_update:
-                new_x_probs = self.update_probabilities(
+                # Decode Z errors
+                z_correction, z_method = self._decode_sector(
+                    'z', self.z_decoder, self.code.Hx, syndrome_x,
+                    probabilities_z
+                )
+
+                # Bayes update of the probability
+                probabilities_x = self.update_probabilities(
                     z_correction, px, py, pz, direction="z->x"
                 )
-                self.x_decoder.update_channel_probs(new_x_probs)
+                self.x_decoder.update_channel_probs(probabilities_x)
 
-            # Decode X errors
-            self.x_decoder.decode(syndrome_z)
-            x_correction = self.x_decoder.osdw_decoding
+                # Decode X errors
+                x_correction, x_method = self._decode_sector(
+                    'x', self.x_decoder, self.code.Hz, syndrome_z,
+                    probabilities_x
+                )
+            else:
+                # Decode Z and X errors independently.
+                (z_correction, z_method), (x_correction, x_method) = (
+                    run_sectors([
+                        lambda: self._decode_sector(
+                            'z', self.z_decoder, self.code.Hx, syndrome_x,
+                            probabilities_z
+                        ),
+                        lambda: self._decode_sector(
+                            'x', self.x_decoder, self.code.Hz, syndrome_z,
+                            probabilities_x
+                        ),
+                    ], self.sector_executor)
+                )
+            self._count_methods([z_method, x_method])
 
             correction = np.concatenate([x_correction, z_correction])
         else:
-            # Update probabilities (in case the distribution is new at each
-            # iteration)
+            probabilities = np.hstack([probabilities_z, probabilities_x])
             self.decoder.update_channel_probs(probabilities)
 
             # Decode all errors
-            self.decoder.decode(syndrome)
-            correction = self.decoder.osdw_decoding
+            correction, method = self._decode_sector(
+                'xz', self.decoder, self.code.stabilizer_matrix, syndrome,
+                probabilities
+            )
+            self._count_methods([method])
             correction = np.concatenate(
                 [correction[n_qubits:], correction[:n_qubits]]
             )
@@ -0,0 +1,122 @@
+"""
+Ordered statistics decoding of the clusters of a syndrome.
+
+The defects of a syndrome are grown by a radius on the Tanner graph, and
+each connected cluster of qubits is decoded independently with BP-OSD on
+its own small check matrix, instead of running OSD on the whole matrix.
+"""
+
+from typing import List, Optional, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from ldpc import bposd_decoder
+from panqec import gf2
+
+
+def syndrome_clusters(
+    check_matrix: csr_matrix, syndrome: np.ndarray, radius: int = 1
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Clusters of qubits and checks around the defects of a syndrome.
+
+    Parameters
+    ----------
+    check_matrix : csr_matrix
+        Check matrix of shape (n_checks, n_qubits).
+    syndrome : np.ndarray
+        Syndrome of the checks.
+    radius : int
+        Number of times the defects are grown. With a radius of 1, the
+        clusters only contain the qubits of the defect checks, and with
+        each extra step, the qubits sharing a check with them are added.
+
+    Returns
+    -------
+    clusters : List[Tuple[np.ndarray, np.ndarray]]
+        Indices of the checks and qubits of each connected cluster. The
+        checks of a cluster are all the checks touching its qubits, so that
+        no two clusters share a check.
+    """
+    check_matrix = csr_matrix(check_matrix, dtype=int)
+    defects = np.flatnonzero(syndrome)
+    if len(defects) == 0:
+        return []
+
+    qubits = np.zeros(check_matrix.shape[1], dtype=bool)
+    qubits[check_matrix[defects].indices] = True
+    for _ in range(radius - 1):
+        checks = check_matrix.dot(qubits.astype(int)) > 0
+        qubits = check_matrix.T.dot(checks.astype(int)) > 0
+
+    qubit_indices = np.flatnonzero(qubits)
+    sub_matrix = check_matrix[:, qubit_indices]
+    n_clusters, labels = connected_components(
+        sub_matrix.T.dot(sub_matrix), directed=False
+    )
+
+    clusters = []
+    for cluster in range(n_clusters):
+        cluster_qubits = qubit_indices[labels == cluster]
+        cluster_checks = np.flatnonzero(
+            check_matrix[:, cluster_qubits].getnnz(axis=1)
+        )
+        clusters.append((cluster_checks, cluster_qubits))
+    return clusters
+
+
+def decode_clusters(
+    check_matrix: csr_matrix, syndrome: np.ndarray,
+    probabilities: np.ndarray, radius: int = 1, max_bp_iter: int = 1000,
+    osd_order: int = 10, bp_method: str = 'msl'
+) -> Optional[np.ndarray]:
+    """Decode each cluster of a syndrome with BP-OSD on its own checks and
+    qubits.
+
+    The OSD order of each cluster is capped by its number of qubits minus
+    the rank of its check matrix, as required by ldpc.
+
+    Parameters
+    ----------
+    check_matrix : csr_matrix
+        Check matrix of shape (n_checks, n_qubits).
+    syndrome : np.ndarray
+        Syndrome of the checks.
+    probabilities : np.ndarray
+        Error probability of each qubit.
+    radius : int
+        Radius of the clusters, as in `syndrome_clusters`.
+    max_bp_iter : int
+        Maximum number of BP iterations on each cluster.
+    osd_order : int
+        OSD order on each cluster.
+    bp_method : str
+        BP method of ldpc.
+
+    Returns
+    -------
+    correction : Optional[np.ndarray]
+        Correction of the syndrome, or None if the corrections of the
+        clusters do not cancel it, which happens when an error spreads
+        beyond its cluster.
+    """
+    check_matrix = csr_matrix(check_matrix, dtype=int)
+    syndrome = np.asarray(syndrome, dtype=int) % 2
+    correction = np.zeros(check_matrix.shape[1], dtype=int)
+
+    for checks, qubits in syndrome_clusters(check_matrix, syndrome, radius):
+        sub_matrix = check_matrix[checks][:, qubits]
+        decoder = bposd_decoder(
+            sub_matrix,
+            channel_probs=probabilities[qubits],
+            max_iter=max_bp_iter,
+            bp_method=bp_method,
+            ms_scaling_factor=0,
+            osd_method="osd_cs",
+            osd_order=min(osd_order, len(qubits) - gf2.rank(sub_matrix))
+        )
+        decoder.decode(syndrome[checks])
+        correction[qubits] = decoder.osdw_decoding
+
+    if np.any(check_matrix.dot(correction) % 2 != syndrome):
+        return None
+    return correction
@@ -2,9 +2,6 @@ import numpy as np
 from panqec.codes import StabilizerCode
 from panqec.decoders import BaseDecoder
 from panqec.error_models import BaseErrorModel
-from typing import Dict
-import panqec.bsparse as bsparse
-from panqec.bpauli import bcommute
 from scipy.sparse import csr_matrix
 
 
@@ -15,18 +12,18 @@ PAULI_Z = 3
 
 
 def symplectic_to_pauli(H):
+    """Convert a matrix in the binary symplectic format into a sparse matrix
+    over GF(4), whose elements are PAULI_I, PAULI_X, PAULI_Y or PAULI_Z."""
+    H = csr_matrix(H)
     n = H.shape[1] // 2
-    m = H.shape[0]
-    new_H = bsparse.zero_matrix((m, n))
-    rows, cols = H.nonzero()
-    for i in range(len(rows)):
-        if cols[i] < n:
-            new_H[rows[i], cols[i]] = PAULI_X
-        else:
-            if new_H[rows[i], cols[i] - n] == PAULI_X:
-                new_H[rows[i], cols[i] - n] = PAULI_Y
-            else:
-                new_H[rows[i], cols[i] - n] = PAULI_Z
+    x_part = (H[:, :n] != 0).astype('uint8')
+    z_part = (H[:, n:] != 0).astype('uint8')
+
+    # 1 for X only, 1 + 3 - 2 = 2 for both X and Z, and 3 for Z only.
+    new_H = x_part*PAULI_X + z_part*PAULI_Z - 2*x_part.multiply(z_part)
+    new_H = csr_matrix(new_H, dtype='uint8')
+    new_H.eliminate_zeros()
+    new_H.sort_indices()
     return new_H
 
 
@@ -44,16 +41,6 @@ def pauli_to_symplectic(a, reverse=False):
     return new_a
 
 
-def tanh_prod(a, eps=1e-8):
-    """ Square cross product defined in II.B of arXiv:2104.13659"""
-    prod = np.prod(np.tanh(a/2))
-    if prod >= 1:
-        prod = 1 - eps
-    elif prod <= -1:
-        prod = -1 + eps
-    return 2 * np.arctanh(prod)
-
-
 def log_exp_bias(pauli, gamma, eps=1e-12):
     """ Function lambda defined in II.B of arXiv:2104.13659"""
     denominator = np.sum(np.exp(-gamma), axis=0)
@@ -63,7 +50,81 @@ def log_exp_bias(pauli, gamma, eps=1e-12):
     return np.log(eps + (1 + exp_gamma_pauli)) - np.log(eps + denominator)
 
 
+def segment_sum(values, indptr, order=None):
+    """Sum of values over consecutive segments of the last axis.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Array of shape (..., n_edges).
+    indptr : np.ndarray
+        Array of size n_segments + 1, the segment i going from indptr[i] to
+        indptr[i + 1] (excluded), as in the CSR format. Segments can be empty.
+    order : np.ndarray, optional
+        Permutation applied to the last axis of `values` before summing.
+
+    Returns
+    -------
+    sums : np.ndarray
+        Array of shape (..., n_segments).
+    """
+    if order is not None:
+        values = values[..., order]
+    nonempty = indptr[:-1] < indptr[1:]
+    sums = np.zeros(values.shape[:-1] + (len(indptr) - 1,), dtype=values.dtype)
+    if np.any(nonempty):
+        sums[..., nonempty] = np.add.reduceat(
+            values, indptr[:-1][nonempty], axis=-1
+        )
+    return sums
+
+
+def serial_levels(H_pauli: csr_matrix) -> np.ndarray:
+    """Level of each qubit in the serial schedule of belief propagation.
+
+    In the serial schedule, the qubits are updated one after the other, each
+    qubit using the messages already updated by the previous qubits that
+    share a stabilizer with it. Qubits of the same level never share a
+    stabilizer, so that they can be updated at the same time, and updating
+    the levels one after the other gives the same result as updating the
+    qubits one after the other in the order of their indices.
+
+    Parameters
+    ----------
+    H_pauli : csr_matrix
+        Stabilizer matrix over GF(4), of shape (n_stabs, n_qubits).
+
+    Returns
+    -------
+    levels : np.ndarray
+        Level of each qubit, i.e. one more than the largest level of the
+        previous qubits sharing a stabilizer with it.
+    """
+    support = csr_matrix(H_pauli != 0, dtype=int)
+    neighbors = csr_matrix(support.T @ support)
+
+    n_qubits = H_pauli.shape[1]
+    levels = np.zeros(n_qubits, dtype=int)
+    for qubit in range(n_qubits):
+        start, stop = neighbors.indptr[qubit], neighbors.indptr[qubit + 1]
+        previous = neighbors.indices[start:stop]
+        previous = previous[previous < qubit]
+        if len(previous) > 0:
+            levels[qubit] = levels[previous].max() + 1
+    return levels
+
+
 class MemoryBeliefPropagationDecoder(BaseDecoder):
+    """Memory belief propagation (MBP) decoder of arXiv:2104.13659.
+
+    Messages are stored on the edges of the Tanner graph of the stabilizer
+    matrix, i.e. on its nonzero elements, so that the memory scales with the
+    number of nonzero elements.
+    The qubits are updated with the serial schedule, in the order of their
+    indices, but all the qubits of the same level (see `serial_levels`) are
+    updated at once with NumPy operations on their edges.
+    """
+
     label = 'MBP decoder'
 
     def __init__(self,
@@ -79,40 +140,73 @@ class MemoryBeliefPropagationDecoder(BaseDecoder):
         self.alpha = alpha
         self.beta = beta
 
-        self._x_decoder: Dict = dict()
-        self._z_decoder: Dict = dict()
-
-        self._decoder: Dict = dict()
         # Convert it to a matrix over GF(4), where each element is in [0,4]
-        self.H = code.stabilizer_matrix.toarray()
-        self.H_pauli = symplectic_to_pauli(code.stabilizer_matrix).toarray()
+        self.H = code.stabilizer_matrix
+        self.H_pauli = symplectic_to_pauli(code.stabilizer_matrix)
         pi, px, py, pz = self.get_probabilities()
         self.p_channel = np.vstack([pi, px, py, pz])
 
-        # Easy access to the neighboring qubits of each stabilizer
-        self.neighboring_qubits = [self.H_pauli[m].nonzero()[0]
-                                   for m in range(self.H_pauli.shape[0])]
+        # Create channel log ratios
+        self.lambda_channel = np.log(
+            (1 - self.p_channel[1:]) / self.p_channel[1:]
+        )
+
+        # ======================== Tanner graph ========================
 
-        # Easy access to the neighboring stabilizers of each qubit
-        self.neighboring_stabs = [self.H_pauli[:, n].nonzero()[0]
-                                  for n in range(self.H_pauli.shape[1])]
+        # Edges sorted by stabilizer, with the stabilizer, qubit and Pauli
+        # of each edge.
+        n_stabs, n_qubits = self.H_pauli.shape
+        self._stab_indptr = self.H_pauli.indptr
+        self._edge_stab = np.repeat(
+            np.arange(n_stabs), np.diff(self.H_pauli.indptr)
+        )
+        self._edge_qubit = self.H_pauli.indices
+        self._edge_pauli = self.H_pauli.data.astype(int)
+        n_edges = len(self._edge_qubit)
 
-        # ===================== Initialize BP variables ====================
+        # Whether the Pauli w + 1 of each row is the Pauli of each edge.
+        self._same_pauli = (
+            np.arange(1, 4)[:, None] == self._edge_pauli[None, :]
+        )
 
-        # Create channel log ratios
-        self.lambda_channel = np.log((1 - self.p_channel[1:]) / self.p_channel[1:])
+        # Other edges of the stabilizer of each edge, padded with the index
+        # n_edges of a dummy edge.
+        degrees = np.diff(self._stab_indptr)
+        max_degree = max(1, degrees.max(initial=0))
+        position = np.arange(n_edges) - self._stab_indptr[self._edge_stab]
+        stab_edges = np.full((n_stabs, max_degree), n_edges)
+        stab_edges[self._edge_stab, position] = np.arange(n_edges)
+        skip = np.array([
+            [j for j in range(max_degree) if j != k]
+            for k in range(max_degree)
+        ], dtype=int).reshape(max_degree, max_degree - 1)
+        other_edges = stab_edges[self._edge_stab[:, None], skip[position]]
+
+        # Edges of each level of the serial schedule, sorted by qubit.
+        qubit_levels = serial_levels(self.H_pauli)
+        edge_order = np.lexsort((
+            self._edge_stab, self._edge_qubit, qubit_levels[self._edge_qubit]
+        ))
+        self._levels = []
+        for level in range(qubit_levels.max(initial=-1) + 1):
+            qubits = np.flatnonzero(qubit_levels == level)
+            edges = edge_order[
+                qubit_levels[self._edge_qubit[edge_order]] == level
+            ]
+            qubit_indptr = np.concatenate([[0], np.cumsum(
+                np.bincount(self._edge_qubit, minlength=n_qubits)[qubits]
+            )])
+            self._levels.append(
+                (qubits, qubit_indptr, edges, other_edges[edges])
+            )
 
-        # Initialize [qubit to stabilizer] messages (gamma)
-        n_stabs, n_qubits = self.H_pauli.shape
-        self.gamma_q2s = np.zeros((3, n_qubits, n_stabs))
-        for n in range(n_qubits):
-            for m in self.neighboring_stabs[n]:
-                for w in range(3):
-                    if 1 + w != self.H_pauli[m, n]:
-                        self.gamma_q2s[w, n, m] = self.lambda_channel[w, n]
+        # ===================== Initialize BP variables ====================
 
-        # Initialize [stabilizer to qubit] messages (delta)
-        self.delta_s2q = np.zeros((n_stabs, n_qubits))
+        # Initial [qubit to stabilizer] messages (gamma), of shape
+        # (3, n_edges).
+        self._initial_gamma = np.where(
+            self._same_pauli, 0, self.lambda_channel[:, self._edge_qubit]
+        )
 
     def get_probabilities(self):
         error_rate = 0.5
@@ -122,87 +216,144 @@ class MemoryBeliefPropagationDecoder(BaseDecoder):
         )
         return pi, px, py, pz
 
-    def decode(self, syndrome: np.ndarray) -> np.ndarray:
-        """Get X and Z corrections given code and measured syndrome."""
+    def _tanh_lambda(self, gamma, edges):
+        """tanh(lambda / 2) on some edges, given the [qubit to stabilizer]
+        messages on these edges, with lambda defined in II.B of
+        arXiv:2104.13659."""
+        return np.tanh(log_exp_bias(self._edge_pauli[edges] - 1, gamma) / 2)
+
+    def _update_level(self, level, gamma, tanh_lambda, syndrome_sign,
+                      eps=1e-8):
+        """Update the messages of the edges of a level of the serial
+        schedule, in place, and return the marginals gamma_q of its qubits,
+        of shape (3, ..., n_level_qubits)."""
+        qubits, qubit_indptr, edges, other_edges = level
+
+        # --------- Stabilizer to qubit update (prod-sum) ---------
+
+        prod = np.prod(tanh_lambda[..., other_edges], axis=-1)
+        prod = np.where(prod >= 1, 1 - eps, prod)
+        prod = np.where(prod <= -1, -1 + eps, prod)
+        delta = syndrome_sign[..., self._edge_stab[edges]] * (
+            2 * np.arctanh(prod)
+        )
 
-        H = self.H
-        H_pauli = self.H_pauli
+        # ----------------- Qubit to stabilizer update ---------------
 
-        n_stabs, n_qubits = H_pauli.shape
+        same_pauli = self._same_pauli[:, edges].reshape(
+            (3,) + (1,) * (delta.ndim - 1) + (len(edges),)
+        )
+        sum_same_pauli = segment_sum(
+            np.where(same_pauli, delta, 0), qubit_indptr
+        )
+        sum_diff_pauli = segment_sum(
+            np.where(same_pauli, 0, delta), qubit_indptr
+        )
+        lambda_channel = self.lambda_channel[:, qubits].reshape(
+            (3,) + (1,) * (delta.ndim - 1) + (len(qubits),)
+        )
+        gamma_q = lambda_channel \
+            + 1 / self.alpha * sum_diff_pauli \
+            - self.beta * sum_same_pauli
+
+        # Update qubit to stab messages, with the inhibition loop
+        edge_qubits = np.repeat(np.arange(len(qubits)), np.diff(qubit_indptr))
+        gamma[..., edges] = gamma_q[..., edge_qubits] - np.where(
+            same_pauli, 0, delta
+        )
+        tanh_lambda[..., edges] = self._tanh_lambda(gamma[..., edges], edges)
 
-        # ==================== Initialize BP variables ====================
+        return gamma_q
 
-        gamma_q2s = self.gamma_q2s.copy()
-        delta_s2q = self.delta_s2q.copy()
+    def _syndrome(self, correction):
+        """Syndrome of corrections given as Paulis (0 to 3) on each qubit."""
+        correction_edges = correction[..., self._edge_qubit]
+        anticommutes = (
+            (correction_edges != PAULI_I)
+            & (correction_edges != self._edge_pauli)
+        ).astype(int)
+        return segment_sum(anticommutes, self._stab_indptr) % 2
 
-        # ========================= BP iterations =========================
+    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
+        """Get X and Z corrections given code and measured syndrome."""
+        return self.decode_batch(np.asarray(syndrome)[None, :])[0]
 
-        for iter in range(self.max_bp_iter):
-            print(f"\nIter {iter+1} / {self.max_bp_iter}")
-
-            gamma_q = np.zeros((3, n_qubits))
-            for n in range(n_qubits):
-                # --------- Stabilizer to qubit update (prod-sum) ---------
-
-                for m in self.neighboring_stabs[n]:
-                    lambda_neighbor = [log_exp_bias(H_pauli[m, n_prime]-1,
-                                                    gamma_q2s[:, n_prime, m])
-                                       for n_prime in self.neighboring_qubits[m]
-                                       if n_prime != n]
-                    lambda_neighbor = np.array(lambda_neighbor)
-
-                    sign = (-1)**syndrome[m]
-                    delta_s2q[m, n] = sign * tanh_prod(lambda_neighbor)
-
-                # ----------------- Qubit to stabilizer update ---------------
-
-                for w in range(3):
-                    sum_same_pauli = np.sum(
-                        delta_s2q[self.neighboring_stabs[n], n][
-                            H_pauli[self.neighboring_stabs[n], n] == w + 1
-                        ]
-                    )
-                    sum_diff_pauli = np.sum(
-                        delta_s2q[self.neighboring_stabs[n], n][
-                            H_pauli[self.neighboring_stabs[n], n] != w + 1
-                        ]
-                    )
-
-                    gamma_q[w, n] = self.lambda_channel[w, n] \
-                        + 1 / self.alpha * sum_diff_pauli \
-                        - self.beta * sum_same_pauli
-
-                    # Update qubit to stab messages
-                    gamma_q2s[w, n, :] = gamma_q[w, n]
-
-                    # Inhibition loop
-                    gamma_q2s[w, n, (1 + w != H_pauli[:, n])] -= delta_s2q[
-                        (1 + w != H_pauli[:, n]), n
-                    ]
+    def decode_batch(self, syndromes: np.ndarray, **kwargs) -> np.ndarray:
+        """Get X and Z corrections for many syndromes at once.
 
-            # ----------------------- Hard decision -----------------------
+        The messages of all the shots are updated together, as arrays of
+        shape (n_shots, n_edges), and the shots whose syndrome has been
+        reached are removed from the following iterations.
+
+        Parameters
+        ----------
+        syndromes : np.ndarray
+            Syndromes as an array of shape (n_shots, m).
+
+        Returns
+        -------
+        corrections : np.ndarray
+            Corrections as an array of shape (n_shots, 2n) in the binary
+            symplectic format.
+        """
+
+        syndromes = np.asarray(syndromes, dtype=int)
+        n_shots = syndromes.shape[0]
+        n_qubits = self.H_pauli.shape[1]
+        n_edges = len(self._edge_qubit)
+
+        # ==================== Initialize BP variables ====================
 
-            correction = np.zeros(n_qubits, dtype='uint8')
+        # Shots that have not reached their syndrome yet.
+        active = np.arange(n_shots)
+        syndrome_sign = 1 - 2*syndromes
 
-            for n in range(n_qubits):
-                if not np.all(gamma_q[:, n] > 0):
-                    correction[n] = np.argmin(gamma_q[:, n]) + 1
+        gamma = np.repeat(self._initial_gamma[:, None, :], n_shots, axis=1)
 
-            correction_symplectic = pauli_to_symplectic(correction)
+        # tanh(lambda / 2) of each edge, and 1 on the dummy edge.
+        tanh_lambda = np.ones((n_shots, n_edges + 1))
+        tanh_lambda[:, :n_edges] = self._tanh_lambda(
+            self._initial_gamma, slice(None)
+        )
 
-            # --------------- Break loop if syndrome reached ---------------
+        # ========================= BP iterations =========================
 
-            new_syndrome = bcommute(H, correction_symplectic)
-            if np.all(new_syndrome == syndrome):
-                # print(f"Syndrome reached in {iter} iterations\n")
+        corrections = np.zeros((n_shots, n_qubits), dtype=int)
+        gamma_q = np.zeros((3, n_shots, n_qubits))
+        for iter in range(self.max_bp_iter):
+            if len(active) == 0:
                 break
 
-        correction_symplectic = pauli_to_symplectic(correction, reverse=True)
+            for level in self._levels:
+                gamma_q[:, :, level[0]] = self._update_level(
+                    level, gamma, tanh_lambda, syndrome_sign
+                )
 
-        correction = np.concatenate([correction_symplectic[n_qubits:],
-                                     correction_symplectic[:n_qubits]])
+            # ----------------------- Hard decision -----------------------
 
-        return correction
+            corrections[active] = np.where(
+                np.all(gamma_q > 0, axis=0),
+                PAULI_I, np.argmin(gamma_q, axis=0) + 1
+            )
+
+            # ----------- Remove shots that reached the syndrome -----------
+
+            converged = np.all(
+                self._syndrome(corrections[active]) == syndromes[active],
+                axis=1
+            )
+            if np.any(converged):
+                remaining = ~converged
+                active = active[remaining]
+                syndrome_sign = syndrome_sign[remaining]
+                gamma = gamma[:, remaining]
+                tanh_lambda = tanh_lambda[remaining]
+                gamma_q = gamma_q[:, remaining]
+
+        x_part = (corrections == PAULI_X) | (corrections == PAULI_Y)
+        z_part = (corrections == PAULI_Y) | (corrections == PAULI_Z)
+
+        return np.hstack([x_part, z_part]).astype('uint8')
 
 
 def test_symplectic_to_pauli():
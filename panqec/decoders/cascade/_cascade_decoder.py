@@ -0,0 +1,150 @@
+"""
+Cascade of decoders, from the fastest to the most accurate.
+"""
+
+from typing import Any, Dict, List, Optional, Type, Union
+import numpy as np
+from panqec.codes import StabilizerCode
+from panqec.decoders import BaseDecoder, MemoizedDecoder
+from panqec.error_models import BaseErrorModel
+
+Tier = Union[Dict[str, Any], Type[BaseDecoder]]
+
+
+def build_decoder(
+    spec: Tier, code: StabilizerCode, error_model: BaseErrorModel,
+    error_rate: float
+) -> BaseDecoder:
+    """Build a decoder given either as a dictionary
+    `{'model': name, 'parameters': {...}}` as in the input files, with
+    `name` a key of `panqec.config.DECODERS`, or as a decoder class.
+    A `cache_size` parameter wraps the decoder in a `MemoizedDecoder`."""
+    parameters: Dict[str, Any] = {}
+    decoder_class: Type[BaseDecoder]
+    if isinstance(spec, dict):
+        # The config imports the decoders, so it is imported here.
+        from panqec.config import DECODERS
+        decoder_class = DECODERS[spec['model']]
+        parameters = dict(spec.get('parameters', {}))
+    else:
+        decoder_class = spec
+    cache_size = parameters.pop('cache_size', None)
+    decoder = decoder_class(code, error_model, error_rate, **parameters)
+    if cache_size:
+        decoder = MemoizedDecoder(decoder, cache_size)
+    return decoder
+
+
+DEFAULT_TIERS: List[Dict[str, Any]] = [
+    {
+        'model': 'MemoryBeliefPropagationDecoder',
+        'parameters': {'max_bp_iter': 10}
+    },
+    {
+        'model': 'BeliefPropagationOSDDecoder',
+    },
+]
+
+
+class CascadeDecoder(BaseDecoder):
+    """Decoder trying a list of decoders in turn, from the cheapest to the
+    most expensive.
+
+    Each shot is first decoded by the first tier. If its correction does
+    not cancel the syndrome, the shot is escalated to the next tier, and so
+    on. The correction of the last tier is always kept.
+    Easy shots are therefore only decoded by the cheap tiers, and the
+    number of shots decoded and resolved by each tier are kept in
+    `statistics`.
+
+    Parameters
+    ----------
+    code : StabilizerCode
+        Code to decode.
+    error_model : BaseErrorModel
+        Error model given to the decoders of the tiers.
+    error_rate : float
+        Physical error rate.
+    tiers : List[Union[Dict, type]], optional
+        Decoders of the tiers, each given as in `build_decoder`.
+        By default, MBP capped at 10 iterations, then BP-OSD.
+    """
+
+    label = 'Cascade decoder'
+
+    def __init__(self,
+                 code: StabilizerCode,
+                 error_model: BaseErrorModel,
+                 error_rate: float,
+                 tiers: Optional[List[Tier]] = None):
+        super().__init__(code, error_model, error_rate)
+        if tiers is None:
+            tiers = list(DEFAULT_TIERS)
+        if len(tiers) == 0:
+            raise ValueError('The cascade needs at least one tier')
+
+        self.tiers: List[BaseDecoder] = [
+            build_decoder(tier, code, error_model, error_rate)
+            for tier in tiers
+        ]
+
+        # Number of shots decoded and resolved by each tier.
+        self.tier_attempts = np.zeros(len(self.tiers), dtype=int)
+        self.tier_hits = np.zeros(len(self.tiers), dtype=int)
+
+    @property
+    def hit_rates(self) -> np.ndarray:
+        """Fraction of the shots decoded by each tier that it resolved, NaN
+        for the tiers that decoded no shot."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.tier_hits/self.tier_attempts
+
+    @property
+    def statistics(self) -> dict:
+        return {
+            'tiers': [tier.label for tier in self.tiers],
+            'tier_attempts': self.tier_attempts.tolist(),
+            'tier_hits': self.tier_hits.tolist(),
+            'hit_rates': [
+                None if np.isnan(rate) else rate
+                for rate in self.hit_rates.tolist()
+            ],
+        }
+
+    def add_statistics(self, counts: dict):
+        self.tier_attempts += counts['tier_attempts']
+        self.tier_hits += counts['tier_hits']
+
+    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
+        """Get X and Z corrections given code and measured syndrome."""
+        return self.decode_batch(np.asarray(syndrome)[None, :])[0]
+
+    def decode_batch(self, syndromes: np.ndarray, **kwargs) -> np.ndarray:
+        """Decode a batch of syndromes, escalating the shots whose syndrome
+        a tier does not cancel to the next tier."""
+        syndromes = np.asarray(syndromes)
+        corrections = np.zeros(
+            (len(syndromes), 2*self.code.n), dtype=np.uint
+        )
+
+        remaining = np.arange(len(syndromes))
+        for i_tier, tier in enumerate(self.tiers):
+            if len(remaining) == 0:
+                break
+            tier_corrections = tier.decode_batch(syndromes[remaining])
+            residuals = (
+                self.code.measure_syndrome(tier_corrections)
+                + syndromes[remaining]
+            ) % 2
+            resolved = ~np.any(residuals, axis=1)
+
+            self.tier_attempts[i_tier] += len(remaining)
+            self.tier_hits[i_tier] += np.sum(resolved)
+
+            # The last tier gives the correction of all the remaining shots.
+            if i_tier == len(self.tiers) - 1:
+                resolved[:] = True
+            corrections[remaining[resolved]] = tier_corrections[resolved]
+            remaining = remaining[~resolved]
+
+        return corrections
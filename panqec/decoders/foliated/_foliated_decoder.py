@@ -5,7 +5,7 @@ Foliated decoder for X noise only.
     Eric Huang
 """
 
-from typing import Dict, List
+from typing import Dict, List, Tuple
 import numpy as np
 from pymatching import Matching
 from panqec.codes import StabilizerCode
@@ -18,10 +18,16 @@ class FoliatedMatchingDecoder(BaseDecoder):
     Does not correct any other errors.
 
     Can handle multiple codes at once.
+    The layers and matchers of each code are computed once and shared by all
+    the decoders of the same code, and all the layers are decoded by a single
+    matching on their block-diagonal check matrix, since they share no
+    vertices or qubits.
     """
 
     label: str = 'Foliated Matching'
-    matcher_lists: Dict[str, List[Matching]] = dict()
+    matcher_lists: Dict[Tuple, List[Matching]] = dict()
+    block_matchers: Dict[Tuple, Matching] = dict()
+    layer_indices: Dict[Tuple, Tuple[List, List]] = dict()
 
     def __init__(self, code: StabilizerCode,
                  error_model: BaseErrorModel,
@@ -29,23 +35,45 @@ class FoliatedMatchingDecoder(BaseDecoder):
         self.matcher = dict()
         super().__init__(code, error_model, error_rate)
 
+    @property
+    def code_key(self) -> Tuple:
+        """Key identifying the code in the class-level caches."""
+        return (type(self.code), self.code.size, self.code._deformed_axis)
+
+    def _layer_check_matrix(self, vertex_index, qubit_index):
+        """Z block of the stabilizer matrix restricted to given vertices
+        and qubits."""
+        return self.code.stabilizer_matrix[
+            vertex_index, self.code.n:
+        ][:, qubit_index]
+
     def get_matcher_list(self) -> List[Matching]:
-        """Return a new list of Matching objects for a given code."""
+        """Return the list of Matching objects of each layer of the code."""
+
+        if self.code_key not in self.matcher_lists:
+            self.matcher_lists[self.code_key] = [
+                Matching(self._layer_check_matrix(vertex_index, qubit_index))
+                for vertex_index, qubit_index in zip(
+                    self.get_layer_vertices(), self.get_layer_qubits()
+                )
+            ]
 
-        # The size of the lattice.
-        L_x, L_y, L_z = self.code.size
+        return self.matcher_lists[self.code_key]
 
-        matcher_list: List[Matching] = []
-        vertex_indices = self.get_layer_vertices()
-        qubit_indices = self.get_layer_qubits()
+    def get_block_matcher(self) -> Matching:
+        """Return a single Matching object for all the layers, whose check
+        matrix is block diagonal with one block per layer, with the vertices
+        and qubits in the order of `get_layer_vertices` and
+        `get_layer_qubits`."""
 
-        for vertex_index, qubit_index in zip(vertex_indices, qubit_indices):
-            H_z_layer = self.code.stabilizer_matrix[
-                vertex_index, self.code.n:
-            ][:, qubit_index]
-            matcher_list.append(Matching(H_z_layer))
+        if self.code_key not in self.block_matchers:
+            vertex_index = np.concatenate(self.get_layer_vertices())
+            qubit_index = np.concatenate(self.get_layer_qubits())
+            self.block_matchers[self.code_key] = Matching(
+                self._layer_check_matrix(vertex_index, qubit_index)
+            )
 
-        return matcher_list
+        return self.block_matchers[self.code_key]
 
     def get_layer_x(self) -> List[int]:
         return sorted(set([
@@ -54,31 +82,40 @@ class FoliatedMatchingDecoder(BaseDecoder):
             if self.code.stabilizer_type((x, y, z)) == 'vertex'
         ]))
 
+    def _get_layer_indices(self) -> Tuple[List, List]:
+        """Vertex and qubit indices of each layer, computed once per code."""
+
+        if self.code_key not in self.layer_indices:
+            vertex_type = self.code.stabilizer_types.index('vertex')
+            is_vertex = self.code.stabilizer_type_codes == vertex_type
+            vertex_x = np.array(self.code.stabilizer_coordinates)[:, 0]
+
+            is_yz_qubit = np.array([
+                self.code.qubit_axis(location) in ['y', 'z']
+                for location in self.code.qubit_coordinates
+            ], dtype=bool)
+            qubit_x = np.array(self.code.qubit_coordinates)[:, 0]
+
+            self.layer_indices[self.code_key] = (
+                [
+                    np.flatnonzero(is_vertex & (vertex_x == x)).tolist()
+                    for x in self.get_layer_x()
+                ],
+                [
+                    np.flatnonzero(is_yz_qubit & (qubit_x == x)).tolist()
+                    for x in self.get_layer_x()
+                ],
+            )
+
+        return self.layer_indices[self.code_key]
+
     def get_layer_vertices(self) -> List[List[int]]:
         """List of vertex indices for each layer."""
-        vertex_indices: List[List[int]] = []
-        for x in self.get_layer_x():
-            vertex_indices.append([
-                index
-                for index, location in enumerate(
-                    self.code.stabilizer_coordinates
-                )
-                if self.code.stabilizer_type(location) == 'vertex'
-                and location[0] == x
-            ])
-        return vertex_indices
+        return self._get_layer_indices()[0]
 
     def get_layer_qubits(self) -> List[List[int]]:
         """List of qubit indices for each layer."""
-        qubit_indices: List[List[int]] = []
-        for x in self.get_layer_x():
-            qubit_indices.append([
-                index
-                for index, location in enumerate(self.code.qubit_coordinates)
-                if self.code.qubit_axis(location) in ['y', 'z']
-                and location[0] == x
-            ])
-        return qubit_indices
+        return self._get_layer_indices()[1]
 
     def decode(
         self, syndrome: np.ndarray, **kwargs
@@ -87,28 +124,20 @@ class FoliatedMatchingDecoder(BaseDecoder):
 
         # Initialize correction as full bsf.
         correction = np.zeros(2*self.code.n, dtype=np.uint)
-        x_correction = np.zeros(self.code.n, dtype=np.uint)
-
-        # Get the Matching Matching object.
-        matcher_list = self.get_matcher_list()
-        vertex_indices = self.get_layer_vertices()
-        qubit_indices = self.get_layer_qubits()
-
-        # Keep only the vertex Z measurement syndrome, discard the rest.
-        # Extract the syndrome for each layer.
-
-        # Do matching for each layer.
-        for matcher, vertex_index, qubit_index in zip(
-            matcher_list, vertex_indices, qubit_indices
-        ):
-            layer_syndrome = syndrome[vertex_index]
-            layer_correction = matcher.decode(
-                layer_syndrome, num_neighbours=None
-            )
-            x_correction[qubit_index] = layer_correction
+
+        # Get the Matching object of all the layers.
+        matcher = self.get_block_matcher()
+        vertex_index = np.concatenate(self.get_layer_vertices())
+        qubit_index = np.concatenate(self.get_layer_qubits())
+
+        # Keep only the vertex Z measurement syndrome, discard the rest,
+        # and do matching for all the layers at once.
+        layer_correction = matcher.decode(
+            syndrome[vertex_index], num_neighbours=None
+        )
 
         # PyMatching gives only the X block correction.
         # Load it into the X block of the full bsf.
-        correction[:self.code.n] = x_correction
+        correction[qubit_index] = layer_correction
 
         return correction
@@ -0,0 +1,345 @@
+"""
+Lookup-table decoder for small CSS codes.
+
+The table of each sector maps the syndrome, packed into an integer, to the
+most likely correction found by enumerating all the errors up to a given
+weight. The tables are saved as `.npy` files and loaded as memory-mapped
+arrays, so that all the worker processes of a parallel run share one copy
+of them in the page cache, and decoding a batch is a single gather.
+"""
+
+from itertools import combinations
+from typing import Dict, Optional, Tuple
+import os
+import hashlib
+import tempfile
+import numpy as np
+from scipy.sparse import csr_matrix
+from panqec.codes import StabilizerCode, get_code_cache_dir
+from panqec.decoders import BaseDecoder
+from panqec.error_models import BaseErrorModel
+from panqec import gf2
+from ..cascade._cascade_decoder import Tier, build_decoder
+
+_TABLES: Dict[str, np.ndarray] = {}
+
+# Version of the tables, in the hash of their file names, to be increased
+# whenever `build_table` changes the corrections it keeps.
+_TABLE_VERSION = 2
+
+
+def clear_tables():
+    """Forget the tables loaded by this process, to free their memory."""
+    _TABLES.clear()
+
+
+def independent_checks(check_matrix) -> np.ndarray:
+    """Indices of a maximal set of linearly independent checks, whose
+    syndrome determines the syndrome of all the checks."""
+    _, pivot_cols = gf2.rref(csr_matrix(check_matrix).T)
+    return np.array(pivot_cols, dtype=int)
+
+
+def error_costs(probabilities: np.ndarray) -> np.ndarray:
+    """Costs -log(p/(1 - p)) of the errors on each qubit, normalized so that
+    the largest one is 1."""
+    probabilities = np.clip(probabilities, 1e-15, 0.5)
+    costs = -np.log(probabilities/(1 - probabilities))
+    if costs.max() > 0:
+        costs = costs/costs.max()
+    return costs
+
+
+def build_table(
+    check_matrix, costs: np.ndarray, max_weight: int
+) -> np.ndarray:
+    """Lookup table of a sector, by enumerating the errors up to a given
+    weight.
+
+    Parameters
+    ----------
+    check_matrix : csr_matrix
+        Check matrix of the sector, of shape (n_checks, n_qubits).
+    costs : np.ndarray
+        Cost of an error on each qubit.
+    max_weight : int
+        Largest weight of the errors enumerated.
+
+    Returns
+    -------
+    table : np.ndarray
+        Array of shape (2**n_independent, ceil(n_qubits/8)) and dtype uint8,
+        whose row of index the syndrome of the independent checks (as
+        given by `independent_checks`) packed into an integer, with the
+        first check as the least significant bit, is the packed bits of the
+        correction of smallest cost, or zero if no enumerated error has that
+        syndrome. Between corrections of the same cost, the lightest one is
+        kept, and then the first one enumerated.
+    """
+    check_matrix = csr_matrix(check_matrix)
+    n_qubits = check_matrix.shape[1]
+    checks = independent_checks(check_matrix)
+    powers = np.left_shift(1, np.arange(len(checks), dtype=np.int64))
+
+    # Syndrome index of the error on each qubit.
+    column_indices = (
+        check_matrix[checks].T.toarray().astype(np.int64) % 2
+    ).dot(powers)
+
+    table = np.zeros(
+        (2**len(checks), (n_qubits + 7)//8), dtype=np.uint8
+    )
+    best_costs = np.full(2**len(checks), np.inf)
+    best_costs[0] = 0
+    for weight in range(1, max_weight + 1):
+        errors = np.fromiter(
+            (
+                qubit for error in combinations(range(n_qubits), weight)
+                for qubit in error
+            ), dtype=int
+        ).reshape(-1, weight)
+        indices = np.bitwise_xor.reduce(column_indices[errors], axis=1)
+        error_cost = costs[errors].sum(axis=1)
+
+        # Keep the cheapest error of each syndrome, if it is cheaper than
+        # the lighter errors of that syndrome, up to rounding errors.
+        order = np.lexsort((np.arange(len(errors)), error_cost, indices))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = np.diff(indices[order]) != 0
+        best = order[first]
+        best = best[error_cost[best] < best_costs[indices[best]] - 1e-9]
+
+        corrections = np.zeros((len(best), n_qubits), dtype=np.uint8)
+        corrections[np.arange(len(best))[:, None], errors[best]] = 1
+        table[indices[best]] = np.packbits(
+            corrections, axis=1, bitorder='little'
+        )
+        best_costs[indices[best]] = error_cost[best]
+    return table
+
+
+class LookupTableDecoder(BaseDecoder):
+    """Lookup-table decoder for small CSS codes.
+
+    X errors are decoded with a table of the syndromes of `Hz` and Z errors
+    with a table of the syndromes of `Hx`, each built by `build_table` with
+    the costs given by the error model.
+    The tables are stored in `table_dir` as memory-mapped `.npy` files,
+    shared by all the decoders and processes using the same code, sector,
+    maximum weight and relative error costs, so that different error rates
+    of the same noise direction share them.
+    The shots whose syndrome is not in a table are decoded by the base
+    decoder.
+
+    Parameters
+    ----------
+    code : StabilizerCode
+        CSS code to decode.
+    error_model : BaseErrorModel
+        Error model giving the costs of the errors.
+    error_rate : float
+        Physical error rate.
+    max_weight : int
+        Largest weight of the errors enumerated in the tables.
+    max_checks : int
+        Largest number of independent checks of a sector, whose table has
+        2**max_checks rows.
+    base_decoder : Union[Dict, type], optional
+        Decoder of the shots missing from the tables, given as in
+        `build_decoder`. By default the union-find decoder.
+    table_dir : str, optional
+        Directory of the tables. By default the code cache directory, and
+        if it is not set either, the tables are only kept in memory.
+    """
+
+    label = 'Lookup table decoder'
+
+    def __init__(self,
+                 code: StabilizerCode,
+                 error_model: BaseErrorModel,
+                 error_rate: float,
+                 max_weight: int = 4,
+                 max_checks: int = 24,
+                 base_decoder: Optional[Tier] = None,
+                 table_dir: Optional[str] = None):
+        if not code.is_css:
+            raise ValueError(
+                'The lookup table decoder only works for CSS codes'
+            )
+        super().__init__(code, error_model, error_rate)
+        self.max_weight = max_weight
+        self.max_checks = max_checks
+        self.table_dir = table_dir
+
+        if base_decoder is None:
+            base_decoder = {'model': 'UnionFindDecoder'}
+        self.base_decoder = build_decoder(
+            base_decoder, code, error_model, error_rate
+        )
+
+        for check_matrix in [code.Hz, code.Hx]:
+            n_checks = len(independent_checks(check_matrix))
+            if n_checks > max_checks:
+                raise ValueError(
+                    f'A sector has {n_checks} independent checks, '
+                    f'more than max_checks={max_checks}'
+                )
+
+        # The tables are only loaded when decoding for the first time.
+        self._sectors: Optional[Tuple] = None
+
+        # Number of shots found in both tables or not.
+        self.n_table_hits = 0
+        self.n_table_misses = 0
+
+    def __getstate__(self) -> dict:
+        """Leave out the tables, which the unpickling process loads from
+        their files instead of receiving a copy."""
+        state = self.__dict__.copy()
+        state['_sectors'] = None
+        return state
+
+    @property
+    def statistics(self) -> dict:
+        return {
+            'table_hits': self.n_table_hits,
+            'table_misses': self.n_table_misses,
+        }
+
+    def add_statistics(self, counts: dict):
+        self.n_table_hits += counts['table_hits']
+        self.n_table_misses += counts['table_misses']
+
+    def get_table_path(
+        self, sector: str, check_matrix, costs: np.ndarray
+    ) -> Optional[str]:
+        """Path of the table of a sector, or None if it is kept in
+        memory."""
+        table_dir = self.table_dir
+        if table_dir is None:
+            table_dir = get_code_cache_dir()
+        if table_dir is None:
+            return None
+
+        check_matrix = csr_matrix(check_matrix)
+        hasher = hashlib.sha256()
+        hasher.update(str(_TABLE_VERSION).encode())
+        hasher.update(check_matrix.indptr.astype(np.int64).tobytes())
+        hasher.update(check_matrix.indices.astype(np.int64).tobytes())
+        hasher.update(np.round(costs, 6).tobytes())
+        size = 'x'.join(str(L) for L in self.code.size)
+        file_name = '{}_{}_{}_{}_w{}_{}.npy'.format(
+            type(self.code).__name__, size, self.code._deformed_axis,
+            sector, self.max_weight, hasher.hexdigest()[:16]
+        )
+        return os.path.join(table_dir, 'lookup_tables', file_name)
+
+    def get_table(
+        self, sector: str, check_matrix, probabilities: np.ndarray
+    ) -> np.ndarray:
+        """Table of a sector, loaded from its file or built and saved if it
+        does not exist yet."""
+        costs = error_costs(probabilities)
+        path = self.get_table_path(sector, check_matrix, costs)
+        if path is None:
+            key = '{}_{}_{}_{}_{}'.format(
+                type(self.code).__name__, self.code.size,
+                self.code._deformed_axis, sector, self.max_weight
+            ) + hashlib.sha256(np.round(costs, 6).tobytes()).hexdigest()
+        else:
+            key = path
+
+        if key not in _TABLES:
+            if path is not None and os.path.isfile(path):
+                _TABLES[key] = np.load(path, mmap_mode='r')
+            else:
+                table = build_table(check_matrix, costs, self.max_weight)
+                if path is not None:
+                    save_table(path, table)
+                    table = np.load(path, mmap_mode='r')
+                _TABLES[key] = table
+        return _TABLES[key]
+
+    def load_tables(self):
+        pi, px, py, pz = self.error_model.probability_distribution(
+            self.code, self.error_rate
+        )
+
+        # X errors are detected by the Z stabilizers and vice versa.
+        self._sectors = tuple(
+            (
+                indices, independent_checks(check_matrix),
+                self.get_table(sector, check_matrix, probabilities)
+            )
+            for sector, indices, check_matrix, probabilities in [
+                ('x', self.code.z_indices, self.code.Hz, px + py),
+                ('z', self.code.x_indices, self.code.Hx, pz + py),
+            ]
+        )
+
+    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
+        """Get X and Z corrections given code and measured syndrome."""
+        return self.decode_batch(np.asarray(syndrome)[None, :])[0]
+
+    def decode_batch(self, syndromes: np.ndarray, **kwargs) -> np.ndarray:
+        """Decode a batch of syndromes by looking them up in the tables."""
+        if self._sectors is None:
+            self.load_tables()
+        sectors = self._sectors
+        assert sectors is not None
+
+        n_qubits = self.code.n
+        syndromes = np.asarray(syndromes)
+        corrections = np.zeros((len(syndromes), 2*n_qubits), dtype=np.uint)
+        missing = np.zeros((2, len(syndromes)), dtype=bool)
+
+        for i_sector, (indices, checks, table) in enumerate(sectors):
+            sector_syndromes = syndromes[:, indices] % 2
+            powers = np.left_shift(1, np.arange(len(checks), dtype=np.int64))
+            rows = table[sector_syndromes[:, checks].astype(np.int64).dot(
+                powers
+            )]
+            corrections[:, i_sector*n_qubits:(i_sector + 1)*n_qubits] = (
+                np.unpackbits(
+                    rows, axis=1, count=n_qubits, bitorder='little'
+                )
+            )
+            missing[i_sector] = (
+                ~np.any(rows, axis=1) & np.any(sector_syndromes, axis=1)
+            )
+
+        # Shots missing from a table are decoded by the base decoder.
+        missing_shots = np.flatnonzero(np.any(missing, axis=0))
+        if len(missing_shots) > 0:
+            base_corrections = self.base_decoder.decode_batch(
+                syndromes[missing_shots]
+            )
+            for i_sector in range(2):
+                sector = slice(i_sector*n_qubits, (i_sector + 1)*n_qubits)
+                is_missing = missing[i_sector, missing_shots]
+                corrections[missing_shots[is_missing], sector] = (
+                    base_corrections[is_missing, sector]
+                )
+
+        self.n_table_misses += len(missing_shots)
+        self.n_table_hits += len(syndromes) - len(missing_shots)
+        return corrections
+
+
+def save_table(path: str, table: np.ndarray):
+    """Save a table as a `.npy` file.
+
+    The file is first written under a temporary name and then moved in
+    place, so that concurrent processes never read a partially written
+    file.
+    """
+    table_dir = os.path.dirname(path)
+    os.makedirs(table_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=table_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, table)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
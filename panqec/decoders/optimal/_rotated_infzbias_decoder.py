@@ -1,14 +1,45 @@
-from typing import Dict, Tuple, List
+from typing import List
 import numpy as np
 from panqec.decoders import BaseDecoder
 from pymatching import Matching
 from ...codes import StabilizerCode
+from ...error_models import BaseErrorModel
 from ..sweepmatch._rotated_sweep_decoder import RotatedSweepDecoder3D
+from ..base._sector_executor import check_sector_executor, run_sectors
 
 
 class ZMatchingDecoder(RotatedSweepDecoder3D):
+    """Decoder of the loop sector, matching the Z errors on vertical lines
+    and then on horizontal planes.
+
+    The indices of the faces and edges of every line and the matcher of
+    every plane are built once, when the decoder is constructed.
+    """
+
     label = 'Rotated Infinite Z Bias Loop Sector Decoder'
 
+    def __init__(self, code: StabilizerCode,
+                 error_model: BaseErrorModel,
+                 error_rate: float,
+                 seed: int = 0,
+                 max_rounds: int = 32):
+        super().__init__(
+            code, error_model, error_rate, seed=seed, max_rounds=max_rounds
+        )
+        self._build_line_tables()
+        self._build_plane_matchers()
+
+    def __getstate__(self) -> dict:
+        """Leave out the matchers of the planes, which cannot be
+        pickled."""
+        state = self.__dict__.copy()
+        del state['_plane_matchers']
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._build_plane_matchers()
+
     def get_edges_xy(self):
         xy = [
             (x, y) for x, y, z in self.code.stabilizer_coordinates
@@ -16,170 +47,202 @@ class ZMatchingDecoder(RotatedSweepDecoder3D):
         ]
         return xy
 
+    def _build_line_tables(self):
+        """Build the indices of the faces and horizontal edges of the
+        vertical lines.
+
+        `_line_faces` has shape (n_lines, L_z - 1) and `_line_edges` has
+        shape (n_lines, L_z), ordered by increasing z along each line.
+        """
+        L_z = self.code.size[2]
+        xy = np.array(self.get_edges_xy(), dtype=int).reshape(-1, 2)
+        z_faces = np.arange(2, 2*L_z, 2)
+        z_edges = np.arange(1, 2*L_z, 2)
+
+        def line_locations(z_values):
+            locations = np.zeros((len(xy), len(z_values), 3), dtype=int)
+            locations[:, :, :2] = xy[:, None, :]
+            locations[:, :, 2] = z_values
+            return locations
+
+        self._line_faces = self.code.stabilizer_indices(
+            line_locations(z_faces)
+        )
+        self._line_edges = self.code.qubit_indices(line_locations(z_edges))
+
+    def _build_plane_matchers(self):
+        """Build the matcher of each horizontal plane.
+
+        `_plane_matchers` maps each z_plane to a tuple
+        `(faces, edges, matcher)` with the indices of the faces and edges of
+        the plane and the `Matching` object of its check matrix.
+        """
+        code = self.code
+        L_z = code.size[2]
+        face_type = code.stabilizer_types.index('face')
+        is_face = code.stabilizer_type_codes == face_type
+        stabilizers = np.array(code.stabilizer_coordinates)
+        qubits = np.array(code.qubit_coordinates)
+
+        self._plane_matchers = dict()
+        for z_plane in range(1, 2*L_z, 2):
+            faces = np.flatnonzero(is_face & (stabilizers[:, 2] == z_plane))
+            edges = np.flatnonzero(qubits[:, 2] == z_plane)
+
+            # Sort by location, as the tie-breaking of the matching
+            # depends on the order of the faces and edges.
+            faces = faces[np.lexsort(stabilizers[faces].T[::-1])]
+            edges = edges[np.lexsort(qubits[edges].T[::-1])]
+
+            # Construct the check matrix for PyMatching.
+            edge_offsets = np.array([
+                [1, 1, 0], [-1, 1, 0], [-1, -1, 0], [1, -1, 0]
+            ])
+            neighbouring_edges = code.qubit_indices(
+                stabilizers[faces][:, None, :] + edge_offsets
+            )
+            edge_position = np.full(code.n, -1)
+            edge_position[edges] = np.arange(len(edges))
+            check_matrix = np.zeros((len(faces), len(edges)), dtype=np.uint)
+            rows, columns = np.nonzero(neighbouring_edges >= 0)
+            check_matrix[
+                rows, edge_position[neighbouring_edges[rows, columns]]
+            ] = 1
+
+            self._plane_matchers[z_plane] = (
+                faces, edges, Matching(check_matrix)
+            )
+
     def decode(
         self, syndrome: np.ndarray, **kwargs
     ) -> np.ndarray:
-        correction: Dict = dict()
+        corrected = np.zeros(self.code.n, dtype=bool)
         signs = self.get_initial_state(syndrome)
 
         # 1D pair matching along each vertical lines of horizontal edges.
-        for xy in self.get_edges_xy():
-            signs = self.decode_vertical_line(
-                signs, correction, xy
-            )
+        signs = self.decode_vertical_lines(signs, corrected)
 
         # 2D matching on horizontal planes.
         L_z = self.code.size[2]
         for z_plane in range(1, 2*L_z, 2):
             signs = self.match_horizontal_plane(
-                signs, correction, z_plane
+                signs, corrected, z_plane
             )
-        return self.code.to_bsf(correction)
+
+        correction = np.zeros(2*self.code.n, dtype=np.uint)
+        correction[self.code.n:] = corrected
+        return correction
 
     def match_horizontal_plane(
-        self, signs: np.ndarray, correction: Dict,
+        self, signs: np.ndarray, corrected: np.ndarray,
         z_plane: int
     ):
-        """Do 2D matching on top and bottom boundary surfaces."""
-        face_coordinates = [
-            location
-            for location in self.code.stabilizer_coordinates
-            if self.code.stabilizer_type(location) == 'face'
-        ]
-        edges = sorted([
-            (x, y, z) for x, y, z in self.code.qubit_coordinates if z == z_plane
-        ])
-        faces = sorted([
-            (x, y, z) for x, y, z in face_coordinates if z == z_plane
-        ])
-        edge_index = {
-            location: index for index, location in enumerate(edges)
-        }
-
-        # Construct the check matrix for PyMatching.
-        check_matrix = np.zeros((len(faces), len(edges)), dtype=np.uint)
-        for i_face, (x, y, z) in enumerate(faces):
-            neighbouring_edges = [
-                (x + 1, y + 1, z),
-                (x - 1, y + 1, z),
-                (x - 1, y - 1, z),
-                (x + 1, y - 1, z),
-            ]
-            for edge in neighbouring_edges:
-                if edge in edge_index:
-                    check_matrix[i_face, edge_index[edge]] = 1
-        matcher = Matching(check_matrix)
-
-        surface_syndromes = np.array([
-            signs[self.code.stabilizer_index[face]]
-            for face in faces
-        ], dtype=np.uint)
+        """Do 2D matching on top and bottom boundary surfaces.
+
+        The edges of the matching are flipped in `corrected`, a boolean
+        array over the qubits, in place.
+        """
+        faces, edges, matcher = self._plane_matchers[z_plane]
 
+        surface_syndromes = signs[faces].astype(np.uint)
         surface_corrections = matcher.decode(
             surface_syndromes, num_neighbours=None
         )
 
         new_signs = signs.copy()
-        for i_edge in np.where(surface_corrections)[0]:
-            location = edges[i_edge]
-            self.flip_edge(location, new_signs)
-            self.code.site(correction, 'Z', location)
+        flipped_edges = edges[np.flatnonzero(surface_corrections)]
+        self._flip_edges(flipped_edges, new_signs)
+        corrected[flipped_edges] ^= True
 
         return new_signs
 
-    def decode_vertical_line(
-        self, signs: np.ndarray, correction: Dict,
-        xy: Tuple[int, int]
+    def decode_vertical_lines(
+        self, signs: np.ndarray, corrected: np.ndarray
     ):
-        """Do 1D matching along a vertical line."""
-        L_z = self.code.size[2]
-        x, y = xy
+        """Do 1D matching along all the vertical lines at once.
 
-        flip_locations = []
+        The edges of the matching are flipped in `corrected`, a boolean
+        array over the qubits, in place.
+        """
+        line_syndromes = signs[self._line_faces].astype(bool)
 
-        line_faces = [
-            (x, y, 2*i + 2)
-            for i in range(L_z-1)
-        ]
-        line_syndromes = np.array([
-            signs[self.code.stabilizer_index[face]]
-            for face in line_faces
-        ])
-        n_syndromes = sum(line_syndromes)
-        if n_syndromes:
-            syndrome_locations = np.sort(np.where(line_syndromes)[0]).tolist()
-            segments = split_posts_at_active_fences(
-                active_fences=syndrome_locations,
-                n_fences=L_z
-            )
-            segments_even = segments[::2]
-            segments_odd = segments[1::2]
-            len_segments_even = sum(map(len, segments_even))
-            len_segments_odd = sum(map(len, segments_odd))
-            if len_segments_even <= len_segments_odd:
-                chosen_segments = segments_even
-            else:
-                chosen_segments = segments_odd
-            flip_sites = [i for segment in chosen_segments for i in segment]
-
-            for flip_site in flip_sites:
-                z = 2*flip_site + 1
-                flip_locations.append((x, y, z))
+        # The posts of a line are its edges, plus one post above the top
+        # edge which is counted when choosing the segments but never
+        # flipped, as in `split_posts_at_active_fences`.
+        n_lines, n_edges = self._line_edges.shape
+        fences = np.zeros((n_lines, n_edges), dtype=bool)
+        fences[:, :n_edges - 1] = line_syndromes
+        posts = alternating_segment_posts(fences)[:, :n_edges]
 
         new_signs = signs.copy()
-        for location in flip_locations:
-            self.flip_edge(location, new_signs)
-            self.code.site(correction, 'Z', location)
+        flipped_edges = self._line_edges[posts]
+        self._flip_edges(flipped_edges, new_signs)
+        corrected[flipped_edges] ^= True
+
         return new_signs
 
 
 class XLineDecoder(BaseDecoder):
+    """Decoder of the point sector, matching the X errors along each
+    vertical line of vertices.
+
+    Each line is a path with no boundary, so its matching is given in closed
+    form by the parity of the syndromes below each edge, and all the lines
+    are decoded at once.
+    """
 
     label = 'Rotated Infinite Z Bias Point Sector Decoder'
 
-    def decode_line(
-        self, syndrome: np.ndarray, xy: Tuple[int, int]
-    ) -> np.ndarray:
-        x, y = xy
+    def __init__(self, code: StabilizerCode,
+                 error_model: BaseErrorModel,
+                 error_rate: float):
+        super().__init__(code, error_model, error_rate)
+        self._build_line_tables()
+
+    def _build_line_tables(self):
+        """Build the indices of the vertices and vertical edges of the lines.
+
+        `_line_vertices` has shape (n_lines, L_z) and `_line_edges` has
+        shape (n_lines, L_z - 1), ordered by increasing z along each line.
+        """
         L_z = self.code.size[2]
+        xy = np.array(sorted([
+            (x, y) for x, y, z in self.code.qubit_index if z == 2
+        ]), dtype=int).reshape(-1, 2)
 
-        edges = [
-            (x, y, 2*i + 2)
-            for i in range(L_z - 1)
-        ]
-        vertices = [
-            (x, y, 2*i + 1)
-            for i in range(L_z)
-        ]
-        edge_index = {
-            location: index for index, location in enumerate(edges)
-        }
-
-        # Construct the check matrix for PyMatching.
-        check_matrix = np.zeros((len(vertices), len(edges)), dtype=np.uint)
-        for i_vertex, (x, y, z) in enumerate(vertices):
-            neighbouring_edges = [
-                (x, y, z + 1),
-                (x, y, z - 1),
-            ]
-            for edge in neighbouring_edges:
-                if edge in edges:
-                    check_matrix[i_vertex, edge_index[edge]] = 1
-        matcher = Matching(check_matrix)
-
-        line_syndromes = np.array([
-            syndrome[self.code.stabilizer_index[vertex]]
-            for vertex in vertices
-        ], dtype=np.uint)
-
-        line_corrections = matcher.decode(
-            line_syndromes, num_neighbours=None
+        def line_locations(z_values):
+            locations = np.zeros((len(xy), len(z_values), 3), dtype=int)
+            locations[:, :, :2] = xy[:, None, :]
+            locations[:, :, 2] = z_values
+            return locations
+
+        self._line_vertices = self.code.stabilizer_indices(
+            line_locations(np.arange(1, 2*L_z, 2))
+        )
+        self._line_edges = self.code.qubit_indices(
+            line_locations(np.arange(2, 2*L_z - 1, 2))
         )
 
-        x_correction = np.zeros(self.code.n, dtype=np.uint)
-        for i_edge in np.where(line_corrections)[0]:
-            x_correction[self.code.qubit_index[edges[i_edge]]] = 1
+    def decode_lines(self, syndrome: np.ndarray) -> np.ndarray:
+        """Get the X correction on the vertical edges of all the lines.
+
+        Returns
+        -------
+        x_correction : np.ndarray
+            The X part of the correction, of length n.
+        """
+        line_syndromes = syndrome[self._line_vertices].astype(np.uint8)
+        parities = np.cumsum(line_syndromes, axis=1) % 2
+
+        # There is no boundary to match a lone syndrome with.
+        if np.any(parities[:, -1]):
+            raise ValueError(
+                'No perfect matching could be found, '
+                'a line has an odd number of syndromes.'
+            )
 
+        x_correction = np.zeros(self.code.n, dtype=np.uint)
+        x_correction[self._line_edges[parities[:, :-1] == 1]] = 1
         return x_correction
 
     def decode(
@@ -190,29 +253,29 @@ class XLineDecoder(BaseDecoder):
         # Initialize correction as full bsf.
         n_qubits = self.code.n
         correction = np.zeros(2*n_qubits, dtype=np.uint)
-        x_correction = np.zeros(n_qubits, dtype=np.uint)
-
-        lines_xy = sorted([
-            (x, y) for x, y, z in self.code.qubit_index if z == 2
-        ])
-        for xy in lines_xy:
-            x_correction += self.decode_line(syndrome, xy)
 
         # Load it into the X block of the full bsf.
-        correction[:n_qubits] = x_correction
+        correction[:n_qubits] = self.decode_lines(syndrome)
 
         return correction
 
 
 class RotatedInfiniteZBiasDecoder(BaseDecoder):
-    """An optimal decoder for infinite Z bias on deformed noise."""
+    """An optimal decoder for infinite Z bias on deformed noise.
+
+    Its two sectors are decoded as given by `sector_executor`, 'serial' or
+    'thread', as in `run_sectors`.
+    """
 
     label = 'Rotated Infinite Z Bias Decoder'
     matcher: XLineDecoder
     sweeper: ZMatchingDecoder
 
-    def __init__(self, code, error_model, error_rate):
+    def __init__(self, code, error_model, error_rate,
+                 sector_executor: str = 'serial'):
         super().__init__(code, error_model, error_rate)
+        check_sector_executor(sector_executor)
+        self.sector_executor = sector_executor
         self.matcher = XLineDecoder(code, error_model, error_rate)
         self.sweeper = ZMatchingDecoder(code, error_model, error_rate)
 
@@ -220,8 +283,10 @@ class RotatedInfiniteZBiasDecoder(BaseDecoder):
         self, syndrome: np.ndarray, **kwargs
     ) -> np.ndarray:
 
-        z_correction = self.sweeper.decode(syndrome)
-        x_correction = self.matcher.decode(syndrome)
+        z_correction, x_correction = run_sectors([
+            lambda: self.sweeper.decode(syndrome),
+            lambda: self.matcher.decode(syndrome),
+        ], self.sector_executor)
 
         correction = (z_correction + x_correction) % 2
         correction = correction.astype(np.uint)
@@ -241,3 +306,37 @@ def split_posts_at_active_fences(
             segment = []
     segments.append(segment)
     return segments
+
+
+def alternating_segment_posts(fences: np.ndarray) -> np.ndarray:
+    """Vectorized choice of the alternating segments of several lines.
+
+    Each line of posts is split into segments at its active fences, as in
+    `split_posts_at_active_fences`, and either the even or the odd segments
+    are chosen, whichever have fewer posts, the even ones in case of a tie.
+
+    Parameters
+    ----------
+    fences : np.ndarray
+        Boolean array of shape (n_lines, n_fences) of the active fences of
+        each line.
+
+    Returns
+    -------
+    posts : np.ndarray
+        Boolean array of shape (n_lines, n_fences + 1) of the posts in the
+        chosen segments, with no post chosen on the lines having no active
+        fence.
+    """
+    n_lines, n_fences = fences.shape
+
+    # Parity of the segment of each post, which is the number of active
+    # fences before it.
+    odd_segment = np.zeros((n_lines, n_fences + 1), dtype=bool)
+    odd_segment[:, 1:] = np.cumsum(fences, axis=1) % 2 == 1
+
+    n_odd = odd_segment.sum(axis=1)
+    choose_odd = n_fences + 1 - n_odd > n_odd
+    posts = odd_segment == choose_odd[:, None]
+    posts[~np.any(fences, axis=1)] = False
+    return posts
@@ -1,5 +1,6 @@
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Optional
 import numpy as np
+from scipy.sparse import csc_matrix
 from pymatching import Matching
 from panqec.codes import StabilizerCode
 from panqec.decoders import BaseDecoder
@@ -8,9 +9,101 @@ from .. import (
     SweepDecoder3D, Toric3DMatchingDecoder, RotatedPlanarMatchingDecoder,
     RotatedSweepDecoder3D
 )
+from ..base._sector_executor import check_sector_executor, run_sectors
+
+
+class SharedMatchingGraph:
+    """Matching graph of a check matrix, shared by all the decoders of a
+    code whatever their edge weights.
+
+    The graph is only built once, and each decoder swaps in its weights with
+    `set_weights` before decoding, which replaces the weights of the edges
+    in place instead of building a new graph.
+
+    Parameters
+    ----------
+    check_matrix : csc_matrix
+        Check matrix whose columns have weight 1 (boundary edges) or 2.
+    """
+
+    def __init__(self, check_matrix):
+        self.check_matrix = csc_matrix(check_matrix)
+        self.matcher: Optional[Matching] = None
+        self.weights: Optional[np.ndarray] = None
+
+        # The two nodes of the edge of each column, the boundary node being
+        # the node after the last check.
+        n_checks, n_columns = self.check_matrix.shape
+        degrees = np.diff(self.check_matrix.indptr)
+        self._columns = np.flatnonzero(degrees > 0)
+        self._nodes = np.full((n_columns, 2), n_checks)
+        for i_node in range(2):
+            has_node = degrees > i_node
+            self._nodes[has_node, i_node] = self.check_matrix.indices[
+                self.check_matrix.indptr[:-1][has_node] + i_node
+            ]
+        self._nodes = self._nodes[self._columns]
+
+        # Columns with the same nodes are parallel edges, of which PyMatching
+        # only keeps the one with the smallest weight.
+        _, self._edge_ids = np.unique(
+            self._nodes, axis=0, return_inverse=True
+        )
+        self._edge_ids = self._edge_ids.ravel()
+
+    def set_weights(self, weights: np.ndarray) -> Matching:
+        """Set the weights of the edges, one per column of the check matrix,
+        and return the matcher."""
+        if self.weights is not None and (
+            self.weights is weights or np.array_equal(self.weights, weights)
+        ):
+            return self.matcher
+
+        if self.matcher is None:
+            self.matcher = Matching(
+                self.check_matrix, spacelike_weights=weights
+            )
+        else:
+            # Keep the first column of smallest weight of each edge, as
+            # PyMatching does when building the graph.
+            order = np.lexsort((
+                np.arange(len(self._columns)), weights[self._columns],
+                self._edge_ids
+            ))
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = np.diff(self._edge_ids[order]) != 0
+            for i_column in order[first]:
+                column = self._columns[i_column]
+                node_1, node_2 = self._nodes[i_column]
+                self.matcher.add_edge(
+                    node_1, node_2, fault_ids={column},
+                    weight=weights[column], merge_strategy='replace'
+                )
+        self.weights = np.array(weights)
+        return self.matcher
+
+
+_MATCHING_GRAPHS: Dict[Tuple, SharedMatchingGraph] = {}
+
+
+def clear_matching_graphs():
+    """Remove all the shared matching graphs, to free their memory."""
+    _MATCHING_GRAPHS.clear()
+
+
+def get_shared_matching_graph(code: StabilizerCode) -> SharedMatchingGraph:
+    """Matching graph of the Z stabilizers of a code, shared by all the
+    deformed matching decoders of that code."""
+    key = (type(code), code.size, code._deformed_axis)
+    if key not in _MATCHING_GRAPHS:
+        _MATCHING_GRAPHS[key] = SharedMatchingGraph(code.Hz)
+    return _MATCHING_GRAPHS[key]
 
 
 class DeformedToric3DMatchingDecoder(Toric3DMatchingDecoder):
+    """Matching decoder for deformed noise, whose matching graph is shared
+    by all the decoders of the same code."""
+
     code: StabilizerCode
     error_rate: float
     error_model: PauliErrorModel
@@ -25,16 +118,34 @@ class DeformedToric3DMatchingDecoder(Toric3DMatchingDecoder):
         super().__init__(code, error_model, error_rate)
 
     def get_matcher(self):
-        """Return a new Matching object."""
+        """Return the shared Matching object, with the weights of this
+        decoder."""
         # Get the number of X stabilizers (faces).
         n_faces: int = int(3*np.product(self.code.size))
         self._n_faces[self.code.label] = n_faces
 
-        # Only keep the Z vertex stabilizers.
-        H_z = self.code.Hz
-        weights = self.get_deformed_weights()
-        print("weights", weights)
-        return Matching(H_z, spacelike_weights=weights)
+        # Only keep the Z vertex stabilizers, in the graph shared with the
+        # other decoders of the code.
+        self._weights = self.get_deformed_weights()
+        self._graph = get_shared_matching_graph(self.code)
+        return self._graph.set_weights(self._weights)
+
+    def __getstate__(self) -> dict:
+        """Leave out the shared matching graph, which is shared again
+        when unpickled."""
+        state = super().__getstate__()
+        del state['_graph']
+        return state
+
+    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
+        """Get X corrections given code and measured syndrome."""
+        self._graph.set_weights(self._weights)
+        return super().decode(syndrome, **kwargs)
+
+    def decode_batch(self, syndromes: np.ndarray, **kwargs) -> np.ndarray:
+        """Get X corrections of a batch of syndromes at once."""
+        self._graph.set_weights(self._weights)
+        return super().decode_batch(syndromes, **kwargs)
 
     def get_deformed_weights(self) -> np.ndarray:
         """Get MWPM weights for deformed Pauli noise."""
@@ -71,13 +182,14 @@ class DeformedSweepDecoder3D(SweepDecoder3D):
 
         return p_edges
 
-    def get_default_direction(self):
+    def get_default_directions(self, n_vertices: int) -> np.ndarray:
         """Use most likely direction based on noise."""
-        direction = int(self._rng.choice([0, 1, 2], size=1, p=self._p_edges))
-        return direction
+        return self._rng.choice([0, 1, 2], size=n_vertices, p=self._p_edges)
 
 
 class DeformedSweepMatchDecoder(BaseDecoder):
+    """Sweep and matching decoder for deformed noise, whose sectors are
+    decoded as given by `sector_executor`, as in `SweepMatchDecoder`."""
 
     label = 'Deformed Toric 3D Sweep Matching Decoder'
     sweeper: BaseDecoder
@@ -85,7 +197,10 @@ class DeformedSweepMatchDecoder(BaseDecoder):
 
     def __init__(self, code: StabilizerCode,
                  error_model: BaseErrorModel,
-                 error_rate: float):
+                 error_rate: float,
+                 sector_executor: str = 'serial'):
+        check_sector_executor(sector_executor)
+        self.sector_executor = sector_executor
         self.sweeper = DeformedSweepDecoder3D(
             code, error_model, error_rate
         )
@@ -98,19 +213,39 @@ class DeformedSweepMatchDecoder(BaseDecoder):
     ) -> np.ndarray:
         """Get X and Z corrections given code and measured syndrome."""
 
-        z_correction = self.sweeper.decode(syndrome)
-        x_correction = self.matcher.decode(syndrome)
+        z_correction, x_correction = run_sectors([
+            lambda: self.sweeper.decode(syndrome),
+            lambda: self.matcher.decode(syndrome),
+        ], self.sector_executor)
 
         correction = (z_correction + x_correction) % 2
         correction = correction.astype(np.uint)
         return correction
 
+    def decode_batch(
+        self, syndromes: np.ndarray, **kwargs
+    ) -> np.ndarray:
+        """Get X and Z corrections of a batch of syndromes, each sector
+        decoding the whole batch at once."""
+
+        z_corrections, x_corrections = run_sectors([
+            lambda: self.sweeper.decode_batch(syndromes),
+            lambda: self.matcher.decode_batch(syndromes),
+        ], self.sector_executor)
+
+        corrections = (z_corrections + x_corrections) % 2
+        corrections = corrections.astype(np.uint)
+        return corrections
+
 
 class DeformedRotatedSweepMatchDecoder(DeformedSweepMatchDecoder):
 
     def __init__(self, code: StabilizerCode,
                  error_model: BaseErrorModel,
-                 error_rate: float):
+                 error_rate: float,
+                 sector_executor: str = 'serial'):
+        check_sector_executor(sector_executor)
+        self.sector_executor = sector_executor
         self.sweeper = RotatedSweepDecoder3D(code, error_model, error_rate)
         self.matcher = DeformedRotatedPlanarMatchingDecoder(
             code, error_model, error_rate
@@ -118,13 +253,16 @@ class DeformedRotatedSweepMatchDecoder(DeformedSweepMatchDecoder):
 
 
 class DeformedRotatedPlanarMatchingDecoder(RotatedPlanarMatchingDecoder):
+    """Matching decoder for deformed noise on the rotated planar code, whose
+    matching graph is shared by all the decoders of the same code."""
 
     def __init__(self, code, error_model: BaseErrorModel, error_rate: float):
         self._epsilon = 1e-15
         super().__init__(code, error_model, error_rate)
 
     def get_matcher(self):
-        """Return a new Matching object."""
+        """Return the shared Matching object, with the weights of this
+        decoder."""
         # Get the number of X stabilizers (faces).
         n_faces = len([
             location
@@ -135,10 +273,28 @@ class DeformedRotatedPlanarMatchingDecoder(RotatedPlanarMatchingDecoder):
         n_qubits = self.code.n
         self._n_qubits[self.code.label] = n_qubits
 
-        # Only keep the Z vertex stabilizers.
-        H_z = self.code.Hz
-        weights = self.get_deformed_weights()
-        return Matching(H_z, spacelike_weights=weights)
+        # Only keep the Z vertex stabilizers, in the graph shared with the
+        # other decoders of the code.
+        self._weights = self.get_deformed_weights()
+        self._graph = get_shared_matching_graph(self.code)
+        return self._graph.set_weights(self._weights)
+
+    def __getstate__(self) -> dict:
+        """Leave out the shared matching graph, which is shared again
+        when unpickled."""
+        state = super().__getstate__()
+        del state['_graph']
+        return state
+
+    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
+        """Get X corrections given code and measured syndrome."""
+        self._graph.set_weights(self._weights)
+        return super().decode(syndrome, **kwargs)
+
+    def decode_batch(self, syndromes: np.ndarray, **kwargs) -> np.ndarray:
+        """Get X corrections of a batch of syndromes at once."""
+        self._graph.set_weights(self._weights)
+        return super().decode_batch(syndromes, **kwargs)
 
     def get_deformed_weights(self) -> np.ndarray:
         """Get MWPM weights for deformed Pauli noise."""
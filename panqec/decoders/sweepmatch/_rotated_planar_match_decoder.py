@@ -29,7 +29,7 @@ class RotatedPlanarMatchingDecoder(Toric3DMatchingDecoder):
 
         return Matching(self.code.Hz)
 
-    def decode(self, syndrome: np.ndarray) -> np.ndarray:
+    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
         """Get X corrections given code and measured syndrome."""
 
         # Initialize correction as full bsf.
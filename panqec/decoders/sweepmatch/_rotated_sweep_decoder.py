@@ -1,17 +1,25 @@
-from typing import Tuple, Dict
+from typing import Tuple, Dict, List, Optional
 import numpy as np
 from panqec.decoders import BaseDecoder
 from panqec.codes import StabilizerCode
 from panqec.error_models import BaseErrorModel
+from ._sweep_decoder_3d import odd_indices, invert_table, gather_rows
 
 Operator = Dict[Tuple, str]
 
 
 class RotatedSweepDecoder3D(BaseDecoder):
+    """Sweep decoder of the rotated 3D codes, sweeping in 8 directions.
+
+    As in `SweepDecoder3D`, the sweep rule is only applied on the vertices
+    next to the excited faces when at most `frontier_fraction` of the
+    stabilizers are excited.
+    """
 
     label = 'Rotated Code 3D Sweep Decoder'
     _rng: np.random.Generator
     max_rounds: int
+    frontier_fraction: float = 0.02
 
     def __init__(self, code: StabilizerCode,
                  error_model: BaseErrorModel,
@@ -22,6 +30,85 @@ class RotatedSweepDecoder3D(BaseDecoder):
         self._rng = np.random.default_rng(seed)
         self.max_rounds = max_rounds
 
+        # Index tables of the lattice, built at the first sweep.
+        self._sweep_tables: Optional[Dict[Tuple, Tuple]] = None
+        self._edge_faces: Optional[np.ndarray] = None
+        self._face_vertices: Optional[Dict[Tuple, Tuple]] = None
+
+    # Sweep directions to take
+    sweep_directions: List[Tuple[int, int, int]] = [
+        (1, 0, 1), (1, 0, -1),
+        (0, 1, 1), (0, 1, -1),
+        (-1, 0, 1), (-1, 0, -1),
+        (0, -1, 1), (0, -1, -1),
+    ]
+
+    def _build_tables(self):
+        """Build the index tables used by the sweep rule.
+
+        For each sweep direction, `_sweep_tables` gives a tuple
+        `(vertices, faces, edges)`, where `vertices` are the indices of the
+        vertices whose three sweep faces and three sweep edges are all in the
+        lattice, in the order of `stabilizer_coordinates`, and `faces` and
+        `edges` are arrays of shape (n_vertices, 3) with the indices of their
+        x, y and z faces and edges.
+        `_edge_faces` has shape (n_qubits, 4) and gives the faces around each
+        edge, with -1 for the faces not in the lattice.
+        `_face_vertices` gives for each sweep direction the rows of the
+        tables having each face as a sweep face, as returned by
+        `invert_table`.
+        """
+        code = self.code
+        face_type = code.stabilizer_types.index('face')
+        vertex_type = code.stabilizer_types.index('vertex')
+
+        vertex_indices = np.flatnonzero(
+            code.stabilizer_type_codes == vertex_type
+        )
+        vertices = np.array(code.stabilizer_coordinates)[vertex_indices]
+
+        def face_indices(locations):
+            indices = code.stabilizer_indices(locations)
+            is_face = indices >= 0
+            is_face[is_face] = (
+                code.stabilizer_type_codes[indices[is_face]] == face_type
+            )
+            return np.where(is_face, indices, -1)
+
+        self._sweep_tables = dict()
+        self._face_vertices = dict()
+        for sweep_direction in self.sweep_directions:
+            # Sweep faces and edges of the origin, as offsets.
+            face_offsets = np.array(
+                self.get_sweep_faces((0, 0, 0), sweep_direction)
+            )
+            edge_offsets = np.array(
+                self.get_sweep_edges((0, 0, 0), sweep_direction)
+            )
+            faces = face_indices(vertices[:, None, :] + face_offsets)
+            edges = code.qubit_indices(vertices[:, None, :] + edge_offsets)
+            valid = np.all(faces >= 0, axis=1) & np.all(edges >= 0, axis=1)
+            self._sweep_tables[sweep_direction] = (
+                vertex_indices[valid], faces[valid], edges[valid]
+            )
+            self._face_vertices[sweep_direction] = invert_table(
+                faces[valid], code.n_stabilizers
+            )
+
+        # Faces around each edge, depending on the axis of the edge.
+        qubits = np.array(code.qubit_coordinates)
+        x, y, z = qubits.T
+        is_z = z % 2 == 0
+        is_x = ~is_z & (((x % 4 == 1) & (y % 4 == 1))
+                        | ((x % 4 == 3) & (y % 4 == 3)))
+        offsets = np.zeros((len(qubits), 4, 3), dtype=int)
+        offsets[is_x] = [[1, 1, 0], [-1, -1, 0], [0, 0, 1], [0, 0, -1]]
+        offsets[~is_x & ~is_z] = [
+            [1, -1, 0], [-1, 1, 0], [0, 0, 1], [0, 0, -1]
+        ]
+        offsets[is_z] = [[1, 1, 0], [-1, -1, 0], [-1, 1, 0], [1, -1, 0]]
+        self._edge_faces = face_indices(qubits[:, None, :] + offsets)
+
     def get_face_syndromes(
         self, full_syndrome: np.ndarray
     ) -> np.ndarray:
@@ -52,35 +139,55 @@ class RotatedSweepDecoder3D(BaseDecoder):
 
         # The syndromes represented as an array of 0s and 1s.
         signs = self.get_initial_state(syndrome)
+        excited = np.flatnonzero(signs)
 
-        # Keep track of the correction needed.
-        correction: Dict = dict()
-
-        # Sweep directions to take
-        sweep_directions = [
-            (1, 0, 1), (1, 0, -1),
-            (0, 1, 1), (0, 1, -1),
-            (-1, 0, 1), (-1, 0, -1),
-            (0, -1, 1), (0, -1, -1),
-        ]
+        # Keep track of the edges on which a Z correction is applied.
+        corrected = np.zeros(self.code.n, dtype=bool)
 
         # Keep sweeping in all directions until there are no syndromes.
         i_round = 0
-        while any(signs) and i_round < self.max_rounds:
-            for sweep_direction in sweep_directions:
+        while len(excited) > 0 and i_round < self.max_rounds:
+            for sweep_direction in self.sweep_directions:
 
                 # Initialize the number of sweeps.
                 i_sweep = 0
 
                 # Keep sweeping until there are no syndromes.
-                while any(signs) and i_sweep < max_sweeps:
-                    signs = self.sweep_move(
-                        signs, correction, sweep_direction
+                while len(excited) > 0 and i_sweep < max_sweeps:
+                    flipped_edges = self._sweep_rule(
+                        signs, sweep_direction,
+                        self._frontier(excited, sweep_direction)
                     )
+                    flipped_faces = self._flip_edges(flipped_edges, signs)
+                    corrected[odd_indices(flipped_edges)] ^= True
                     i_sweep += 1
+
+                    # Sweeping again in the same direction would not flip
+                    # anything either.
+                    if len(flipped_edges) == 0:
+                        break
+
+                    # Only the flipped faces can have changed.
+                    excited = np.union1d(excited, flipped_faces)
+                    excited = excited[signs[excited] == 1]
             i_round += 1
 
-        return self.code.to_bsf(correction)
+        correction = np.zeros(2*self.code.n, dtype=np.uint)
+        correction[self.code.n:] = corrected
+        return correction
+
+    def _frontier(
+        self, excited: np.ndarray, sweep_direction: Tuple[int, int, int]
+    ) -> Optional[np.ndarray]:
+        """Rows of the sweep tables next to the excited faces, in increasing
+        order, or None for all the rows if the excited faces are not
+        sparse."""
+        if self._face_vertices is None:
+            self._build_tables()
+        assert self._face_vertices is not None
+        if len(excited) > self.frontier_fraction*self.code.n_stabilizers:
+            return None
+        return gather_rows(self._face_vertices[sweep_direction], excited)
 
     def get_sweep_faces(self, vertex, sweep_direction):
         """Get the coordinates of neighboring faces in sweep direction."""
@@ -127,127 +234,97 @@ class RotatedSweepDecoder3D(BaseDecoder):
 
     def get_default_direction(self):
         """The default direction when all faces are excited."""
-        direction = int(self._rng.choice([0, 1, 2], size=1))
+        direction = int(self.get_default_directions(1)[0])
         return direction
 
+    def get_default_directions(self, n_vertices: int) -> np.ndarray:
+        """The default directions of several vertices whose faces are all
+        excited, drawn at once. Drawing them at once gives the same
+        directions as calling `get_default_direction` for each vertex."""
+        return self._rng.choice([0, 1, 2], size=n_vertices)
+
     def sweep_move(
         self, signs: np.ndarray, correction: Operator,
         sweep_direction: Tuple[int, int, int]
     ) -> np.ndarray:
         """Apply the sweep move once along a particular direciton."""
 
-        flip_locations = []
-
-        # Apply sweep rule on every vertex.
-        for vertex in self.code.stabilizer_coordinates:
-            if self.code.stabilizer_type(vertex) == 'vertex':
-                # Get neighbouring faces and edges in the sweep direction.
-                x_face, y_face, z_face = self.get_sweep_faces(
-                    vertex, sweep_direction
-                )
-                x_edge, y_edge, z_edge = self.get_sweep_edges(
-                    vertex, sweep_direction
-                )
-
-                # Check faces and edges are in lattice before proceeding.
-                faces_valid = tuple(
-                    self.code.is_stabilizer(face, 'face')
-                    for face in [x_face, y_face, z_face]
-                )
-                edges_valid = tuple(
-                    edge in self.code.qubit_index
-                    for edge in [x_edge, y_edge, z_edge]
-                )
-                if all(faces_valid) and all(edges_valid):
-
-                    x_face_index = self.code.stabilizer_index[x_face]
-                    y_face_index = self.code.stabilizer_index[y_face]
-                    z_face_index = self.code.stabilizer_index[z_face]
-                    if (
-                        signs[x_face_index] and signs[y_face_index]
-                        and signs[z_face_index]
-                    ):
-                        direction = self.get_default_direction()
-                        edge_flip = {
-                            0: x_edge, 1: y_edge, 2: z_edge
-                        }[direction]
-                        flip_locations.append(edge_flip)
-                    elif signs[y_face_index] and signs[z_face_index]:
-                        flip_locations.append(x_edge)
-                    elif signs[x_face_index] and signs[z_face_index]:
-                        flip_locations.append(y_edge)
-                    elif signs[x_face_index] and signs[y_face_index]:
-                        flip_locations.append(z_edge)
-
-                """
-                # Boundary case with only 1 face and 2 edges.
-                elif sum(faces_valid) == 1 and sum(edges_valid) == 2:
-                    i_face_valid = faces_valid.index(True)
-                    i_edge_invalid = edges_valid.index(False)
-                    i_edge_valid = edges_valid.index(True)
-                    # Check valid face is orthogonal to missing edge.
-                    if i_face_valid == i_edge_invalid:
-                        valid_face = [x_face, y_face, z_face][i_face_valid]
-                        valid_edge = [x_edge, y_edge, z_edge][i_edge_valid]
-                        # Flip an edge if the face has a syndrome.
-                        if signs[valid_face]:
-                            flip_locations.append(valid_edge)
-                """
-
         new_signs = signs.copy()
-        for location in flip_locations:
-            self.flip_edge(location, new_signs)
-            self.code.site(correction, 'Z', location)
+        flipped_edges = self._sweep_rule(signs, sweep_direction)
+        self._flip_edges(flipped_edges, new_signs)
+        for edge in flipped_edges:
+            self.code.site(
+                correction, 'Z', self.code.qubit_coordinates[edge]
+            )
 
         return new_signs
 
+    def _sweep_rule(
+        self, signs: np.ndarray, sweep_direction: Tuple[int, int, int],
+        rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Apply the sweep rule on several vertices at once.
+
+        Parameters
+        ----------
+        signs : np.ndarray
+            Signs before the sweep.
+        sweep_direction : Tuple[int, int, int]
+            Direction of the sweep.
+        rows : np.ndarray, optional
+            Rows of the sweep tables of the vertices on which to apply the
+            rule, in increasing order. By default all of them.
+
+        Returns
+        -------
+        flipped_edges : np.ndarray
+            Indices of the edges to flip, in the order of the vertices.
+        """
+        if self._sweep_tables is None:
+            self._build_tables()
+        assert self._sweep_tables is not None
+        vertices, faces, edges = self._sweep_tables[sweep_direction]
+        if rows is not None:
+            faces = faces[rows]
+            edges = edges[rows]
+
+        # Syndromes on the x, y and z faces in sweep direction.
+        x_face, y_face, z_face = signs[faces].astype(bool).T
+
+        # Direction of the edge to flip at each vertex, -1 for no flip.
+        directions = np.full(len(faces), -1)
+        directions[x_face & y_face] = 2
+        directions[x_face & z_face] = 1
+        directions[y_face & z_face] = 0
+        all_faces = np.flatnonzero(x_face & y_face & z_face)
+        if len(all_faces) > 0:
+            directions[all_faces] = self.get_default_directions(
+                len(all_faces)
+            )
+
+        flipping = np.flatnonzero(directions >= 0)
+        return edges[flipping, directions[flipping]]
+
     def flip_edge(self, edge: Tuple, signs: np.ndarray):
         """Flip signs at index and update correction."""
+        self._flip_edges(np.array([self.code.qubit_index[edge]]), signs)
+
+    def _flip_edges(
+        self, edges: np.ndarray, signs: np.ndarray
+    ) -> np.ndarray:
+        """Flip the signs of the faces around the given edges, in place.
+        A face flipped an even number of times is left unchanged.
 
-        x, y, z = edge
-
-        # Determine the axis the edge is parallel to.
-        if z % 2 == 0:
-            edge_direction = 'z'
-        elif x % 4 == 1:
-            if y % 4 == 1:
-                edge_direction = 'x'
-            elif y % 4 == 3:
-                edge_direction = 'y'
-        elif x % 4 == 3:
-            if y % 4 == 1:
-                edge_direction = 'y'
-            elif y % 4 == 3:
-                edge_direction = 'x'
-
-        # Get the faces adjacent to the edge.
-        if edge_direction == 'x':
-            faces = [
-                (x + 1, y + 1, z),
-                (x - 1, y - 1, z),
-                (x, y, z + 1),
-                (x, y, z - 1),
-            ]
-        elif edge_direction == 'y':
-            faces = [
-                (x + 1, y - 1, z),
-                (x - 1, y + 1, z),
-                (x, y, z + 1),
-                (x, y, z - 1),
-            ]
-        elif edge_direction == 'z':
-            faces = [
-                (x + 1, y + 1, z),
-                (x - 1, y - 1, z),
-                (x - 1, y + 1, z),
-                (x + 1, y - 1, z),
-            ]
-
-        # Only keep faces that are actually on the cut lattice.
-        faces = [face for face in faces if self.code.is_stabilizer(face, 'face')]
-
-        # Flip the state of the faces.
-        for face in faces:
-            signs[self.code.stabilizer_index[face]] = 1 - signs[
-                self.code.stabilizer_index[face]
-            ]
+        Returns
+        -------
+        flipped_faces : np.ndarray
+            Indices of the faces whose sign changed.
+        """
+        if self._edge_faces is None:
+            self._build_tables()
+        assert self._edge_faces is not None
+
+        faces = self._edge_faces[edges].ravel()
+        flipped_faces = odd_indices(faces[faces >= 0])
+        signs[flipped_faces] = 1 - signs[flipped_faces]
+        return flipped_faces
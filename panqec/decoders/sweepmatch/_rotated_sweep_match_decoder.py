@@ -15,8 +15,11 @@ class RotatedSweepMatchDecoder(SweepMatchDecoder):
     def __init__(self, code: StabilizerCode,
                  error_model: BaseErrorModel,
                  error_rate: float,
-                 max_rounds=32):
-        super().__init__(code, error_model, error_rate)
+                 max_rounds=32,
+                 sector_executor: str = 'serial'):
+        super().__init__(
+            code, error_model, error_rate, sector_executor=sector_executor
+        )
         self.sweeper = RotatedSweepDecoder3D(
             code, error_model, error_rate, max_rounds=max_rounds
         )
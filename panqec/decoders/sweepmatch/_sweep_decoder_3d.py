@@ -1,4 +1,4 @@
-from typing import Tuple, Dict
+from typing import Tuple, Dict, Optional
 import numpy as np
 from panqec.decoders import BaseDecoder
 from panqec.error_models import BaseErrorModel
@@ -7,11 +7,69 @@ from panqec.codes import Toric3DCode
 Operator = Dict[Tuple, str]
 
 
+def odd_indices(indices: np.ndarray) -> np.ndarray:
+    """Sorted indices appearing an odd number of times in an array."""
+    values, counts = np.unique(indices, return_counts=True)
+    return values[counts % 2 == 1]
+
+
+def invert_table(table: np.ndarray, n_keys: int) -> Tuple[np.ndarray, ...]:
+    """Rows of a table of indices containing each index.
+
+    Parameters
+    ----------
+    table : np.ndarray
+        Array of shape (n_rows, k) of indices in range(n_keys), or -1.
+    n_keys : int
+        Number of indices.
+
+    Returns
+    -------
+    indptr : np.ndarray
+        Array of size n_keys + 1, such that the rows containing the index i
+        are `rows[indptr[i]:indptr[i + 1]]`, as in the CSR format.
+    rows : np.ndarray
+        Rows containing each index, sorted by index.
+    """
+    keys = table.ravel()
+    rows = np.repeat(np.arange(table.shape[0]), table.shape[1])
+    rows = rows[keys >= 0]
+    keys = keys[keys >= 0]
+    order = np.argsort(keys, kind='stable')
+    indptr = np.concatenate([[0], np.cumsum(
+        np.bincount(keys, minlength=n_keys)
+    )])
+    return indptr, rows[order]
+
+
+def gather_rows(
+    inverse: Tuple[np.ndarray, ...], keys: np.ndarray
+) -> np.ndarray:
+    """Sorted rows containing any of the given indices, given the output
+    of `invert_table`."""
+    indptr, rows = inverse
+    starts = indptr[keys]
+    counts = indptr[keys + 1] - starts
+    positions = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    positions += np.arange(len(positions))
+    return np.unique(rows[positions])
+
+
 class SweepDecoder3D(BaseDecoder):
+    """Sweep decoder of the 3D toric code.
+
+    When only a small fraction of the faces are excited, at most
+    `frontier_fraction`, the sweep rule is only applied on the vertices next
+    to the excited faces, which are tracked as edges are flipped, so that the
+    cost of a sweep depends on the number of excited faces instead of the
+    size of the lattice. This gives the same correction as applying the rule
+    on all the vertices.
+    """
 
     label: str = 'Toric 3D Sweep Decoder'
     _rng: np.random.Generator
     max_sweep_factor: int
+    frontier_fraction: float = 0.02
 
     def __init__(self,
                  code: Toric3DCode,
@@ -23,6 +81,55 @@ class SweepDecoder3D(BaseDecoder):
         self._rng = np.random.default_rng(seed)
         self.max_sweep_factor = max_sweep_factor
 
+        # Index tables of the lattice, built at the first sweep.
+        self._vertex_faces: Optional[np.ndarray] = None
+        self._vertex_edges: Optional[np.ndarray] = None
+        self._edge_faces: Optional[np.ndarray] = None
+        self._face_vertices: Optional[Tuple[np.ndarray, ...]] = None
+
+    def _build_tables(self):
+        """Build the index tables giving the neighbours of each vertex and
+        edge, with periodic boundary conditions and -1 for missing sites.
+
+        `_vertex_faces` and `_vertex_edges` have shape (n_vertices, 3) and
+        give, for each vertex in the order of `z_indices`, the x, y and z
+        faces in the sweep direction and the x, y and z edges.
+        `_edge_faces` has shape (n_qubits, 4) and gives the faces
+        around each edge, and `_face_vertices` the vertices having each face
+        as a sweep face, as returned by `invert_table`.
+        """
+        L_x, L_y, L_z = self.code.size
+        limits = np.array([2*L_x, 2*L_y, 2*L_z])
+
+        vertices = np.array(self.code.stabilizer_coordinates)[
+            self.code.z_indices
+        ]
+        face_offsets = np.array([[0, 1, 1], [1, 0, 1], [1, 1, 0]])
+        edge_offsets = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]])
+        self._vertex_faces = self.code.stabilizer_indices(
+            (vertices[:, None, :] + face_offsets) % limits
+        )
+        self._vertex_edges = self.code.qubit_indices(
+            (vertices[:, None, :] + edge_offsets) % limits
+        )
+
+        # Faces around each edge, in the order of `flip_edge`.
+        edges = np.array(self.code.qubit_coordinates)
+        axis_offsets = {
+            (1, 0, 0): [[0, 1, 0], [0, -1, 0], [0, 0, 1], [0, 0, -1]],
+            (0, 1, 0): [[0, 0, 1], [0, 0, -1], [1, 0, 0], [-1, 0, 0]],
+            (0, 0, 1): [[1, 0, 0], [-1, 0, 0], [0, 1, 0], [0, -1, 0]],
+        }
+        offsets = np.zeros((len(edges), 4, 3), dtype=int)
+        for axis, axis_offset in axis_offsets.items():
+            offsets[np.all(edges % 2 == axis, axis=1)] = axis_offset
+        self._edge_faces = self.code.stabilizer_indices(
+            (edges[:, None, :] + offsets) % limits
+        )
+        self._face_vertices = invert_table(
+            self._vertex_faces, self.code.n_stabilizers
+        )
+
     def get_face_syndromes(
         self, full_syndrome: np.ndarray
     ) -> np.ndarray:
@@ -36,53 +143,46 @@ class SweepDecoder3D(BaseDecoder):
         self, location: Tuple, signs: np.ndarray
     ):
         """Flip signs at index and update correction."""
-        x, y, z = location
-        edge = tuple(np.mod(location, 2))
         L_x, L_y, L_z = self.code.size
-        limits = (2*L_x, 2*L_y, 2*L_z)
-
-        if edge == (1, 0, 0):
-            face_1 = (x, y + 1, z)
-            face_2 = (x, y - 1, z)
-            face_3 = (x, y, z + 1)
-            face_4 = (x, y, z - 1)
-        elif edge == (0, 1, 0):
-            face_1 = (x, y, z + 1)
-            face_2 = (x, y, z - 1)
-            face_3 = (x + 1, y, z)
-            face_4 = (x - 1, y, z)
-        elif edge == (0, 0, 1):
-            face_1 = (x + 1, y, z)
-            face_2 = (x - 1, y, z)
-            face_3 = (x, y + 1, z)
-            face_4 = (x, y - 1, z)
-
-        # Impose periodic boundary conditions.
-        location_1 = tuple(np.mod(face_1, limits))
-        location_2 = tuple(np.mod(face_2, limits))
-        location_3 = tuple(np.mod(face_3, limits))
-        location_4 = tuple(np.mod(face_4, limits))
-
-        # Flip the signs (well actually 0s and 1s).
-        if self.code.is_stabilizer(location_1):
-            signs[self.code.stabilizer_index[location_1]] = 1 - signs[self.code.stabilizer_index[location_1]]  # type: ignore # noqa
-        if self.code.is_stabilizer(location_2):
-            signs[self.code.stabilizer_index[location_2]] = 1 - signs[self.code.stabilizer_index[location_2]]  # type: ignore # noqa
-        if self.code.is_stabilizer(location_3):
-            signs[self.code.stabilizer_index[location_3]] = 1 - signs[self.code.stabilizer_index[location_3]]  # type: ignore # noqa
-        if self.code.is_stabilizer(location_4):
-            signs[self.code.stabilizer_index[location_4]] = 1 - signs[self.code.stabilizer_index[location_4]]  # type: ignore # noqa
+        location = tuple(np.mod(location, (2*L_x, 2*L_y, 2*L_z)))
+        self._flip_edges(
+            np.array([self.code.qubit_index[location]]), signs
+        )
+
+    def _flip_edges(
+        self, edges: np.ndarray, signs: np.ndarray
+    ) -> np.ndarray:
+        """Flip the signs of the faces around the given edges, in place.
+        A face flipped an even number of times is left unchanged.
+
+        Returns
+        -------
+        flipped_faces : np.ndarray
+            Indices of the faces whose sign changed.
+        """
+        if self._edge_faces is None:
+            self._build_tables()
+        assert self._edge_faces is not None
+
+        faces = self._edge_faces[edges].ravel()
+        flipped_faces = odd_indices(faces[faces >= 0])
+        signs[flipped_faces] = 1 - signs[flipped_faces]
+        return flipped_faces
 
     def get_default_direction(self):
         """The default direction when all faces are excited."""
-        direction = int(self._rng.choice([0, 1, 2], size=1))
+        direction = int(self.get_default_directions(1)[0])
         return direction
 
+    def get_default_directions(self, n_vertices: int) -> np.ndarray:
+        """The default directions of several vertices whose faces are all
+        excited, drawn at once. Drawing them at once gives the same
+        directions as calling `get_default_direction` for each vertex."""
+        return self._rng.choice([0, 1, 2], size=n_vertices)
+
     def get_initial_state(self, syndrome: np.ndarray) -> np.ndarray:
         """Get initial cellular automaton state from syndrome."""
         signs = syndrome.copy()
-        print("Syndrome", syndrome.shape)
-        print("Indices", len(self.code.z_indices))
         signs[self.code.z_indices] = 0
 
         return signs
@@ -95,19 +195,38 @@ class SweepDecoder3D(BaseDecoder):
 
         # The syndromes represented as an array of 0s and 1s.
         signs = self.get_initial_state(syndrome)
+        excited = np.flatnonzero(signs)
 
-        # Keep track of the correction needed.
-        correction: Dict = dict()
+        # Keep track of the edges on which a Z correction is applied.
+        corrected = np.zeros(self.code.n, dtype=bool)
 
         # Initialize the number of sweeps.
         i_sweep = 0
 
         # Keep sweeping until there are no syndromes.
-        while any(signs) and i_sweep < max_sweeps:
-            signs = self.sweep_move(signs, correction)
+        while len(excited) > 0 and i_sweep < max_sweeps:
+            flipped_edges = self._sweep_rule(signs, self._frontier(excited))
+            flipped_faces = self._flip_edges(flipped_edges, signs)
+            corrected[flipped_edges] = True
             i_sweep += 1
 
-        return self.code.to_bsf(correction)
+            # Only the flipped faces can have changed.
+            excited = np.union1d(excited, flipped_faces)
+            excited = excited[signs[excited] == 1]
+
+        correction = np.zeros(2*self.code.n, dtype='uint')
+        correction[self.code.n:] = corrected
+        return correction
+
+    def _frontier(self, excited: np.ndarray) -> Optional[np.ndarray]:
+        """Vertices next to the excited faces, in increasing order, or None
+        for all the vertices if the excited faces are not sparse."""
+        if self._face_vertices is None:
+            self._build_tables()
+        assert self._face_vertices is not None
+        if len(excited) > self.frontier_fraction*self.code.n_stabilizers:
+            return None
+        return gather_rows(self._face_vertices, excited)
 
     def sweep_move(
         self, signs: np.ndarray, correction: Operator
@@ -115,40 +234,56 @@ class SweepDecoder3D(BaseDecoder):
         """Apply the sweep move once."""
 
         new_signs = signs.copy()
+        flipped_edges = self._sweep_rule(signs)
+        self._flip_edges(flipped_edges, new_signs)
+        for edge in flipped_edges:
+            correction[self.code.qubit_coordinates[edge]] = 'Z'
+
+        return new_signs
 
-        flip_locations = []
+    def _sweep_rule(
+        self, signs: np.ndarray, vertices: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Apply the sweep rule on several vertices at once.
 
-        L_x, L_y, L_z = self.code.size
-        limits = (2*L_x, 2*L_y, 2*L_z)
-
-        # Sweep through every edge.
-        for x, y, z in np.array(self.code.stabilizer_coordinates)[self.code.z_indices]:  # type: ignore  # noqa: E501
-            # Get the syndromes on each face in sweep direction.
-            x_face_loc = tuple(np.mod((x, y + 1, z + 1), limits))
-            y_face_loc = tuple(np.mod((x + 1, y, z + 1), limits))
-            z_face_loc = tuple(np.mod((x + 1, y + 1, z), limits))
-            x_face = self.code.is_stabilizer(x_face_loc) and signs[self.code.stabilizer_index[x_face_loc]]  # type: ignore  # noqa: E501
-            y_face = self.code.is_stabilizer(y_face_loc) and signs[self.code.stabilizer_index[y_face_loc]]  # type: ignore  # noqa: E501
-            z_face = self.code.is_stabilizer(z_face_loc) and signs[self.code.stabilizer_index[z_face_loc]]  # type: ignore  # noqa: E501
-
-            x_edge = tuple(np.mod((x + 1, y, z), limits))
-            y_edge = tuple(np.mod((x, y + 1, z), limits))
-            z_edge = tuple(np.mod((x, y, z + 1), limits))
-
-            if x_face and y_face and z_face:
-                direction = self.get_default_direction()
-                flip_locations.append(
-                    {0: x_edge, 1: y_edge, 2: z_edge}[direction]
-                )
-            elif y_face and z_face:
-                flip_locations.append(x_edge)
-            elif x_face and z_face:
-                flip_locations.append(y_edge)
-            elif x_face and y_face:
-                flip_locations.append(z_edge)
-
-        for location in flip_locations:
-            self.flip_edge(location, new_signs)
-            correction[location] = 'Z'
+        Parameters
+        ----------
+        signs : np.ndarray
+            Signs before the sweep.
+        vertices : np.ndarray, optional
+            Vertices on which to apply the rule, in increasing order, as
+            indices in the order of `z_indices`. By default all of them.
 
-        return new_signs
+        Returns
+        -------
+        flipped_edges : np.ndarray
+            Indices of the edges to flip, in the order of the vertices.
+        """
+        if self._vertex_faces is None:
+            self._build_tables()
+        vertex_faces = self._vertex_faces
+        vertex_edges = self._vertex_edges
+        assert vertex_faces is not None and vertex_edges is not None
+        if vertices is not None:
+            vertex_faces = vertex_faces[vertices]
+            vertex_edges = vertex_edges[vertices]
+
+        # Syndromes on each face in sweep direction, 0 where there is none.
+        face_signs = np.where(
+            vertex_faces >= 0, signs[vertex_faces], 0
+        ).astype(bool)
+        x_face, y_face, z_face = face_signs.T
+
+        # Direction of the edge to flip at each vertex, -1 for no flip.
+        directions = np.full(len(face_signs), -1)
+        directions[y_face & z_face] = 0
+        directions[x_face & z_face] = 1
+        directions[x_face & y_face] = 2
+        all_faces = np.flatnonzero(x_face & y_face & z_face)
+        if len(all_faces) > 0:
+            directions[all_faces] = self.get_default_directions(
+                len(all_faces)
+            )
+
+        flipping = np.flatnonzero(directions >= 0)
+        return vertex_edges[flipping, directions[flipping]]
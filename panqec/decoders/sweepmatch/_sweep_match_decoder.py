@@ -4,9 +4,25 @@ from panqec.decoders import (
     BaseDecoder, SweepDecoder3D, Toric3DMatchingDecoder
 )
 from panqec.error_models import BaseErrorModel
+from ..base._sector_executor import check_sector_executor, run_sectors
 
 
 class SweepMatchDecoder(BaseDecoder):
+    """Sweep decoder for the Z errors and matching decoder for the X errors.
+
+    Parameters
+    ----------
+    code : StabilizerCode
+        Code to decode.
+    error_model : BaseErrorModel
+        Error model.
+    error_rate : float
+        Physical error rate.
+    sector_executor : str
+        How the two sectors are decoded, 'serial' for one after the other,
+        or 'thread' for both at once in a pool of threads, as in
+        `run_sectors`.
+    """
 
     label = 'Toric 3D Sweep + Matching Decoder'
     sweeper: SweepDecoder3D
@@ -14,17 +30,35 @@ class SweepMatchDecoder(BaseDecoder):
 
     def __init__(self, code: StabilizerCode,
                  error_model: BaseErrorModel,
-                 error_rate: float):
+                 error_rate: float,
+                 sector_executor: str = 'serial'):
         super().__init__(code, error_model, error_rate)
+        check_sector_executor(sector_executor)
+        self.sector_executor = sector_executor
         self.sweeper = SweepDecoder3D(code, error_model, error_rate)
         self.matcher = Toric3DMatchingDecoder(code, error_model, error_rate)
 
-    def decode(self, syndrome: np.ndarray) -> np.ndarray:
+    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
         """Get X and Z corrections given code and measured syndrome."""
 
-        z_correction = self.sweeper.decode(syndrome)
-        x_correction = self.matcher.decode(syndrome)
+        z_correction, x_correction = run_sectors([
+            lambda: self.sweeper.decode(syndrome),
+            lambda: self.matcher.decode(syndrome),
+        ], self.sector_executor)
 
         correction = (x_correction + z_correction) % 2
 
         return correction
+
+    def decode_batch(self, syndromes: np.ndarray, **kwargs) -> np.ndarray:
+        """Get X and Z corrections of a batch of syndromes, each sector
+        decoding the whole batch at once."""
+
+        z_corrections, x_corrections = run_sectors([
+            lambda: self.sweeper.decode_batch(syndromes),
+            lambda: self.matcher.decode_batch(syndromes),
+        ], self.sector_executor)
+
+        corrections = (x_corrections + z_corrections) % 2
+
+        return corrections
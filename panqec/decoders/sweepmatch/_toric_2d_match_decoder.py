@@ -3,6 +3,7 @@ from pymatching import Matching
 from panqec.decoders import BaseDecoder
 from panqec.codes import Toric2DCode
 from panqec.error_models import BaseErrorModel
+from panqec.decoders.base._match_batch import match_batch
 
 
 class Toric2DMatchingDecoder(BaseDecoder):
@@ -19,7 +20,18 @@ class Toric2DMatchingDecoder(BaseDecoder):
         self.matcher_z = Matching(self.code.Hz)
         self.matcher_x = Matching(self.code.Hx)
 
-    def decode(self, syndrome: np.ndarray) -> np.ndarray:
+    def __getstate__(self) -> dict:
+        """Leave out the Matching objects, which cannot be pickled."""
+        state = self.__dict__.copy()
+        del state['matcher_z'], state['matcher_x']
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.matcher_z = Matching(self.code.Hz)
+        self.matcher_x = Matching(self.code.Hx)
+
+    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
         """Get X corrections given code and measured syndrome."""
 
         # Initialize correction as full bsf.
@@ -39,3 +51,19 @@ class Toric2DMatchingDecoder(BaseDecoder):
         correction[self.code.n:] = correction_z
 
         return correction
+
+    def decode_batch(self, syndromes: np.ndarray, **kwargs) -> np.ndarray:
+        """Get corrections of a batch of syndromes at once."""
+
+        # Initialize corrections as full bsf.
+        corrections = np.zeros((len(syndromes), 2*self.code.n), dtype=np.uint)
+
+        syndromes_z = syndromes[:, self.code.z_indices]
+        syndromes_x = syndromes[:, self.code.x_indices]
+
+        # Match each block using corresponding syndromes but applying
+        # corrections on the other block.
+        corrections[:, :self.code.n] = match_batch(self.matcher_z, syndromes_z)
+        corrections[:, self.code.n:] = match_batch(self.matcher_x, syndromes_x)
+
+        return corrections
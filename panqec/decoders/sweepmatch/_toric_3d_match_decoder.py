@@ -6,6 +6,7 @@ from panqec.decoders import BaseDecoder
 from pymatching import Matching
 from panqec.codes import Toric3DCode
 from panqec.error_models import BaseErrorModel
+from panqec.decoders.base._match_batch import match_batch
 
 
 class Toric3DMatchingDecoder(BaseDecoder):
@@ -23,10 +24,20 @@ class Toric3DMatchingDecoder(BaseDecoder):
 
         self.matcher = self.get_matcher()
 
+    def __getstate__(self) -> dict:
+        """Leave out the Matching object, which cannot be pickled."""
+        state = self.__dict__.copy()
+        del state['matcher']
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.matcher = self.get_matcher()
+
     def get_matcher(self):
         return Matching(self.code.Hz)
 
-    def decode(self, syndrome: np.ndarray) -> np.ndarray:
+    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
         """Get X corrections given code and measured syndrome."""
 
         # Initialize correction as full bsf.
@@ -43,3 +54,19 @@ class Toric3DMatchingDecoder(BaseDecoder):
         correction[:self.code.n] = x_correction
 
         return correction
+
+    def decode_batch(self, syndromes: np.ndarray, **kwargs) -> np.ndarray:
+        """Get X corrections of a batch of syndromes at once."""
+
+        # Initialize corrections as full bsf.
+        corrections = np.zeros((len(syndromes), 2*self.code.n), dtype=np.uint)
+
+        # Keep only the vertex Z syndromes, discard the rest.
+        vertex_syndromes = syndromes[:, self.code.z_indices]
+
+        # PyMatching gives only the X corrections.
+        corrections[:, :self.code.n] = match_batch(
+            self.matcher, vertex_syndromes
+        )
+
+        return corrections
@@ -0,0 +1,422 @@
+"""
+Weighted union-find decoder for CSS codes.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix, csc_matrix
+from panqec.codes import StabilizerCode
+from panqec.decoders import BaseDecoder
+from panqec.error_models import BaseErrorModel
+from panqec import gf2
+
+
+def growth_lengths(
+    probabilities: np.ndarray, max_length: int
+) -> np.ndarray:
+    """Integer lengths of the qubits for weighted cluster growth.
+
+    The length of a qubit is its log-likelihood ratio log((1 - p)/p),
+    divided by the smallest positive one and rounded, so that the most
+    likely qubits have length 1.
+
+    Parameters
+    ----------
+    probabilities : np.ndarray
+        Probability of an error on each qubit.
+    max_length : int
+        Largest length, given to qubits that (almost) never have errors.
+
+    Returns
+    -------
+    lengths : np.ndarray
+        Lengths between 1 and `max_length`.
+    """
+    probabilities = np.clip(probabilities, 1e-15, 1)
+    with np.errstate(divide='ignore'):
+        weights = np.log((1 - probabilities)/probabilities)
+    positive = weights > 0
+    if not np.any(positive):
+        return np.ones(len(weights), dtype=int)
+    lengths = np.rint(weights/weights[positive].min())
+    return np.clip(lengths, 1, max_length).astype(int)
+
+
+class UnionFindSector:
+    """Union-find decoding of one sector of a CSS code, on the Tanner graph
+    of its check matrix.
+
+    Clusters start at the defects and grow by half-edges: at each round,
+    each qubit next to an invalid cluster gets one unit of growth per check
+    of the cluster it touches, and is added to the cluster with all its
+    checks once its growth reaches twice its length.
+    A cluster is valid when its syndrome can be explained by its qubits.
+
+    When every qubit has at most two checks, the Tanner graph is a matching
+    graph, whose qubits with a single check are edges to the boundary.
+    A cluster is then valid when it has an even number of defects or touches
+    the boundary, and the correction is found by peeling a spanning forest
+    of the cluster. Otherwise, each cluster keeps an echelon basis of the
+    columns of its qubits, updated as qubits are added and clusters merged,
+    so that checking its validity costs at most one reduction of its
+    syndrome by the basis, and its correction is given by Gaussian
+    elimination once the growth has stopped.
+
+    Parameters
+    ----------
+    check_matrix : csr_matrix
+        Check matrix of the sector, of shape (n_checks, n_qubits).
+    lengths : np.ndarray
+        Integer lengths of the qubits, as given by `growth_lengths`.
+    """
+
+    def __init__(self, check_matrix, lengths: np.ndarray):
+        self.check_matrix = csr_matrix(check_matrix, dtype=np.uint8)
+        self.lengths = np.asarray(lengths, dtype=int)
+
+        rows = self.check_matrix
+        columns = csc_matrix(self.check_matrix)
+        self.check_qubits: List[List[int]] = [
+            qubits.tolist()
+            for qubits in np.split(rows.indices, rows.indptr[1:-1])
+        ]
+        self.qubit_checks: List[List[int]] = [
+            checks.tolist()
+            for checks in np.split(columns.indices, columns.indptr[1:-1])
+        ]
+        self.is_graph = bool(np.all(np.diff(columns.indptr) <= 2))
+        self._thresholds = (2*self.lengths).tolist()
+
+        # Columns of the qubits as bitsets of their checks.
+        self.qubit_bits: List[int] = [
+            sum(1 << check for check in checks)
+            for checks in self.qubit_checks
+        ]
+
+    def decode(self, syndrome: np.ndarray) -> np.ndarray:
+        """Get the correction of the sector given its syndrome.
+
+        Returns
+        -------
+        correction : np.ndarray
+            Correction on the qubits, of dtype uint8.
+        """
+        correction = np.zeros(self.check_matrix.shape[1], dtype=np.uint8)
+        defects = np.flatnonzero(syndrome).tolist()
+        if len(defects) == 0:
+            return correction
+
+        clusters = _Clusters(self, syndrome)
+        for check in defects:
+            clusters.add_check(check)
+
+        growth: Dict[int, int] = dict()
+        invalid = [
+            root for root in set(map(clusters.find, defects))
+            if not clusters.is_valid(root)
+        ]
+        while invalid:
+            # Grow all the invalid clusters by one half-edge.
+            growing = False
+            grown_qubits = []
+            for root in invalid:
+                for qubit, n_checks in clusters.frontier[root].items():
+                    growing = True
+                    growth[qubit] = growth.get(qubit, 0) + n_checks
+                    if growth[qubit] >= self._thresholds[qubit]:
+                        grown_qubits.append(qubit)
+
+            # The clusters cannot grow anymore.
+            if not growing:
+                break
+
+            for qubit in grown_qubits:
+                clusters.add_qubit(qubit)
+
+            invalid = [
+                root for root in set(map(clusters.find, invalid))
+                if not clusters.is_valid(root)
+            ]
+
+        for root in clusters.roots():
+            qubits = clusters.qubits[root]
+            if self.is_graph:
+                flips = self.peel(qubits, clusters.checks[root], syndrome)
+            else:
+                flips = self.solve(qubits, clusters.checks[root], syndrome)
+            correction[flips] = 1
+        return correction
+
+    def peel(
+        self, qubits: List[int], checks: List[int], syndrome: np.ndarray
+    ) -> List[int]:
+        """Correction of the syndrome of a cluster by peeling, when the
+        Tanner graph is a matching graph.
+
+        Parameters
+        ----------
+        qubits : List[int]
+            Erased qubits, which are the only ones the correction can use.
+        checks : List[int]
+            Checks of the cluster, including all the checks of the qubits.
+        syndrome : np.ndarray
+            Syndrome of the whole sector.
+
+        Returns
+        -------
+        flips : List[int]
+            Qubits of the correction. If the syndrome of the cluster cannot
+            be corrected, the remaining defects are left on the roots of the
+            spanning forest.
+        """
+        boundary = -1
+
+        # Adjacency of the checks through the qubits, the qubits with one
+        # check joining it to the boundary.
+        neighbours: Dict[int, List[Tuple[int, int]]] = {
+            check: [] for check in checks
+        }
+        neighbours[boundary] = []
+        for qubit in qubits:
+            qubit_checks = self.qubit_checks[qubit]
+            if len(qubit_checks) == 1:
+                check_1, check_2 = qubit_checks[0], boundary
+            else:
+                check_1, check_2 = qubit_checks
+            neighbours[check_1].append((check_2, qubit))
+            neighbours[check_2].append((check_1, qubit))
+
+        # Spanning forest, rooted at the boundary when it is reached.
+        parent_edge: Dict[int, Tuple[int, int]] = dict()
+        order = []
+        for root in [boundary] + checks:
+            if root in parent_edge or (
+                root == boundary and not neighbours[boundary]
+            ):
+                continue
+            parent_edge[root] = (root, -1)
+            queue = [root]
+            while queue:
+                node = queue.pop()
+                order.append(node)
+                for neighbour, qubit in neighbours[node]:
+                    if neighbour not in parent_edge:
+                        parent_edge[neighbour] = (node, qubit)
+                        queue.append(neighbour)
+
+        # Peel the leaves, moving the defects towards the roots.
+        defects = {
+            check: bool(syndrome[check]) for check in checks
+        }
+        flips = []
+        for node in reversed(order):
+            parent, qubit = parent_edge[node]
+            if qubit < 0 or not defects.get(node, False):
+                continue
+            flips.append(qubit)
+            defects[node] = False
+            if parent != boundary:
+                defects[parent] = not defects[parent]
+        return flips
+
+    def solve(
+        self, qubits: List[int], checks: List[int], syndrome: np.ndarray
+    ) -> List[int]:
+        """Correction of the syndrome of a cluster by Gaussian elimination,
+        with the same parameters as `peel`. An empty correction is returned
+        if the syndrome of the cluster cannot be corrected."""
+        if not qubits:
+            return []
+        sub_matrix = self.check_matrix[checks][:, qubits]
+        solution = gf2.solve(sub_matrix, syndrome[checks])
+        if solution is None:
+            return []
+        return [qubits[i] for i in np.flatnonzero(solution)]
+
+
+class _Clusters:
+    """Disjoint sets of checks, with union by size and path compression,
+    and the qubits, parity and frontier of each cluster stored at its
+    root.
+
+    The frontier of a cluster only has the qubits that are not grown yet.
+    When the Tanner graph is not a matching graph, each cluster also has
+    its syndrome and an echelon basis of the columns of its qubits, as
+    bitsets of checks. The basis maps the highest check of each vector to
+    the vector. Since the checks of a new qubit are either new or in the
+    clusters it merges, and two clusters share no check, the bases of two
+    clusters are merged without any elimination.
+    """
+
+    def __init__(self, sector: UnionFindSector, syndrome: np.ndarray):
+        self.sector = sector
+        self.syndrome = syndrome
+        self.parent: Dict[int, int] = dict()
+        self.checks: Dict[int, List[int]] = dict()
+        self.qubits: Dict[int, List[int]] = dict()
+        self.parity: Dict[int, int] = dict()
+        self.boundary: Dict[int, bool] = dict()
+        self.frontier: Dict[int, Dict[int, int]] = dict()
+        self.grown: set = set()
+        self.syndrome_bits: Dict[int, int] = dict()
+        self.basis: Dict[int, Dict[int, int]] = dict()
+
+    def find(self, check: int) -> int:
+        root = check
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[check] != root:
+            self.parent[check], check = root, self.parent[check]
+        return root
+
+    def roots(self) -> List[int]:
+        return [check for check in self.parent if self.parent[check] == check]
+
+    def add_check(self, check: int):
+        """Add a cluster with only one check, if it is not in a cluster."""
+        if check in self.parent:
+            return
+        self.parent[check] = check
+        self.checks[check] = [check]
+        self.qubits[check] = []
+        self.parity[check] = int(self.syndrome[check]) % 2
+        self.boundary[check] = False
+        self.frontier[check] = {
+            qubit: 1 for qubit in self.sector.check_qubits[check]
+        }
+        if not self.sector.is_graph:
+            self.syndrome_bits[check] = self.parity[check] << check
+            self.basis[check] = dict()
+
+    def add_qubit(self, qubit: int):
+        """Add a fully grown qubit, merging the clusters of its checks."""
+        if qubit in self.grown:
+            return
+        self.grown.add(qubit)
+        qubit_checks = self.sector.qubit_checks[qubit]
+        for check in qubit_checks:
+            self.add_check(check)
+        root = self.find(qubit_checks[0])
+        for check in qubit_checks[1:]:
+            root = self.union(root, self.find(check))
+        self.qubits[root].append(qubit)
+        self.frontier[root].pop(qubit, None)
+        if len(qubit_checks) == 1:
+            self.boundary[root] = True
+        if not self.sector.is_graph:
+            basis = self.basis[root]
+            column = self._reduce(basis, self.sector.qubit_bits[qubit])
+            if column:
+                basis[column.bit_length() - 1] = column
+
+    def union(self, root_1: int, root_2: int) -> int:
+        if root_1 == root_2:
+            return root_1
+        if len(self.checks[root_1]) < len(self.checks[root_2]):
+            root_1, root_2 = root_2, root_1
+        self.parent[root_2] = root_1
+        self.checks[root_1] += self.checks.pop(root_2)
+        self.qubits[root_1] += self.qubits.pop(root_2)
+        self.parity[root_1] ^= self.parity.pop(root_2)
+        self.boundary[root_1] |= self.boundary.pop(root_2)
+        frontier = self.frontier[root_1]
+        for qubit, n_checks in self.frontier.pop(root_2).items():
+            frontier[qubit] = frontier.get(qubit, 0) + n_checks
+        if not self.sector.is_graph:
+            self.syndrome_bits[root_1] |= self.syndrome_bits.pop(root_2)
+            self.basis[root_1].update(self.basis.pop(root_2))
+        return root_1
+
+    @staticmethod
+    def _reduce(basis: Dict[int, int], bits: int) -> int:
+        """Reduce a bitset of checks by an echelon basis, stopping at the
+        first highest check without a basis vector."""
+        while bits:
+            vector = basis.get(bits.bit_length() - 1)
+            if vector is None:
+                break
+            bits ^= vector
+        return bits
+
+    def is_valid(self, root: int) -> bool:
+        """Whether the syndrome of the cluster can be corrected with its
+        qubits."""
+        if self.sector.is_graph:
+            return self.parity[root] == 0 or self.boundary[root]
+        return self._reduce(self.basis[root], self.syndrome_bits[root]) == 0
+
+
+class UnionFindDecoder(BaseDecoder):
+    """Weighted union-find decoder for any CSS code.
+
+    X errors are decoded on the Tanner graph of `Hz` and Z errors on the
+    one of `Hx`, as described in `UnionFindSector`.
+    The growth of the clusters is weighted by the probabilities of X and
+    Z errors given by the error model, so that clusters grow faster along
+    the most likely qubits. It runs in almost linear time in the number of
+    defects for codes whose Tanner graph is a matching graph.
+
+    Parameters
+    ----------
+    code : StabilizerCode
+        CSS code to decode.
+    error_model : BaseErrorModel
+        Error model giving the growth weights.
+    error_rate : float
+        Physical error rate.
+    max_length : int
+        Largest growth length of a qubit, that the most unlikely qubits
+        get.
+    """
+
+    label = 'Union-Find decoder'
+
+    def __init__(self,
+                 code: StabilizerCode,
+                 error_model: BaseErrorModel,
+                 error_rate: float,
+                 max_length: int = 16):
+        if not code.is_css:
+            raise ValueError(
+                'The union-find decoder only works for CSS codes'
+            )
+        super().__init__(code, error_model, error_rate)
+        self.max_length = max_length
+
+        # The sectors are only built when decoding for the first time.
+        self._x_sector: Optional[UnionFindSector] = None
+        self._z_sector: Optional[UnionFindSector] = None
+
+    def get_lengths(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Growth lengths of the qubits for X and Z errors."""
+        pi, px, py, pz = self.error_model.probability_distribution(
+            self.code, self.error_rate
+        )
+        return (
+            growth_lengths(px + py, self.max_length),
+            growth_lengths(pz + py, self.max_length),
+        )
+
+    def initialize_sectors(self):
+        lengths_x, lengths_z = self.get_lengths()
+        self._x_sector = UnionFindSector(self.code.Hz, lengths_x)
+        self._z_sector = UnionFindSector(self.code.Hx, lengths_z)
+
+    def decode(self, syndrome: np.ndarray, **kwargs) -> np.ndarray:
+        """Get X and Z corrections given code and measured syndrome."""
+        if self._x_sector is None or self._z_sector is None:
+            self.initialize_sectors()
+        assert self._x_sector is not None and self._z_sector is not None
+
+        n_qubits = self.code.n
+        syndrome = np.asarray(syndrome)
+        correction = np.zeros(2*n_qubits, dtype=np.uint)
+
+        # X errors are detected by the Z stabilizers and vice versa.
+        correction[:n_qubits] = self._x_sector.decode(
+            self.code.extract_z_syndrome(syndrome)
+        )
+        correction[n_qubits:] = self._z_sector.decode(
+            self.code.extract_x_syndrome(syndrome)
+        )
+        return correction
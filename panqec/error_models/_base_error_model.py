@@ -34,6 +34,41 @@ class BaseErrorModel(metaclass=ABCMeta):
             in the binary symplectic format
         """
 
+    def generate_batch(
+        self, code: StabilizerCode, error_rate: float, n_shots: int,
+        rng=None
+    ) -> np.ndarray:
+        """Generate a batch of independent errors for a given code and
+        probability of failure.
+        By default, it calls `generate` once per shot, so error models only
+        need to override it if they can sample many errors at once.
+
+        Parameters
+        ----------
+        code : StabilizerCode
+            Errors will be generated on the qubits of the provided code
+        error_rate: float
+            Physical error rate
+        n_shots: int
+            Number of errors to generate
+        rng: numpy.random.Generator
+            Random number generator (default=None resolves to
+            numpy.random.default_rng())
+
+        Returns
+        -------
+        errors : np.ndarray
+            Errors as an array of shape (n_shots, 2n) (with n the number of
+            qubits), where each row is in the binary symplectic format
+        """
+        rng = np.random.default_rng() if rng is None else rng
+
+        errors = np.zeros((n_shots, 2*code.n), dtype='uint8')
+        for i_shot in range(n_shots):
+            errors[i_shot] = self.generate(code, error_rate, rng=rng)
+
+        return errors
+
     @abstractmethod
     def probability_distribution(
         self, code: StabilizerCode, error_rate: float
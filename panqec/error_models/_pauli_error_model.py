@@ -3,11 +3,20 @@ from typing import Tuple
 import numpy as np
 from panqec.codes import StabilizerCode
 from . import BaseErrorModel
-from panqec.bpauli import pauli_to_bsf
 
 
 class PauliErrorModel(BaseErrorModel):
-    """Pauli channel IID noise model."""
+    """Pauli channel IID noise model.
+
+    Errors are sampled for all the qubits at once, by thresholding uniform
+    numbers against the cumulative probabilities of I, X, Y and Z on each
+    qubit. When the probability of error on every qubit is below
+    `sparse_threshold`, only the error locations are sampled, by skipping
+    geometrically distributed gaps between them, which takes a time
+    proportional to p*n instead of n.
+    """
+
+    sparse_threshold: float = 0.1
 
     def __init__(self, r_x: float, r_y: float, r_z: float):
         """Initialize Pauli error model at a given rate of X, Y and Z errors,
@@ -48,16 +57,105 @@ class PauliErrorModel(BaseErrorModel):
     def generate(self, code: StabilizerCode, error_rate: float, rng=None):
         rng = np.random.default_rng() if rng is None else rng
 
-        p_i, p_x, p_y, p_z = self.probability_distribution(code, error_rate)
+        error = self._sample_batch(code, error_rate, 1, rng)[0]
 
-        error_pauli = ''.join([rng.choice(
-            ('I', 'X', 'Y', 'Z'),
-            p=[p_i[i], p_x[i], p_y[i], p_z[i]]
-        ) for i in range(code.n)])
+        return error
 
-        error = pauli_to_bsf(error_pauli)
+    def generate_batch(
+        self, code: StabilizerCode, error_rate: float, n_shots: int,
+        rng=None
+    ) -> np.ndarray:
+        # Subclasses that only override `generate` sample one shot at a time.
+        if type(self).generate is not PauliErrorModel.generate:
+            return super().generate_batch(code, error_rate, n_shots, rng=rng)
 
-        return error
+        rng = np.random.default_rng() if rng is None else rng
+
+        return self._sample_batch(code, error_rate, n_shots, rng)
+
+    def _sample_batch(
+        self, code: StabilizerCode, error_rate: float, n_shots: int, rng
+    ) -> np.ndarray:
+        """Errors of shape (n_shots, 2n) sampled from the probability
+        distribution of the error model."""
+        p_i, p_x, p_y, p_z = self.probability_distribution(code, error_rate)
+
+        if np.max(1 - p_i) < self.sparse_threshold:
+            paulis = self._sample_paulis_sparse(
+                p_i, p_x, p_y, p_z, n_shots, rng
+            )
+        else:
+            paulis = self._sample_paulis_dense(
+                p_i, p_x, p_y, p_z, n_shots, rng
+            )
+
+        # Pauli indices 0, 1, 2, 3 stand for I, X, Y, Z.
+        errors = np.hstack([
+            (paulis == 1) | (paulis == 2), (paulis == 2) | (paulis == 3)
+        ]).astype('uint8')
+
+        return errors
+
+    def _sample_paulis_dense(
+        self, p_i, p_x, p_y, p_z, n_shots: int, rng
+    ) -> np.ndarray:
+        """Pauli indices of shape (n_shots, n) with one uniform number per
+        qubit and per shot."""
+        uniforms = rng.random((n_shots, len(p_i)))
+
+        paulis = np.zeros((n_shots, len(p_i)), dtype='uint8')
+        paulis += uniforms >= p_i
+        paulis += uniforms >= p_i + p_x
+        paulis += uniforms >= p_i + p_x + p_y
+
+        return paulis
+
+    def _sample_paulis_sparse(
+        self, p_i, p_x, p_y, p_z, n_shots: int, rng
+    ) -> np.ndarray:
+        """Pauli indices of shape (n_shots, n) sampling only the error
+        locations.
+
+        Candidate locations are drawn at the largest error rate q over the
+        qubits, with geometric gaps between consecutive candidates.
+        Each candidate is then kept with probability p_error/q for its qubit,
+        and its Pauli is drawn from the conditional distribution.
+        """
+        n = len(p_i)
+        n_sites = n_shots*n
+        paulis = np.zeros((n_shots, n), dtype='uint8')
+
+        q = float(np.max(1 - p_i))
+        if q <= 0:
+            return paulis
+
+        # Draw the gaps in chunks a bit larger than the expected number of
+        # candidates, so that a single chunk is usually enough.
+        chunk_size = int(n_sites*q + 5*np.sqrt(n_sites*q) + 10)
+        chunks = []
+        last_site = -1
+        while last_site < n_sites:
+            sites = last_site + np.cumsum(rng.geometric(q, size=chunk_size))
+            chunks.append(sites)
+            last_site = sites[-1]
+        sites = np.concatenate(chunks)
+        sites = sites[sites < n_sites]
+
+        qubits = sites % n
+        uniforms = q*rng.random(len(sites))
+        cumulative_x = p_x[qubits]
+        cumulative_y = cumulative_x + p_y[qubits]
+        cumulative_z = cumulative_y + p_z[qubits]
+
+        site_paulis = (
+            1 + (uniforms >= cumulative_x).astype('uint8')
+            + (uniforms >= cumulative_y)
+        ).astype('uint8')
+        has_error = uniforms < cumulative_z
+
+        paulis.reshape(-1)[sites[has_error]] = site_paulis[has_error]
+
+        return paulis
 
     @functools.lru_cache()
     def probability_distribution(
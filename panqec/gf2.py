@@ -0,0 +1,312 @@
+"""
+Linear algebra over GF(2) on bit-packed matrices.
+
+Each row of a binary matrix is packed into 64-bit words, column j being the
+bit j % 64 of the word j // 64, so that adding two rows during Gaussian
+elimination is a vectorized XOR of a few words instead of a loop over all
+the columns.
+Dense arrays and scipy sparse matrices are both accepted as inputs, sparse
+matrices being packed without being converted to dense arrays.
+"""
+from typing import Tuple, List, Optional
+import numpy as np
+from scipy.sparse import issparse, csr_matrix, vstack
+
+WORD_SIZE = 64
+
+
+def pack_rows(matrix) -> np.ndarray:
+    """Pack the rows of a binary matrix into 64-bit words.
+
+    Parameters
+    ----------
+    matrix : np.ndarray or scipy.sparse matrix
+        Binary matrix of shape (m, n). Entries are taken modulo 2.
+
+    Returns
+    -------
+    packed : np.ndarray
+        Array of shape (m, ceil(n / 64)) and dtype uint64.
+    """
+    n_rows, n_cols = matrix.shape
+    n_words = max(1, -(-n_cols // WORD_SIZE))
+
+    if issparse(matrix):
+        coo = matrix.tocoo()
+        odd = (coo.data % 2).astype(bool)
+        rows = coo.row[odd]
+        cols = coo.col[odd].astype(np.uint64)
+
+        # Repeated entries cancel out, so they are added with XOR.
+        packed = np.zeros((n_rows, n_words), dtype=np.uint64)
+        np.bitwise_xor.at(
+            packed, (rows, (cols // np.uint64(WORD_SIZE)).astype(np.intp)),
+            np.uint64(1) << (cols % np.uint64(WORD_SIZE))
+        )
+        return packed
+
+    dense = np.asarray(matrix).reshape(n_rows, n_cols) % 2
+    packed_bytes = np.zeros((n_rows, 8*n_words), dtype=np.uint8)
+    packed_bytes[:, :-(-n_cols // 8)] = np.packbits(
+        dense.astype(np.uint8), axis=1, bitorder='little'
+    )
+    return packed_bytes.view('<u8').astype(np.uint64)
+
+
+def unpack_rows(packed: np.ndarray, n_cols: int) -> np.ndarray:
+    """Unpack rows packed by `pack_rows` into a dense binary matrix.
+
+    Parameters
+    ----------
+    packed : np.ndarray
+        Array of shape (m, n_words) and dtype uint64.
+    n_cols : int
+        Number of columns of the unpacked matrix.
+
+    Returns
+    -------
+    matrix : np.ndarray
+        Array of shape (m, n_cols) and dtype uint8.
+    """
+    packed_bytes = np.ascontiguousarray(packed.astype('<u8')).view(np.uint8)
+    return np.unpackbits(
+        packed_bytes, axis=1, count=n_cols, bitorder='little'
+    )
+
+
+def _column_bits(packed: np.ndarray, col: int) -> np.ndarray:
+    """Bits of a given column of a packed matrix, as a boolean array."""
+    word = packed[:, col // WORD_SIZE]
+    return ((word >> np.uint64(col % WORD_SIZE)) & np.uint64(1)).astype(bool)
+
+
+def _eliminate(
+    packed: np.ndarray, n_cols: int, reduced: bool = True
+) -> List[int]:
+    """Gaussian elimination on a packed matrix, in place.
+
+    Parameters
+    ----------
+    packed : np.ndarray
+        Packed matrix, modified in place.
+    n_cols : int
+        Number of columns of the matrix.
+    reduced : bool
+        If True, eliminate above the pivots as well, giving the reduced row
+        echelon form. Otherwise, only the row echelon form is computed,
+        which is enough for the rank.
+
+    Returns
+    -------
+    pivot_cols : List[int]
+        Column of the pivot of each of the first len(pivot_cols) rows.
+    """
+    n_rows = packed.shape[0]
+    pivot_cols: List[int] = []
+    pivot_row = 0
+
+    for col in range(n_cols):
+        if pivot_row == n_rows:
+            break
+
+        candidates = np.flatnonzero(_column_bits(packed[pivot_row:], col))
+        if len(candidates) == 0:
+            continue
+
+        swap_row = pivot_row + candidates[0]
+        if swap_row != pivot_row:
+            packed[[pivot_row, swap_row]] = packed[[swap_row, pivot_row]]
+
+        # The pivot row is zero before the word of its pivot, so only the
+        # remaining words need to be added.
+        first_word = col // WORD_SIZE
+        if reduced:
+            targets = np.flatnonzero(_column_bits(packed, col))
+            targets = targets[targets != pivot_row]
+        else:
+            targets = pivot_row + 1 + np.flatnonzero(
+                _column_bits(packed[pivot_row + 1:], col)
+            )
+        if len(targets) > 0:
+            packed[targets, first_word:] ^= packed[pivot_row, first_word:]
+
+        pivot_cols.append(col)
+        pivot_row += 1
+
+    return pivot_cols
+
+
+def rank(matrix) -> int:
+    """Rank of a binary matrix over GF(2).
+
+    Parameters
+    ----------
+    matrix : np.ndarray or scipy.sparse matrix
+        Binary matrix of shape (m, n).
+
+    Returns
+    -------
+    rank : int
+        Rank of the matrix.
+    """
+    packed = pack_rows(matrix)
+    return len(_eliminate(packed, matrix.shape[1], reduced=False))
+
+
+def rref(matrix) -> Tuple[np.ndarray, List[int]]:
+    """Reduced row echelon form of a binary matrix over GF(2).
+
+    Parameters
+    ----------
+    matrix : np.ndarray or scipy.sparse matrix
+        Binary matrix of shape (m, n).
+
+    Returns
+    -------
+    reduced : np.ndarray
+        Reduced row echelon form, of shape (m, n) and dtype uint8, whose
+        first `len(pivot_cols)` rows are nonzero.
+    pivot_cols : List[int]
+        Column of the pivot of each nonzero row.
+    """
+    n_cols = matrix.shape[1]
+    packed = pack_rows(matrix)
+    pivot_cols = _eliminate(packed, n_cols)
+    return unpack_rows(packed, n_cols), pivot_cols
+
+
+def kernel(matrix) -> np.ndarray:
+    """Basis of the kernel (null space) of a binary matrix over GF(2),
+    i.e. of the vectors x such that matrix.x = 0.
+
+    Parameters
+    ----------
+    matrix : np.ndarray or scipy.sparse matrix
+        Binary matrix of shape (m, n).
+
+    Returns
+    -------
+    basis : np.ndarray
+        Array of shape (n - rank, n) and dtype uint8, whose rows form a basis
+        of the kernel.
+    """
+    n_cols = matrix.shape[1]
+    packed = pack_rows(matrix)
+    pivot_cols = _eliminate(packed, n_cols)
+    reduced = unpack_rows(packed[:len(pivot_cols)], n_cols)
+
+    free_cols = np.setdiff1d(np.arange(n_cols), pivot_cols)
+
+    # Each free column gives one basis vector, equal to 1 on that column and
+    # to the value of the free column in each pivot row on the pivot columns.
+    basis = np.zeros((len(free_cols), n_cols), dtype=np.uint8)
+    basis[np.arange(len(free_cols)), free_cols] = 1
+    if len(pivot_cols) > 0:
+        basis[:, pivot_cols] = reduced[:, free_cols].T
+
+    return basis
+
+
+def solve(matrix, b: np.ndarray) -> Optional[np.ndarray]:
+    """One solution x of matrix.x = b over GF(2).
+
+    Parameters
+    ----------
+    matrix : np.ndarray or scipy.sparse matrix
+        Binary matrix of shape (m, n).
+    b : np.ndarray
+        Binary vector of size m.
+
+    Returns
+    -------
+    x : Optional[np.ndarray]
+        Binary vector of size n and dtype uint8 such that matrix.x = b,
+        with zeros on the free variables, or None if there is no solution.
+    """
+    n_rows, n_cols = matrix.shape
+    b = np.asarray(b).reshape(n_rows) % 2
+
+    packed = pack_rows(matrix)
+    n_words = packed.shape[1]
+
+    # Append b as an extra column, after the words of the matrix.
+    augmented = np.zeros((n_rows, n_words + 1), dtype=np.uint64)
+    augmented[:, :n_words] = packed
+    augmented[:, n_words] = b.astype(np.uint64)
+    rhs_col = n_words*WORD_SIZE
+
+    pivot_cols = _eliminate(augmented, rhs_col + 1)
+    if len(pivot_cols) > 0 and pivot_cols[-1] == rhs_col:
+        return None
+
+    x = np.zeros(n_cols, dtype=np.uint8)
+    rhs = _column_bits(augmented[:len(pivot_cols)], rhs_col)
+    x[pivot_cols] = rhs
+    return x
+
+
+def complement_basis(vectors, subspace=None) -> np.ndarray:
+    """Rows of a matrix that form a basis of its row space modulo the row
+    space of another matrix.
+
+    Rows are selected greedily in order, each row being kept if it is not a
+    linear combination of the rows of `subspace` and of the rows kept before.
+
+    Parameters
+    ----------
+    vectors : np.ndarray or scipy.sparse matrix
+        Binary matrix of shape (m, n) whose rows are selected.
+    subspace : np.ndarray or scipy.sparse matrix, optional
+        Binary matrix of shape (m', n) spanning the subspace to quotient by.
+
+    Returns
+    -------
+    basis : np.ndarray
+        Selected rows of `vectors`, as an array of dtype uint8.
+    """
+    vectors = csr_matrix(vectors, dtype=np.uint8)
+    if subspace is None:
+        n_sub = 0
+        stacked = vectors
+    else:
+        subspace = csr_matrix(subspace, dtype=np.uint8)
+        n_sub = subspace.shape[0]
+        stacked = vstack([subspace, vectors], format='csr')
+
+    # Pivot columns of the transpose are the first independent rows.
+    packed = pack_rows(stacked.T)
+    pivots = np.array(_eliminate(packed, stacked.shape[0], reduced=False),
+                      dtype=int)
+    selected = pivots[pivots >= n_sub] - n_sub
+
+    return vectors[selected].toarray().astype(np.uint8)
+
+
+def inverse(matrix) -> np.ndarray:
+    """Inverse of a square binary matrix over GF(2).
+
+    Parameters
+    ----------
+    matrix : np.ndarray
+        Invertible binary matrix of shape (k, k).
+
+    Returns
+    -------
+    inverse : np.ndarray
+        Binary matrix of shape (k, k) and dtype uint8.
+
+    Raises
+    ------
+    ValueError
+        If the matrix is not invertible.
+    """
+    matrix = np.asarray(matrix) % 2
+    k = matrix.shape[0]
+    if matrix.shape != (k, k):
+        raise ValueError(f'Matrix of shape {matrix.shape} is not square')
+
+    reduced, pivot_cols = rref(np.hstack([matrix, np.eye(k, dtype=int)]))
+    if pivot_cols[:k] != list(range(k)):
+        raise ValueError('Matrix is not invertible over GF(2)')
+
+    return reduced[:, k:]
@@ -7,9 +7,14 @@ from json import JSONDecodeError
 import itertools
 from typing import List, Dict, Callable, Union, Any, Optional, Tuple
 import datetime
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from panqec.codes import StabilizerCode
-from panqec.decoders import BaseDecoder
+from panqec.codes import (
+    StabilizerCode, get_code_cache_dir, set_code_cache_dir
+)
+from panqec.decoders import BaseDecoder, MemoizedDecoder
 from panqec.error_models import BaseErrorModel
 from .bpauli import get_effective_error
 from .config import (
@@ -17,6 +22,10 @@ from .config import (
 )
 from .utils import identity, NumpyEncoder
 
+# Code, error model, decoder and error rate of a simulation run by the
+# worker processes of a parallel BatchSimulation.
+WorkerSimulation = Tuple[StabilizerCode, BaseErrorModel, BaseDecoder, float]
+
 
 def run_once(
     code: StabilizerCode,
@@ -55,6 +64,52 @@ def run_once(
     return results
 
 
+def run_batch(
+    code: StabilizerCode,
+    error_model: BaseErrorModel,
+    decoder: BaseDecoder,
+    error_rate: float,
+    n_shots: int,
+    rng=None
+) -> dict:
+    """Run a simulation n_shots times and return the results as a dictionary.
+
+    The results are the same as for `run_once`, except that each value is an
+    array whose first axis runs over the shots.
+    The syndromes, effective errors and codespace flags of all the shots are
+    computed at once, and the decoding goes through `decoder.decode_batch`.
+    """
+
+    if not (0 <= error_rate <= 1):
+        raise ValueError('Error rate must be in [0, 1].')
+
+    if rng is None:
+        rng = np.random.default_rng()
+
+    errors = error_model.generate_batch(
+        code, error_rate=error_rate, n_shots=n_shots, rng=rng
+    )
+    syndromes = code.measure_syndrome(errors)
+    corrections = decoder.decode_batch(syndromes)
+    total_errors = (corrections + errors) % 2
+    effective_errors = get_effective_error(
+        total_errors, code.logicals_x, code.logicals_z
+    ).reshape((n_shots, -1))
+    codespace = ~np.any(code.measure_syndrome(total_errors), axis=1)
+    success = np.all(effective_errors == 0, axis=1) & codespace
+
+    results = {
+        'error': errors,
+        'syndrome': syndromes,
+        'correction': corrections,
+        'effective_error': effective_errors,
+        'success': success,
+        'codespace': codespace,
+    }
+
+    return results
+
+
 def run_file(
     file_name: str, n_trials: int,
     start: Optional[int] = None,
@@ -62,11 +117,13 @@ def run_file(
     progress: Callable = identity,
     output_dir: Optional[str] = None,
     verbose: bool = True,
+    batch_size: int = 20,
+    workers: int = 1,
 ):
     """Run an input json file."""
     batch_sim = read_input_json(
         file_name, output_dir=output_dir,
-        start=start, n_runs=n_runs
+        start=start, n_runs=n_runs, batch_size=batch_size, workers=workers
     )
     if verbose:
         print(f'running {len(batch_sim._simulations)} simulations:')
@@ -88,6 +145,7 @@ class Simulation:
     decoder: BaseDecoder
     error_rate: float
     label: str
+    batch_size: int
     _results: dict = {}
     rng = None
 
@@ -96,13 +154,15 @@ class Simulation:
         code: StabilizerCode,
         error_model: BaseErrorModel,
         decoder: BaseDecoder,
-        error_rate: float, rng=None
+        error_rate: float, rng=None,
+        batch_size: int = 20
     ):
         self.code = code
         self.error_model = error_model
         self.decoder = decoder
         self.error_rate = error_rate
         self.rng = rng
+        self.batch_size = batch_size
         self.label = '_'.join([
             code.label, error_model.label, decoder.label, f'{error_rate}'
         ])
@@ -117,21 +177,41 @@ class Simulation:
     def wall_time(self):
         return self._results['wall_time']
 
-    def run(self, repeats: int):
-        """Run assuming perfect measurement."""
+    def run(self, repeats: int, batch_size: Optional[int] = None):
+        """Run assuming perfect measurement.
+
+        The shots are run in batches of at most `batch_size` shots, by
+        default the `batch_size` of the simulation.
+        """
+        if batch_size is None:
+            batch_size = self.batch_size
         self.start_time = datetime.datetime.now()
-        for i_trial in range(repeats):
-            shot = run_once(
+        n_remaining = repeats
+        while n_remaining > 0:
+            n_shots = min(n_remaining, batch_size)
+            shots = run_batch(
                 self.code, self.error_model, self.decoder,
-                error_rate=self.error_rate,
+                error_rate=self.error_rate, n_shots=n_shots,
                 rng=self.rng
             )
-            for key, value in shot.items():
-                if key in self._results.keys():
-                    self._results[key].append(value)
+            self._add_results(shots)
+            n_remaining -= n_shots
         finish_time = datetime.datetime.now() - self.start_time
         self._results['wall_time'] += finish_time.total_seconds()
 
+    def _add_results(self, shots: dict):
+        """Append the results of a batch of shots to the stored results."""
+        for key, value in shots.items():
+            if key == 'wall_time':
+                self._results[key] += value
+            elif key == 'statistics':
+                self.decoder.add_statistics(value)
+            elif key in self._results.keys():
+                if len(value.shape) == 1:
+                    self._results[key] += value.tolist()
+                else:
+                    self._results[key] += list(value)
+
     @property
     def n_results(self):
         return len(self._results['success'])
@@ -170,27 +250,40 @@ class Simulation:
                                 for array_value in self._results[key]
                             ]
                 self._results = data['results']
+
+                # The counts on file replace those of the decoder, like the
+                # results, so that loading twice does not count them twice.
+                if 'statistics' in data and self.decoder.statistics:
+                    self.decoder.add_statistics(_count_differences(
+                        self.decoder.statistics, data['statistics']
+                    ))
         except JSONDecodeError as err:
             print(f'Error loading existing results file {file_path}')
             print('Starting this from scratch')
             print(err)
 
     def save_results(self, output_dir: str):
-        """Save results to directory."""
+        """Save results to directory.
+
+        The statistics of the decoder, if any, are saved with them.
+        """
+        data = {
+            'results': self._results,
+            'inputs': {
+                'size': self.code.size,
+                'code': self.code.label,
+                'n': self.code.n,
+                'k': self.code.k,
+                'd': self.code.d,
+                'error_model': self.error_model.label,
+                'decoder': self.decoder.label,
+                'probability': self.error_rate,
+            }
+        }
+        if self.decoder.statistics:
+            data['statistics'] = self.decoder.statistics
         with open(self.get_file_path(output_dir), 'w') as f:
-            json.dump({
-                'results': self._results,
-                'inputs': {
-                    'size': self.code.size,
-                    'code': self.code.label,
-                    'n': self.code.n,
-                    'k': self.code.k,
-                    'd': self.code.d,
-                    'error_model': self.error_model.label,
-                    'decoder': self.decoder.label,
-                    'probability': self.error_rate,
-                }
-            }, f, cls=NumpyEncoder)
+            json.dump(data, f, cls=NumpyEncoder)
 
     def get_results(self):
         """Return results as dictionary."""
@@ -235,6 +328,9 @@ class BatchSimulation():
     _simulations: List[Simulation]
     update_frequency: int
     save_frequency: int
+    batch_size: int
+    workers: int
+    seed: Optional[int]
     _output_dir: str
 
     def __init__(
@@ -244,12 +340,18 @@ class BatchSimulation():
         update_frequency: int = 10,
         save_frequency: int = 20,
         output_dir: Optional[str] = None,
+        batch_size: int = 20,
+        workers: int = 1,
+        seed: Optional[int] = None,
     ):
         self._simulations = []
         self.code: Dict = {}
         self.decoder: Dict = {}
         self.update_frequency = update_frequency
         self.save_frequency = save_frequency
+        self.batch_size = batch_size
+        self.workers = workers
+        self.seed = seed
         self.label = label
         if output_dir is not None:
             self._output_dir = os.path.join(output_dir, self.label)
@@ -295,6 +397,12 @@ class BatchSimulation():
             print('Simulation paused')
 
     def _run(self, n_trials, progress: Callable = identity):
+        if self.workers > 1:
+            self._run_parallel(n_trials, progress=progress)
+        else:
+            self._run_serial(n_trials, progress=progress)
+
+    def _run_serial(self, n_trials, progress: Callable = identity):
         self.load_results()
 
         # Use the maximum remaining trials to overestimate how much is
@@ -305,18 +413,120 @@ class BatchSimulation():
             for simulation in self._simulations
         ])
 
-        for i_trial in progress(list(range(max_remaining_trials))):
+        # Every simulation runs a chunk of at most batch_size trials in turn.
+        batch_size = max(1, self.batch_size)
+        for i_start in progress(
+            list(range(0, max_remaining_trials, batch_size))
+        ):
+            i_stop = min(i_start + batch_size, max_remaining_trials)
             for simulation in self._simulations:
-                if simulation.n_results < n_trials:
-                    simulation.run(1)
-            if i_trial > 0:
-                if i_trial % self.update_frequency == 0:
-                    self.on_update()
-                if i_trial % self.save_frequency == 0:
-                    self.save_results()
-            if i_trial == max_remaining_trials - 1:
+                n_shots = min(
+                    i_stop - i_start, n_trials - simulation.n_results
+                )
+                if n_shots > 0:
+                    simulation.run(n_shots, batch_size=batch_size)
+            if i_stop == max_remaining_trials:
                 self.on_update()
                 self.save_results()
+            else:
+                if _crosses_multiple(i_start, i_stop, self.update_frequency):
+                    self.on_update()
+                if _crosses_multiple(i_start, i_stop, self.save_frequency):
+                    self.save_results()
+
+    def _run_parallel(self, n_trials, progress: Callable = identity):
+        """Run the simulations in a pool of worker processes.
+
+        Each round gives every simulation up to batch_size*workers more
+        trials, split into tasks of at most batch_size trials, so that the
+        workers are busy whether there are many simulations or only one.
+        Each task gets its own random number generator spawned from a
+        numpy SeedSequence, and the parent process merges the results in
+        order and saves them as in the serial run.
+
+        If the code cache is disabled, a temporary one is used during the
+        run, so that the workers memory-map the matrices of the codes from
+        the same files instead of each receiving a pickled copy.
+        """
+        self.load_results()
+
+        tmp_cache_dir = None
+        if get_code_cache_dir() is None:
+            tmp_cache_dir = tempfile.mkdtemp(prefix='panqec-code-cache-')
+            set_code_cache_dir(tmp_cache_dir)
+
+        max_remaining_trials = max([
+            max(0, n_trials - simulation.n_results)
+            for simulation in self._simulations
+        ])
+
+        seed_sequence = np.random.SeedSequence(self.seed)
+        batch_size = max(1, self.batch_size)
+        round_size = batch_size*self.workers
+
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self._get_worker_input(),)
+        )
+        tasks: List[Tuple[Simulation, Any]] = []
+        try:
+            for i_start in progress(
+                list(range(0, max_remaining_trials, round_size))
+            ):
+                i_stop = min(i_start + round_size, max_remaining_trials)
+                tasks = []
+                for i_simulation, simulation in enumerate(self._simulations):
+                    n_shots = min(
+                        i_stop - i_start, n_trials - simulation.n_results
+                    )
+                    for i_chunk in range(0, max(0, n_shots), batch_size):
+                        future = executor.submit(
+                            _run_worker_batch, i_simulation,
+                            min(batch_size, n_shots - i_chunk),
+                            seed_sequence.spawn(1)[0]
+                        )
+                        tasks.append((simulation, future))
+
+                for simulation, future in tasks:
+                    simulation._add_results(future.result())
+
+                if i_stop == max_remaining_trials:
+                    self.on_update()
+                    self.save_results()
+                else:
+                    if _crosses_multiple(
+                        i_start, i_stop, self.update_frequency
+                    ):
+                        self.on_update()
+                    if _crosses_multiple(
+                        i_start, i_stop, self.save_frequency
+                    ):
+                        self.save_results()
+        finally:
+            for _, future in tasks:
+                future.cancel()
+            executor.shutdown()
+            if tmp_cache_dir is not None:
+                set_code_cache_dir(None)
+                shutil.rmtree(tmp_cache_dir, ignore_errors=True)
+
+    def _get_worker_input(self) -> List[WorkerSimulation]:
+        """Code, error model, decoder and error rate of each simulation,
+        pickled to each worker process.
+
+        The results are left out, since the workers only send back the
+        results of their own shots. With the code cache, the codes are
+        pickled as their size only, and the decoders leave out their native
+        objects, which each worker builds again when unpickling them.
+        """
+        return [
+            (
+                simulation.code, simulation.error_model, simulation.decoder,
+                simulation.error_rate
+            )
+            for simulation in self._simulations
+        ]
 
     def _save_results(self):
         for simulation in self._simulations:
@@ -341,6 +551,70 @@ class BatchSimulation():
         return results
 
 
+# Simulations of each worker process of a parallel BatchSimulation.
+_worker_simulations: List[WorkerSimulation] = []
+
+
+def _init_worker(worker_input: List[WorkerSimulation]):
+    """Keep the simulations of a worker process, unpickled once at
+    start-up."""
+    global _worker_simulations
+    _worker_simulations = worker_input
+
+
+def _run_worker_batch(
+    i_simulation: int, n_shots: int, seed_sequence: np.random.SeedSequence
+) -> dict:
+    """Run a batch of shots of one simulation in a worker process and
+    return the results to be merged by the parent process, with the counts
+    of the statistics of the decoder gathered during the batch."""
+    code, error_model, decoder, error_rate = (
+        _worker_simulations[i_simulation]
+    )
+    rng = np.random.default_rng(seed_sequence)
+
+    statistics = decoder.statistics
+    start_time = datetime.datetime.now()
+    shots = run_batch(
+        code, error_model, decoder,
+        error_rate=error_rate, n_shots=n_shots, rng=rng
+    )
+    finish_time = datetime.datetime.now() - start_time
+
+    results = {
+        key: shots[key] for key in ['effective_error', 'success', 'codespace']
+    }
+    results['wall_time'] = finish_time.total_seconds()
+    if statistics or decoder.statistics:
+        results['statistics'] = _count_differences(
+            statistics, decoder.statistics
+        )
+    return results
+
+
+def _count_differences(before: dict, after: dict) -> dict:
+    """Differences of the counts of two snapshots of the statistics of a
+    decoder. The entries that are not counts, such as labels or rates, are
+    left out."""
+    differences = dict()
+    for key, value in after.items():
+        if isinstance(value, int) and not isinstance(value, bool):
+            differences[key] = value - before.get(key, 0)
+        elif isinstance(value, list) and all(
+            isinstance(count, int) for count in value
+        ) and len(value) > 0:
+            differences[key] = (
+                np.array(value) - np.array(before.get(key, 0))
+            ).tolist()
+    return differences
+
+
+def _crosses_multiple(i_start: int, i_stop: int, frequency: int) -> bool:
+    """Whether the trials from i_start to i_stop pass a multiple of
+    frequency."""
+    return i_stop // frequency > i_start // frequency
+
+
 def _parse_parameters_range(parameters):
     parameters_range = [{}]
     if len(parameters) > 0:
@@ -460,11 +734,14 @@ def _parse_decoder_dict(
     decoder_params['error_rate'] = error_rate
 
     filtered_decoder_params = filter_legacy_params(decoder_params)
+    cache_size = filtered_decoder_params.pop('cache_size', None)
     decoder = decoder_class(**filtered_decoder_params)
+    if cache_size:
+        decoder = MemoizedDecoder(decoder, cache_size)
     return decoder
 
 
-def parse_run(run: Dict[str, Any]) -> Simulation:
+def parse_run(run: Dict[str, Any], batch_size: int = 20) -> Simulation:
     """Parse a single dict describing the run."""
     code = _parse_code_dict(run['code'])
     error_model = _parse_error_model_dict(run['noise'])
@@ -473,7 +750,9 @@ def parse_run(run: Dict[str, Any]) -> Simulation:
         run['decoder'], code, error_model, error_rate
     )
 
-    simulation = Simulation(code, error_model, decoder, error_rate)
+    simulation = Simulation(
+        code, error_model, decoder, error_rate, batch_size=batch_size
+    )
     return simulation
 
 
@@ -522,9 +801,10 @@ def count_runs(file_path: str) -> Optional[int]:
 
 
 def get_simulations(
-    data: dict, start: Optional[int] = None, n_runs: Optional[int] = None
-) -> List[dict]:
-    simulations = []
+    data: dict, start: Optional[int] = None, n_runs: Optional[int] = None,
+    batch_size: int = 20
+) -> List[Simulation]:
+    simulations: List[Simulation] = []
 
     if 'ranges' in data:
         (
@@ -554,7 +834,9 @@ def get_simulations(
                            probability_range):
         decoder = _parse_decoder_dict(decoder_dict, code, error_model,
                                       error_rate)
-        simulations.append(Simulation(code, error_model, decoder, error_rate))
+        simulations.append(Simulation(
+            code, error_model, decoder, error_rate, batch_size=batch_size
+        ))
 
     if start is not None:
         simulations = simulations[start:]
@@ -580,7 +862,9 @@ def read_input_dict(
     batch_sim = BatchSimulation(*args, **kwargs)
     assert len(batch_sim._simulations) == 0
 
-    simulations = get_simulations(data, start=start, n_runs=n_runs)
+    simulations = get_simulations(
+        data, start=start, n_runs=n_runs, batch_size=batch_sim.batch_size
+    )
 
     for sim in simulations:
         batch_sim.append(sim)
@@ -2,8 +2,10 @@ import itertools
 import pytest
 import numpy as np
 from panqec.bpauli import bcommute, bsf_wt
-from panqec.codes import Toric3DCode
-from panqec.decoders import Toric3DMatchingDecoder
+from panqec.codes import Toric3DCode, RotatedPlanar3DCode
+from panqec.decoders import (
+    Toric3DMatchingDecoder, RotatedPlanarMatchingDecoder
+)
 from panqec.error_models import PauliErrorModel
 
 
@@ -106,3 +108,30 @@ class TestToric3DMatchingDecoder:
             correction = decoder.decode(syndrome)
             total_error = (error + correction) % 2
             assert np.all(bcommute(code.stabilizer_matrix, total_error) == 0)
+
+    @pytest.mark.parametrize('code', [
+        Toric3DCode(3, 4, 5), RotatedPlanar3DCode(3, 3, 3)
+    ])
+    def test_decode_batch_matches_decode(self, code):
+        error_model = PauliErrorModel(1, 0, 0)
+        error_rate = 0.1
+        if isinstance(code, RotatedPlanar3DCode):
+            decoder = RotatedPlanarMatchingDecoder(
+                code, error_model, error_rate
+            )
+        else:
+            decoder = Toric3DMatchingDecoder(code, error_model, error_rate)
+        errors = error_model.generate_batch(
+            code, error_rate=error_rate, n_shots=10,
+            rng=np.random.default_rng(0)
+        )
+        syndromes = code.measure_syndrome(errors)
+        corrections = decoder.decode_batch(syndromes)
+        assert corrections.shape == (10, 2*code.n)
+        assert corrections.dtype == np.uint
+        for syndrome, correction in zip(syndromes, corrections):
+            assert np.all(correction == decoder.decode(syndrome))
+
+    def test_decode_empty_batch(self, decoder, code):
+        syndromes = np.zeros((0, code.n_stabilizers), dtype=np.uint)
+        assert decoder.decode_batch(syndromes).shape == (0, 2*code.n)
@@ -2,7 +2,9 @@ import pytest
 from itertools import combinations
 import numpy as np
 from panqec.bpauli import bcommute, bsf_wt
-from panqec.decoders import split_posts_at_active_fences
+from panqec.decoders import (
+    split_posts_at_active_fences, alternating_segment_posts
+)
 from panqec.codes import RotatedPlanar3DCode
 from panqec.decoders import RotatedInfiniteZBiasDecoder
 from panqec.error_models import PauliErrorModel
@@ -36,6 +38,32 @@ def test_split_posts_at_active_fences_trivial(
     assert segments == split_posts_at_active_fences(active_fences, n_fences)
 
 
+@pytest.mark.parametrize('n_fences', [1, 2, 5, 6])
+def test_alternating_segment_posts_match_split_posts(n_fences):
+    fences = np.array([
+        [(i >> j) & 1 for j in range(n_fences)]
+        for i in range(2**n_fences)
+    ], dtype=bool)
+    posts = alternating_segment_posts(fences)
+    assert posts.shape == (2**n_fences, n_fences + 1)
+
+    for line_fences, line_posts in zip(fences, posts):
+        active_fences = np.flatnonzero(line_fences).tolist()
+        expected_posts = []
+        if active_fences:
+            segments = split_posts_at_active_fences(active_fences, n_fences)
+            segments_even = segments[::2]
+            segments_odd = segments[1::2]
+            if sum(map(len, segments_even)) <= sum(map(len, segments_odd)):
+                chosen_segments = segments_even
+            else:
+                chosen_segments = segments_odd
+            expected_posts = sorted(
+                post for segment in chosen_segments for post in segment
+            )
+        assert np.flatnonzero(line_posts).tolist() == expected_posts
+
+
 class TestRotatedInfiniteZBiasDecoder:
     """Test 1-qubit errors on corners fully correctable."""
 
@@ -173,3 +201,22 @@ class TestRotatedInfiniteZBiasDecoder:
             f'Found {len(uncorrectable_error_locations)} uncorrectable '
             f'weight-2 Z errors'
         )
+
+    def test_odd_line_syndrome_raises_value_error(self, code, decoder):
+        syndrome = np.zeros(code.n_stabilizers, dtype=np.uint)
+        syndrome[code.stabilizer_index[(2, 4, 1)]] = 1
+        with pytest.raises(ValueError):
+            decoder.matcher.decode(syndrome)
+
+    def test_z_errors_on_top_layer_of_taller_code(self):
+        code = RotatedPlanar3DCode(3, 3, 5)
+        decoder = RotatedInfiniteZBiasDecoder(
+            code, PauliErrorModel(0, 0, 1), 0.5
+        )
+        for location in code.qubit_coordinates:
+            if location[2] != 9:
+                continue
+            error = code.to_bsf({location: 'Z'})
+            correction = decoder.decode(code.measure_syndrome(error))
+            total_error = (error + correction) % 2
+            assert np.all(bcommute(code.stabilizer_matrix, total_error) == 0)
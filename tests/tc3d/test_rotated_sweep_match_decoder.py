@@ -559,3 +559,66 @@ class TestRotatedSweepDecoder3D:
             )
 
             assert np.all(pauli_syndrome == sign_flip_syndrome)
+
+    def test_sweep_tables_match_sweep_faces_edges(self, code, decoder):
+        decoder._build_tables()
+        for sweep_direction in decoder.sweep_directions:
+            vertices, faces, edges = decoder._sweep_tables[sweep_direction]
+            for vertex, vertex_faces, vertex_edges in zip(
+                vertices, faces, edges
+            ):
+                location = code.stabilizer_coordinates[vertex]
+                assert code.stabilizer_type(location) == 'vertex'
+                assert [
+                    code.stabilizer_index[face]
+                    for face in decoder.get_sweep_faces(
+                        location, sweep_direction
+                    )
+                ] == list(vertex_faces)
+                assert [
+                    code.qubit_index[edge]
+                    for edge in decoder.get_sweep_edges(
+                        location, sweep_direction
+                    )
+                ] == list(vertex_edges)
+
+    def test_sweep_move_matches_decode(self, code):
+        error_model = PauliErrorModel(1/3, 1/3, 1/3)
+        error = code.to_bsf({
+            code.qubit_coordinates[4]: 'Z', code.qubit_coordinates[9]: 'Z'
+        })
+        syndrome = code.measure_syndrome(error)
+
+        decoder = RotatedSweepDecoder3D(code, error_model, 0.5)
+        correction = decoder.decode(syndrome)
+
+        decoder = RotatedSweepDecoder3D(code, error_model, 0.5)
+        signs = decoder.get_initial_state(syndrome)
+        correction_dict = dict()
+        for sweep_direction in decoder.sweep_directions:
+            while np.any(signs):
+                new_signs = decoder.sweep_move(
+                    signs, correction_dict, sweep_direction
+                )
+                if np.all(new_signs == signs):
+                    break
+                signs = new_signs
+        assert np.all(correction == code.to_bsf(correction_dict))
+
+    @pytest.mark.parametrize('error_rate', [0.005, 0.05])
+    def test_frontier_sweep_same_as_full_sweep(self, error_rate):
+        code = RotatedPlanar3DCode(4, 4, 5)
+        error_model = PauliErrorModel(0.1, 0.1, 0.8)
+        frontier_decoder = RotatedSweepDecoder3D(code, error_model, 0.1)
+        frontier_decoder.frontier_fraction = 1
+        full_decoder = RotatedSweepDecoder3D(code, error_model, 0.1)
+        full_decoder.frontier_fraction = 0
+        errors = error_model.generate_batch(
+            code, error_rate, 20, rng=np.random.default_rng(0)
+        )
+        for error in errors:
+            syndrome = code.measure_syndrome(error)
+            assert np.all(
+                frontier_decoder.decode(syndrome)
+                == full_decoder.decode(syndrome)
+            )
@@ -3,6 +3,9 @@ import pytest
 import numpy as np
 from panqec.codes import Toric3DCode
 from panqec.decoders import SweepDecoder3D
+from panqec.decoders.sweepmatch._sweep_decoder_3d import (
+    odd_indices, invert_table, gather_rows
+)
 from panqec.bpauli import bcommute, bsf_wt
 from panqec.error_models import PauliErrorModel
 from panqec.utils import edge_coords, face_coords
@@ -107,6 +110,46 @@ class TestSweepDecoder3D:
             total_error = (error + correction) % 2
             assert np.all(bcommute(code.stabilizer_matrix, total_error) == 0)
 
+    def test_get_initial_state_prints_nothing(self, decoder, code, capsys):
+        syndrome = np.ones(code.stabilizer_matrix.shape[0], dtype=np.uint)
+        decoder.get_initial_state(syndrome)
+        assert capsys.readouterr().out == ''
+
+    def test_default_directions_match_single_draws(self, code):
+        error_model = PauliErrorModel(0, 0, 1)
+        batch_decoder = SweepDecoder3D(code, error_model, 0.5, seed=3)
+        single_decoder = SweepDecoder3D(code, error_model, 0.5, seed=3)
+        directions = batch_decoder.get_default_directions(20)
+        assert list(directions) == [
+            single_decoder.get_default_direction() for _ in range(20)
+        ]
+
+    def test_sweep_move_matches_decode(self, code, decoder):
+        error = code.to_bsf({(1, 0, 0): 'Z', (2, 1, 0): 'Z'})
+        syndrome = code.measure_syndrome(error)
+        signs = decoder.get_initial_state(syndrome)
+        correction = dict()
+        while np.any(signs):
+            signs = decoder.sweep_move(signs, correction)
+        assert np.all(decoder.decode(syndrome) == code.to_bsf(correction))
+
+    @pytest.mark.parametrize('error_rate', [0.005, 0.05])
+    def test_frontier_sweep_same_as_full_sweep(self, code, error_rate):
+        error_model = PauliErrorModel(0.1, 0.1, 0.8)
+        frontier_decoder = SweepDecoder3D(code, error_model, error_rate)
+        frontier_decoder.frontier_fraction = 1
+        full_decoder = SweepDecoder3D(code, error_model, error_rate)
+        full_decoder.frontier_fraction = 0
+        errors = error_model.generate_batch(
+            code, error_rate, 20, rng=np.random.default_rng(0)
+        )
+        for error in errors:
+            syndrome = code.measure_syndrome(error)
+            assert np.all(
+                frontier_decoder.decode(syndrome)
+                == full_decoder.decode(syndrome)
+            )
+
 
 class Test3x3x3SweepDecoder3D:
 
@@ -442,3 +485,15 @@ def rebuild_syndrome(code, signs):
         if signs[location]:
             reconstructed_syndrome[index] = 1
     return reconstructed_syndrome
+
+
+def test_invert_table_and_gather_rows():
+    table = np.array([[0, 2, -1], [2, 3, 1], [4, -1, -1]])
+    inverse = invert_table(table, 6)
+    indptr, rows = inverse
+    assert [
+        list(rows[indptr[key]:indptr[key + 1]]) for key in range(6)
+    ] == [[0], [1], [0, 1], [1], [2], []]
+    assert list(gather_rows(inverse, np.array([2, 4, 5]))) == [0, 1, 2]
+    assert list(gather_rows(inverse, np.array([], dtype=int))) == []
+    assert list(odd_indices(np.array([3, 1, 3, 3, 2, 2]))) == [1, 3]
@@ -0,0 +1,183 @@
+import numpy as np
+import pytest
+from panqec.codes import Toric2DCode, Toric3DCode
+from panqec.error_models import PauliErrorModel
+from panqec.decoders import BeliefPropagationOSDDecoder
+from panqec.decoders.bposd import bposd_decoder as bposd_module
+from panqec.decoders.bposd.cluster_osd import (
+    syndrome_clusters, decode_clusters
+)
+
+
+def update_probabilities_loop(correction, px, py, pz, direction):
+    """Reference implementation looping over the qubits."""
+    new_probs = np.zeros(correction.shape[0])
+    p_same, p_other = (px, pz) if direction == 'z->x' else (pz, px)
+    for i in range(correction.shape[0]):
+        if correction[i] == 1:
+            if p_other[i] + py[i] != 0:
+                new_probs[i] = py[i] / (p_other[i] + py[i])
+        else:
+            new_probs[i] = p_same[i] / (1 - p_other[i] - py[i])
+    return new_probs
+
+
+class TestBeliefPropagationOSDDecoder:
+
+    @pytest.fixture(autouse=True)
+    def empty_pool(self):
+        bposd_module.clear_decoder_pool()
+        yield
+        bposd_module.clear_decoder_pool()
+
+    @pytest.fixture
+    def code(self):
+        return Toric2DCode(4, 4)
+
+    @pytest.fixture
+    def error_model(self):
+        return PauliErrorModel(0.2, 0.3, 0.5)
+
+    def test_decoders_built_once(self, code, error_model):
+        decoder = BeliefPropagationOSDDecoder(code, error_model, 0.1)
+        syndrome = np.zeros(code.stabilizer_matrix.shape[0], dtype='uint8')
+        decoder.decode(syndrome)
+        x_decoder = decoder.x_decoder
+        decoder.decode(syndrome)
+        assert decoder._initialized
+        assert decoder.x_decoder is x_decoder
+
+    def test_pool_shared_across_error_rates(self, code, error_model):
+        decoders = [
+            BeliefPropagationOSDDecoder(code, error_model, error_rate)
+            for error_rate in [0.05, 0.1, 0.2]
+        ]
+        syndrome = np.zeros(code.stabilizer_matrix.shape[0], dtype='uint8')
+        for decoder in decoders:
+            decoder.decode(syndrome)
+        assert len(bposd_module._DECODER_POOL) == 2
+        assert all(
+            decoder.z_decoder is decoders[0].z_decoder
+            for decoder in decoders
+        )
+        assert np.allclose(decoders[-1].z_decoder.channel_probs, 0.2*0.8)
+
+    def test_same_code_size_shares_pool(self, error_model):
+        syndrome = np.zeros(Toric3DCode(3).stabilizer_matrix.shape[0])
+        first = BeliefPropagationOSDDecoder(Toric3DCode(3), error_model, 0.1)
+        second = BeliefPropagationOSDDecoder(Toric3DCode(3), error_model, 0.1)
+        other = BeliefPropagationOSDDecoder(
+            Toric3DCode(3), error_model, 0.1, osd_order=0
+        )
+        for decoder in [first, second, other]:
+            decoder.decode(syndrome)
+        assert first.x_decoder is second.x_decoder
+        assert first.x_decoder is not other.x_decoder
+
+    def test_decode_single_error(self, code, error_model):
+        decoder = BeliefPropagationOSDDecoder(code, error_model, 0.1)
+        error = code.to_bsf({code.qubit_coordinates[3]: 'Y'})
+        correction = decoder.decode(code.measure_syndrome(error))
+        total_error = (error + correction) % 2
+        assert code.in_codespace(total_error)
+        assert not code.is_logical_error(total_error)
+
+    @pytest.mark.parametrize('direction', ['x->z', 'z->x'])
+    def test_update_probabilities(self, code, error_model, direction):
+        decoder = BeliefPropagationOSDDecoder(code, error_model, 0.1)
+        rng = np.random.default_rng(0)
+        n = 50
+        px, py, pz = rng.random((3, n)) / 3
+        py[:5] = 0
+        pz[:5] = 0
+        px[:5] = 0
+        correction = rng.integers(0, 2, n)
+        correction[:5] = 1
+        assert np.allclose(
+            decoder.update_probabilities(correction, px, py, pz, direction),
+            update_probabilities_loop(correction, px, py, pz, direction)
+        )
+
+    def test_update_probabilities_invalid_direction(self, code, error_model):
+        decoder = BeliefPropagationOSDDecoder(code, error_model, 0.1)
+        with pytest.raises(ValueError):
+            decoder.update_probabilities(
+                np.zeros(3), np.zeros(3), np.zeros(3), np.zeros(3), 'y->x'
+            )
+
+    def test_invalid_cluster_radius(self, code, error_model):
+        with pytest.raises(ValueError):
+            BeliefPropagationOSDDecoder(
+                code, error_model, 0.1, cluster_radius=0
+            )
+
+    @pytest.mark.parametrize('channel_update', [False, True])
+    def test_cluster_osd_corrections_in_codespace(
+        self, error_model, channel_update
+    ):
+        code = Toric3DCode(4)
+        decoder = BeliefPropagationOSDDecoder(
+            code, error_model, 0.05, max_bp_iter=5, cluster_radius=1,
+            channel_update=channel_update
+        )
+        errors = error_model.generate_batch(
+            code, 0.05, n_shots=10, rng=np.random.default_rng(0)
+        )
+        corrections = decoder.decode_batch(code.measure_syndrome(errors))
+        total_errors = (errors + corrections) % 2
+        assert not np.any(code.measure_syndrome(total_errors))
+        assert sum(decoder.statistics.values()) == 20
+
+    def test_no_statistics_without_clusters(self, code, error_model):
+        decoder = BeliefPropagationOSDDecoder(code, error_model, 0.1)
+        decoder.decode(np.zeros(code.n_stabilizers, dtype='uint8'))
+        assert decoder.statistics == {}
+
+
+class TestClusterOSD:
+
+    @pytest.fixture
+    def repetition_code(self):
+        # Open repetition code on 9 bits.
+        check_matrix = np.zeros((8, 9), dtype=int)
+        for i in range(8):
+            check_matrix[i, i] = check_matrix[i, i + 1] = 1
+        return check_matrix
+
+    def test_syndrome_clusters(self, repetition_code):
+        syndrome = np.zeros(8, dtype=int)
+        syndrome[[1, 6]] = 1
+        clusters = syndrome_clusters(repetition_code, syndrome, radius=1)
+        assert [
+            (checks.tolist(), qubits.tolist()) for checks, qubits in clusters
+        ] == [([0, 1, 2], [1, 2]), ([5, 6, 7], [6, 7])]
+
+        # Growing by one more step merges nothing, but adds qubits.
+        clusters = syndrome_clusters(repetition_code, syndrome, radius=2)
+        assert [qubits.tolist() for _, qubits in clusters] == [
+            [0, 1, 2, 3], [5, 6, 7, 8]
+        ]
+
+        # Growing further merges the two clusters.
+        clusters = syndrome_clusters(repetition_code, syndrome, radius=3)
+        assert len(clusters) == 1
+
+    def test_no_clusters_for_trivial_syndrome(self, repetition_code):
+        assert syndrome_clusters(repetition_code, np.zeros(8)) == []
+
+    def test_decode_clusters(self, repetition_code):
+        error = np.zeros(9, dtype=int)
+        error[[2, 7]] = 1
+        syndrome = repetition_code.dot(error) % 2
+        correction = decode_clusters(
+            repetition_code, syndrome, np.full(9, 0.1), radius=1
+        )
+        assert np.all(correction == error)
+
+    def test_decode_clusters_fails_on_long_chains(self, repetition_code):
+        error = np.zeros(9, dtype=int)
+        error[2:6] = 1
+        syndrome = repetition_code.dot(error) % 2
+        assert decode_clusters(
+            repetition_code, syndrome, np.full(9, 0.1), radius=1
+        ) is None
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from panqec.codes import Toric2DCode
+from panqec.config import DECODERS
+from panqec.error_models import PauliErrorModel
+from panqec.decoders import (
+    BaseDecoder, CascadeDecoder, UnionFindDecoder, Toric2DMatchingDecoder
+)
+
+
+class TrivialDecoder(BaseDecoder):
+    """Decoder that never corrects anything."""
+
+    label = 'Trivial decoder'
+
+    def decode(self, syndrome, **kwargs):
+        return np.zeros(2*self.code.n, dtype=np.uint)
+
+
+class TestCascadeDecoder:
+
+    @pytest.fixture
+    def code(self):
+        return Toric2DCode(4)
+
+    @pytest.fixture
+    def error_model(self):
+        return PauliErrorModel(1/3, 1/3, 1/3)
+
+    def test_registered_in_config(self):
+        assert DECODERS['CascadeDecoder'] is CascadeDecoder
+
+    def test_default_tiers(self, code, error_model):
+        decoder = CascadeDecoder(code, error_model, 0.1)
+        assert [tier.label for tier in decoder.tiers] == [
+            'MBP decoder', 'BP-OSD decoder'
+        ]
+        assert decoder.tiers[0].max_bp_iter == 10
+
+    def test_no_tiers_raises_value_error(self, code, error_model):
+        with pytest.raises(ValueError):
+            CascadeDecoder(code, error_model, 0.1, tiers=[])
+
+    def test_escalates_unresolved_shots(self, code, error_model):
+        decoder = CascadeDecoder(
+            code, error_model, 0.1, tiers=[
+                TrivialDecoder,
+                {'model': 'UnionFindDecoder', 'parameters': {'max_length': 8}},
+            ]
+        )
+        assert decoder.tiers[1].max_length == 8
+
+        errors = error_model.generate_batch(
+            code, 0.1, n_shots=20, rng=np.random.default_rng(0)
+        )
+        syndromes = code.measure_syndrome(errors)
+        n_trivial = np.sum(~np.any(syndromes, axis=1))
+        assert 0 < n_trivial < 20
+
+        corrections = decoder.decode_batch(syndromes)
+        expected = UnionFindDecoder(code, error_model, 0.1).decode_batch(
+            syndromes
+        )
+        assert np.all(corrections == expected)
+        assert decoder.tier_attempts.tolist() == [20, 20 - n_trivial]
+        assert decoder.tier_hits.tolist() == [n_trivial, 20 - n_trivial]
+        assert np.allclose(decoder.hit_rates, [n_trivial/20, 1])
+
+    def test_statistics_of_unused_tier(self, code, error_model):
+        decoder = CascadeDecoder(
+            code, error_model, 0.1,
+            tiers=[Toric2DMatchingDecoder, UnionFindDecoder]
+        )
+        syndrome = np.zeros(code.n_stabilizers, dtype=np.uint)
+        assert np.all(decoder.decode(syndrome) == 0)
+        assert decoder.statistics == {
+            'tiers': ['Toric 2D Matching', 'Union-Find decoder'],
+            'tier_attempts': [1, 0],
+            'tier_hits': [1, 0],
+            'hit_rates': [1.0, None],
+        }
@@ -0,0 +1,65 @@
+import os
+import numpy as np
+import pytest
+from panqec.codes import (
+    Toric3DCode, XCubeCode, RotatedPlanar3DCode, set_code_cache_dir
+)
+from panqec.codes.base._code_cache import get_cache_path
+from panqec.bsparse import to_array
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    set_code_cache_dir(str(tmp_path))
+    yield str(tmp_path)
+    set_code_cache_dir(None)
+
+
+def test_no_cache_file_by_default(tmp_path):
+    set_code_cache_dir(None)
+    code = Toric3DCode(2)
+    assert get_cache_path(code) is None
+    code.stabilizer_matrix
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize('code_class, size, deformed_axis', [
+    (Toric3DCode, (2, 3, 4), None),
+    (XCubeCode, (2, 2, 2), None),
+    (RotatedPlanar3DCode, (2, 2, 2), 'z'),
+])
+def test_cached_matrices_equal_built_ones(
+    cache_dir, code_class, size, deformed_axis
+):
+    built_code = code_class(*size, deformed_axis=deformed_axis)
+    assert not os.path.isdir(get_cache_path(built_code))
+    built_code.stabilizer_matrix
+    assert os.path.isdir(get_cache_path(built_code))
+
+    cached_code = code_class(*size, deformed_axis=deformed_axis)
+    assert np.all(
+        to_array(cached_code.stabilizer_matrix)
+        == to_array(built_code.stabilizer_matrix)
+    )
+    assert np.all(cached_code.logicals_x == built_code.logicals_x)
+    assert np.all(cached_code.logicals_z == built_code.logicals_z)
+    assert np.all(cached_code.x_indices == built_code.x_indices)
+    assert np.all(cached_code.z_indices == built_code.z_indices)
+    assert cached_code.is_css == built_code.is_css
+
+
+def test_cache_key_depends_on_size_and_deformation(cache_dir):
+    paths = {
+        get_cache_path(Toric3DCode(2)),
+        get_cache_path(Toric3DCode(3)),
+        get_cache_path(Toric3DCode(2, deformed_axis='x')),
+    }
+    assert len(paths) == 3
+
+
+def test_corrupted_cache_file_is_rebuilt(cache_dir):
+    code = Toric3DCode(2)
+    with open(get_cache_path(code), 'w') as f:
+        f.write('not a cache directory')
+    assert code.stabilizer_matrix.shape == (code.n_stabilizers, 2*code.n)
+    assert code.k == 3
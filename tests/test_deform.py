@@ -10,6 +10,10 @@ from panqec.decoders import (
     DeformedSweepMatchDecoder, DeformedSweepDecoder3D,
     DeformedToric3DMatchingDecoder, FoliatedMatchingDecoder
 )
+from panqec.decoders.sweepmatch._deformed_decoder import (
+    clear_matching_graphs
+)
+from pymatching import Matching
 
 
 @pytest.fixture
@@ -276,6 +280,40 @@ class TestDeformedToric3DMatchingDecoder:
         assert np.all(bcommute(code.stabilizer_matrix, total_error) == 0)
         assert issubclass(correction.dtype.type, np.integer)
 
+    def test_matching_graph_shared_between_decoders(self, code, capsys):
+        clear_matching_graphs()
+        error_model = DeformedXZZXErrorModel(0.1, 0.2, 0.7)
+        decoder_1 = DeformedToric3DMatchingDecoder(code, error_model, 0.1)
+        decoder_2 = DeformedToric3DMatchingDecoder(
+            Toric3DCode(*code.size), error_model, 0.3
+        )
+        assert decoder_1.matcher is decoder_2.matcher
+        assert capsys.readouterr().out == ''
+
+    def test_shared_matching_graph_swaps_weights(self, code):
+        clear_matching_graphs()
+        error_model = DeformedXZZXErrorModel(0.1, 0.2, 0.7)
+        decoders = [
+            DeformedToric3DMatchingDecoder(code, error_model, error_rate)
+            for error_rate in [0.05, 0.3]
+        ]
+        rng = np.random.default_rng(0)
+        for decoder in decoders[::-1]:
+            errors = error_model.generate_batch(
+                code, decoder.error_rate, n_shots=5, rng=rng
+            )
+            syndromes = code.measure_syndrome(errors)
+            matcher = Matching(
+                code.Hz, spacelike_weights=decoder.get_deformed_weights()
+            )
+            for syndrome, correction in zip(
+                syndromes, decoder.decode_batch(syndromes)
+            ):
+                x_correction = matcher.decode(
+                    syndrome[code.z_indices], num_neighbours=None
+                )
+                assert np.all(correction[:code.n] == x_correction)
+
 
 class XNoiseOnYZEdgesOnly(PauliErrorModel):
     """X noise applied on y and z edges only."""
@@ -297,6 +335,18 @@ class XNoiseOnYZEdgesOnly(PauliErrorModel):
 
 class TestMatchingXNoiseOnYZEdgesOnly:
 
+    def test_generate_batch_uses_generate(self, code):
+        error_model = XNoiseOnYZEdgesOnly()
+        errors = error_model.generate_batch(
+            code, 0.5, 10, rng=np.random.default_rng(0)
+        )
+        assert np.any(errors)
+        x_axis = [
+            index for index, location in enumerate(code.qubit_coordinates)
+            if code.qubit_axis(location) == 'x'
+        ]
+        assert np.all(errors[:, x_axis] == 0)
+
     def test_decode(self, code):
         for seed in range(5):
             rng = np.random.default_rng(seed=seed)
@@ -402,3 +452,49 @@ class TestFoliatedDecoderXNoiseOnYZEdgesOnly:
                 for edge in y_edges + z_edges
                 if edge in correction_pauli
             ]), 'Non-trivial corrections should be on the y and z edges'
+
+    def test_matchers_shared_between_decoders(self, code):
+        error_model = XNoiseOnYZEdgesOnly()
+        decoder_1 = FoliatedMatchingDecoder(code, error_model, 0.1)
+        decoder_2 = FoliatedMatchingDecoder(
+            Toric3DCode(*code.size), error_model, 0.2
+        )
+        assert decoder_1.get_block_matcher() is decoder_2.get_block_matcher()
+        assert decoder_1.get_matcher_list() is decoder_2.get_matcher_list()
+
+    def test_layer_indices(self, code):
+        decoder = FoliatedMatchingDecoder(code, XNoiseOnYZEdgesOnly(), 0.1)
+        for x, vertices, qubits in zip(
+            decoder.get_layer_x(),
+            decoder.get_layer_vertices(),
+            decoder.get_layer_qubits()
+        ):
+            assert vertices == [
+                index
+                for index, location in enumerate(code.stabilizer_coordinates)
+                if code.stabilizer_type(location) == 'vertex'
+                and location[0] == x
+            ]
+            assert qubits == [
+                index
+                for index, location in enumerate(code.qubit_coordinates)
+                if code.qubit_axis(location) in ['y', 'z']
+                and location[0] == x
+            ]
+
+    def test_block_matching_same_weight_as_layer_matching(self, code):
+        error_model = XNoiseOnYZEdgesOnly()
+        decoder = FoliatedMatchingDecoder(code, error_model, 0.1)
+        rng = np.random.default_rng(0)
+        for _ in range(5):
+            error = error_model.generate(code, error_rate=0.1, rng=rng)
+            syndrome = code.measure_syndrome(error)
+            correction = decoder.decode(syndrome)
+            layer_weight = sum(
+                matcher.decode(syndrome[vertices]).sum()
+                for matcher, vertices in zip(
+                    decoder.get_matcher_list(), decoder.get_layer_vertices()
+                )
+            )
+            assert correction.sum() == layer_weight
+            assert np.all(code.measure_syndrome(correction) == syndrome)
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+from panqec import gf2
+from panqec.bpauli import brank, gf2_rank
+from panqec.codes import Toric3DCode
+
+
+def random_matrix(rng, n_rows, n_cols, density=0.3):
+    return (rng.random((n_rows, n_cols)) < density).astype(np.uint8)
+
+
+@pytest.mark.parametrize('n_cols', [1, 10, 64, 65, 150])
+def test_pack_unpack_inverse(n_cols):
+    rng = np.random.default_rng(0)
+    matrix = random_matrix(rng, 7, n_cols)
+    packed = gf2.pack_rows(matrix)
+    assert packed.dtype == np.uint64
+    assert np.all(gf2.unpack_rows(packed, n_cols) == matrix)
+    assert np.all(gf2.pack_rows(csr_matrix(matrix)) == packed)
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_rank_agrees_with_integer_elimination(seed):
+    rng = np.random.default_rng(seed)
+    matrix = random_matrix(rng, 30, 100, density=rng.random())
+    rows = [int(''.join(map(str, row)), 2) for row in matrix.astype(int)]
+    expected = gf2_rank(rows)
+    assert gf2.rank(matrix) == expected
+    assert brank(matrix) == expected
+    assert brank(csr_matrix(matrix)) == expected
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_rref(seed):
+    rng = np.random.default_rng(seed)
+    matrix = random_matrix(rng, 20, 70)
+    reduced, pivot_cols = gf2.rref(matrix)
+    rank = len(pivot_cols)
+    assert rank == gf2.rank(matrix)
+    assert np.all(reduced[rank:] == 0)
+    assert np.all(np.diff(pivot_cols) > 0)
+    assert np.all(reduced[:rank, pivot_cols] == np.eye(rank))
+
+    # Same row space.
+    assert gf2.rank(np.vstack([matrix, reduced])) == rank
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_kernel(seed):
+    rng = np.random.default_rng(seed)
+    matrix = random_matrix(rng, 20, 70)
+    basis = gf2.kernel(matrix)
+    assert basis.shape == (70 - gf2.rank(matrix), 70)
+    assert np.all(matrix.astype(int).dot(basis.T.astype(int)) % 2 == 0)
+    assert gf2.rank(basis) == basis.shape[0]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_solve(seed):
+    rng = np.random.default_rng(seed)
+    matrix = random_matrix(rng, 40, 30)
+    x = rng.integers(0, 2, 30)
+    b = matrix.astype(int).dot(x) % 2
+    solution = gf2.solve(csr_matrix(matrix), b)
+    assert np.all(matrix.astype(int).dot(solution) % 2 == b)
+
+
+def test_solve_returns_none_if_inconsistent():
+    matrix = np.array([[1, 1, 0], [0, 1, 1], [1, 0, 1]])
+    assert gf2.solve(matrix, np.array([1, 0, 0])) is None
+    assert gf2.solve(matrix, np.array([1, 1, 0])) is not None
+
+
+def test_number_of_logicals_of_3d_toric_code():
+    code = Toric3DCode(4, 5, 6)
+    rank = gf2.rank(code.stabilizer_matrix)
+    assert code.n - rank == code.k == 3
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from panqec import gf2
+from panqec.bpauli import bcommute, bsf_wt
+from panqec.codes import (
+    Toric2DCode, Toric3DCode, RotatedPlanar3DCode, RotatedToric3DCode,
+    XCubeCode, RhombicCode
+)
+
+
+def without_logicals(code_class):
+    """Subclass of a code that does not supply its logical operators."""
+
+    class DerivedLogicalsCode(code_class):
+        def get_logicals_x(self):
+            return None
+
+        def get_logicals_z(self):
+            return None
+
+    return DerivedLogicalsCode
+
+
+@pytest.mark.parametrize('code_class, size, deformed_axis', [
+    (Toric2DCode, (4, 5), None),
+    (Toric2DCode, (4, 4), 'x'),
+    (Toric3DCode, (3, 4, 3), None),
+    (RotatedPlanar3DCode, (4, 4, 3), None),
+    (RotatedToric3DCode, (4, 4, 3), 'z'),
+    (XCubeCode, (3, 3, 3), None),
+    (RhombicCode, (4, 4, 4), None),
+])
+def test_derived_logicals_form_symplectic_basis(
+    code_class, size, deformed_axis
+):
+    code = without_logicals(code_class)(*size, deformed_axis=deformed_axis)
+    reference = code_class(*size, deformed_axis=deformed_axis)
+    H = code.stabilizer_matrix
+    logicals_x = code.logicals_x
+    logicals_z = code.logicals_z
+
+    assert code.k == reference.k
+    assert logicals_z.shape == logicals_x.shape == (code.k, 2*code.n)
+    assert np.all(bcommute(H, logicals_x) == 0)
+    assert np.all(bcommute(H, logicals_z) == 0)
+    assert np.all(
+        bcommute(logicals_x, logicals_z).reshape(code.k, code.k)
+        == np.eye(code.k)
+    )
+
+    stacked = np.vstack([H.toarray(), logicals_x, logicals_z])
+    assert gf2.rank(stacked) == gf2.rank(H) + 2*code.k
+
+    if code.is_css:
+        assert np.all(logicals_x[:, code.n:] == 0)
+        assert np.all(logicals_z[:, :code.n] == 0)
+
+
+def test_min_weight_reduction_finds_string_logicals():
+    code = without_logicals(Toric3DCode)(5)
+    logicals_x, logicals_z = code.derive_logicals(min_weight=True)
+    assert all(bsf_wt(logical) == 5 for logical in logicals_x)
+    assert all(bsf_wt(logical) == 25 for logical in logicals_z)
+
+    unreduced_x, _ = code.derive_logicals(min_weight=False)
+    assert sum(map(bsf_wt, logicals_x)) <= sum(map(bsf_wt, unreduced_x))
@@ -0,0 +1,117 @@
+import os
+import numpy as np
+import pytest
+from panqec.codes import Toric2DCode, Planar2DCode
+from panqec.config import DECODERS
+from panqec.error_models import PauliErrorModel
+from panqec.decoders import LookupTableDecoder, UnionFindDecoder
+from panqec.decoders.lookup._lookup_table_decoder import (
+    build_table, clear_tables, independent_checks
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_tables():
+    clear_tables()
+    yield
+    clear_tables()
+
+
+def test_build_table_repetition_code():
+    # Repetition code on 3 bits, with both checks independent.
+    check_matrix = np.array([[1, 1, 0], [0, 1, 1]], dtype=np.uint8)
+    assert independent_checks(check_matrix).tolist() == [0, 1]
+    table = build_table(check_matrix, np.ones(3), max_weight=1)
+    assert table.shape == (4, 1)
+    corrections = np.unpackbits(table, axis=1, count=3, bitorder='little')
+    assert corrections.tolist() == [[0, 0, 0], [1, 0, 0], [0, 0, 1], [0, 1, 0]]
+
+
+def test_build_table_prefers_cheap_errors():
+    check_matrix = np.array([[1, 1, 0], [0, 1, 1]], dtype=np.uint8)
+    table = build_table(check_matrix, np.array([1, 3, 1]), max_weight=2)
+    corrections = np.unpackbits(table, axis=1, count=3, bitorder='little')
+
+    # The two outer bits are cheaper than the middle one.
+    assert corrections[3].tolist() == [1, 0, 1]
+
+    # The lightest error is kept between errors of the same cost.
+    table = build_table(check_matrix, np.array([1, 2, 1]), max_weight=2)
+    corrections = np.unpackbits(table, axis=1, count=3, bitorder='little')
+    assert corrections[3].tolist() == [0, 1, 0]
+
+
+class TestLookupTableDecoder:
+
+    def test_registered_in_config(self):
+        assert DECODERS['LookupTableDecoder'] is LookupTableDecoder
+
+    def test_non_css_code_raises_value_error(self):
+        code = Toric2DCode(3, deformed_axis='x')
+        with pytest.raises(ValueError):
+            LookupTableDecoder(code, PauliErrorModel(1/3, 1/3, 1/3), 0.1)
+
+    def test_too_many_checks_raises_value_error(self):
+        with pytest.raises(ValueError):
+            LookupTableDecoder(
+                Toric2DCode(4), PauliErrorModel(1/3, 1/3, 1/3), 0.1,
+                max_checks=10
+            )
+
+    @pytest.mark.parametrize('code', [Toric2DCode(3), Planar2DCode(3)])
+    @pytest.mark.parametrize('pauli', ['X', 'Y', 'Z'])
+    def test_decode_single_qubit_errors(self, code, pauli):
+        decoder = LookupTableDecoder(
+            code, PauliErrorModel(1/3, 1/3, 1/3), 0.1, max_weight=2
+        )
+        for location in code.qubit_coordinates:
+            error = code.to_bsf({location: pauli})
+            correction = decoder.decode(code.measure_syndrome(error))
+            total_error = (error + correction) % 2
+            assert code.in_codespace(total_error)
+            assert not code.is_logical_error(total_error)
+        assert decoder.statistics == {
+            'table_hits': code.n, 'table_misses': 0
+        }
+
+    def test_tables_saved_and_memory_mapped(self, tmp_path):
+        code = Toric2DCode(3)
+        error_model = PauliErrorModel(1/3, 1/3, 1/3)
+        decoder = LookupTableDecoder(
+            code, error_model, 0.1, table_dir=str(tmp_path)
+        )
+        errors = error_model.generate_batch(
+            code, 0.1, n_shots=50, rng=np.random.default_rng(0)
+        )
+        syndromes = code.measure_syndrome(errors)
+        corrections = decoder.decode_batch(syndromes)
+
+        table_files = os.listdir(os.path.join(tmp_path, 'lookup_tables'))
+        assert len(table_files) == 2
+        assert all(name.endswith('.npy') for name in table_files)
+        for _, _, table in decoder._sectors:
+            assert isinstance(table, np.memmap)
+
+        # Another decoder at another error rate loads the same tables.
+        clear_tables()
+        other_decoder = LookupTableDecoder(
+            code, error_model, 0.2, table_dir=str(tmp_path)
+        )
+        assert np.all(other_decoder.decode_batch(syndromes) == corrections)
+        assert len(os.listdir(os.path.join(tmp_path, 'lookup_tables'))) == 2
+
+    def test_missing_syndromes_use_base_decoder(self):
+        code = Toric2DCode(4)
+        error_model = PauliErrorModel(1/3, 1/3, 1/3)
+        decoder = LookupTableDecoder(
+            code, error_model, 0.2, max_weight=1,
+            base_decoder=UnionFindDecoder
+        )
+        errors = error_model.generate_batch(
+            code, 0.2, n_shots=100, rng=np.random.default_rng(0)
+        )
+        corrections = decoder.decode_batch(code.measure_syndrome(errors))
+        total_errors = (errors + corrections) % 2
+        assert not np.any(code.measure_syndrome(total_errors))
+        assert decoder.n_table_misses > 0
+        assert decoder.n_table_hits + decoder.n_table_misses == 100
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+from panqec.codes import Toric2DCode, Toric3DCode, Planar2DCode
+from panqec.error_models import PauliErrorModel
+from panqec.decoders import MemoryBeliefPropagationDecoder
+from panqec.decoders.bposd.mbp_decoder import (
+    symplectic_to_pauli, serial_levels, segment_sum
+)
+
+
+def test_symplectic_to_pauli():
+    H = csr_matrix(np.array([[1, 1, 0, 1], [1, 0, 1, 1]]))
+    assert np.array_equal(
+        symplectic_to_pauli(H).toarray(), [[1, 2], [2, 3]]
+    )
+
+
+def test_segment_sum_with_empty_segments():
+    values = np.array([[1, 2, 3, 4], [5, 6, 7, 8]])
+    indptr = np.array([0, 2, 2, 4, 4])
+    assert np.array_equal(
+        segment_sum(values, indptr), [[3, 0, 7, 0], [11, 0, 15, 0]]
+    )
+
+
+@pytest.mark.parametrize('code', [Toric2DCode(4), Toric3DCode(3)])
+def test_serial_levels_do_not_share_stabilizers(code):
+    H_pauli = symplectic_to_pauli(code.stabilizer_matrix)
+    levels = serial_levels(H_pauli)
+    for row in range(H_pauli.shape[0]):
+        qubits = H_pauli.indices[H_pauli.indptr[row]:H_pauli.indptr[row + 1]]
+        assert len(set(levels[qubits])) == len(qubits)
+
+
+class TestMemoryBeliefPropagationDecoder:
+
+    @pytest.mark.parametrize('code', [
+        Toric2DCode(4), Planar2DCode(3), Toric3DCode(3)
+    ])
+    @pytest.mark.parametrize('pauli', ['X', 'Y', 'Z'])
+    def test_decode_single_qubit_errors(self, code, pauli):
+        error_model = PauliErrorModel(1/3, 1/3, 1/3)
+        decoder = MemoryBeliefPropagationDecoder(
+            code, error_model, 0.1, max_bp_iter=20
+        )
+        for location in code.qubit_coordinates[:10]:
+            error = code.to_bsf({location: pauli})
+            correction = decoder.decode(code.measure_syndrome(error))
+            total_error = (error + correction) % 2
+            assert code.in_codespace(total_error)
+            assert not code.is_logical_error(total_error)
+
+    def test_memory_scales_with_edges(self):
+        code = Toric3DCode(4)
+        decoder = MemoryBeliefPropagationDecoder(
+            code, PauliErrorModel(1/3, 1/3, 1/3), 0.1
+        )
+        assert decoder._initial_gamma.shape == (
+            3, code.stabilizer_matrix.getnnz()
+        )
+
+    def test_no_output(self, capsys):
+        code = Toric2DCode(3)
+        decoder = MemoryBeliefPropagationDecoder(
+            code, PauliErrorModel(1/3, 1/3, 1/3), 0.1, max_bp_iter=5
+        )
+        decoder.decode(np.ones(code.stabilizer_matrix.shape[0], dtype=int))
+        assert capsys.readouterr().out == ''
+
+    def test_decode_batch_matches_decode(self):
+        code = Toric3DCode(3)
+        error_model = PauliErrorModel(0.2, 0.3, 0.5)
+        decoder = MemoryBeliefPropagationDecoder(
+            code, error_model, 0.1, max_bp_iter=20
+        )
+        errors = error_model.generate_batch(
+            code, 0.08, 10, rng=np.random.default_rng(0)
+        )
+        syndromes = np.array([code.measure_syndrome(e) for e in errors])
+        corrections = decoder.decode_batch(syndromes)
+        assert corrections.shape == (10, 2*code.n)
+        for syndrome, correction in zip(syndromes, corrections):
+            assert np.array_equal(decoder.decode(syndrome), correction)
+
+    def test_decode_batch_empty(self):
+        code = Toric2DCode(3)
+        decoder = MemoryBeliefPropagationDecoder(
+            code, PauliErrorModel(1/3, 1/3, 1/3), 0.1
+        )
+        syndromes = np.zeros((0, code.stabilizer_matrix.shape[0]), dtype=int)
+        assert decoder.decode_batch(syndromes).shape == (0, 2*code.n)
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from panqec.codes import Toric2DCode
+from panqec.error_models import PauliErrorModel
+from panqec.decoders import (
+    BaseDecoder, MemoizedDecoder, Toric2DMatchingDecoder
+)
+from panqec.decoders.cascade._cascade_decoder import build_decoder
+
+
+class CountingDecoder(BaseDecoder):
+    """Matching decoder counting the syndromes it decodes."""
+
+    label = 'Counting decoder'
+
+    def __init__(self, code, error_model, error_rate):
+        super().__init__(code, error_model, error_rate)
+        self.matcher = Toric2DMatchingDecoder(code, error_model, error_rate)
+        self.n_decoded = 0
+
+    def decode(self, syndrome, **kwargs):
+        self.n_decoded += 1
+        return self.matcher.decode(syndrome)
+
+
+@pytest.fixture
+def code():
+    return Toric2DCode(3)
+
+
+@pytest.fixture
+def error_model():
+    return PauliErrorModel(1/3, 1/3, 1/3)
+
+
+def test_cache_size_must_be_positive(code, error_model):
+    with pytest.raises(ValueError):
+        MemoizedDecoder(CountingDecoder(code, error_model, 0.1), 0)
+
+
+def test_zero_syndrome_not_decoded(code, error_model):
+    decoder = MemoizedDecoder(CountingDecoder(code, error_model, 0.1), 4)
+    corrections = decoder.decode_batch(
+        np.zeros((3, code.n_stabilizers), dtype=np.uint)
+    )
+    assert corrections.shape == (3, 2*code.n)
+    assert not np.any(corrections)
+    assert decoder.decoder.n_decoded == 0
+    assert decoder.statistics == {
+        'zero_syndromes': 3, 'cache_hits': 0, 'cache_misses': 0
+    }
+
+
+def test_same_corrections_as_decoder(code, error_model):
+    decoder = MemoizedDecoder(CountingDecoder(code, error_model, 0.1), 100)
+    errors = error_model.generate_batch(
+        code, 0.05, n_shots=200, rng=np.random.default_rng(0)
+    )
+    syndromes = code.measure_syndrome(errors)
+    corrections = decoder.decode_batch(syndromes)
+    assert np.all(
+        corrections == decoder.decoder.matcher.decode_batch(syndromes)
+    )
+
+    # Each distinct nonzero syndrome is decoded exactly once.
+    nonzero = syndromes[np.any(syndromes, axis=1)]
+    n_distinct = len(np.unique(nonzero, axis=0))
+    assert decoder.decoder.n_decoded == n_distinct
+    assert decoder.n_cache_misses == n_distinct
+    assert decoder.n_cache_hits == len(nonzero) - n_distinct
+
+    # Decoding them again only hits the cache.
+    assert np.all(decoder.decode_batch(syndromes) == corrections)
+    assert decoder.decoder.n_decoded == n_distinct
+
+
+def test_least_recently_used_evicted(code, error_model):
+    decoder = MemoizedDecoder(CountingDecoder(code, error_model, 0.1), 2)
+    syndromes = code.measure_syndrome(np.array([
+        code.to_bsf({location: 'X'}) for location in code.qubit_coordinates[:3]
+    ]))
+    decoder.decode(syndromes[0])
+    decoder.decode(syndromes[1])
+    decoder.decode(syndromes[0])
+    decoder.decode(syndromes[2])
+    assert decoder.decoder.n_decoded == 3
+
+    # The second syndrome was evicted, while the first one was kept.
+    decoder.decode(syndromes[0])
+    assert decoder.decoder.n_decoded == 3
+    decoder.decode(syndromes[1])
+    assert decoder.decoder.n_decoded == 4
+
+
+def test_build_decoder_with_cache_size(code, error_model):
+    decoder = build_decoder(
+        {'model': 'Toric2DMatchingDecoder', 'parameters': {'cache_size': 8}},
+        code, error_model, 0.1
+    )
+    assert isinstance(decoder, MemoizedDecoder)
+    assert isinstance(decoder.decoder, Toric2DMatchingDecoder)
+    assert decoder.label == decoder.decoder.label
@@ -78,6 +78,38 @@ class TestPauliNoise:
         with pytest.raises(ValueError):
             PauliErrorModel(0, 0, 0)
 
+    def test_generate_batch(self, code, error_model):
+        n_shots = 7
+        errors = error_model.generate_batch(code, 0.1, n_shots, rng=np.random)
+        assert errors.shape == (n_shots, 2*code.n)
+        assert errors.dtype == np.uint8
+        assert np.any(errors != 0)
+
+    @pytest.mark.parametrize('sparse_threshold', [0, 1])
+    def test_empirical_pauli_rates(self, code, error_model, sparse_threshold):
+        error_model.sparse_threshold = sparse_threshold
+        error_rate = 0.05
+        n_shots = 2000
+        rng = np.random.default_rng(0)
+        errors = error_model.generate_batch(code, error_rate, n_shots, rng)
+        x_part = errors[:, :code.n].astype(bool)
+        z_part = errors[:, code.n:].astype(bool)
+        rates = [
+            np.mean(x_part & ~z_part),
+            np.mean(x_part & z_part),
+            np.mean(~x_part & z_part),
+        ]
+        assert np.allclose(
+            rates, error_rate*np.array(error_model.direction), rtol=0.1
+        )
+
+    def test_deformed_generate_batch(self, code):
+        error_model = DeformedXZZXErrorModel(0.2, 0.3, 0.5)
+        errors = error_model.generate_batch(
+            code, 0.02, 5, rng=np.random.default_rng(0)
+        )
+        assert errors.shape == (5, 2*code.n)
+
 
 class TestGeneratePauliNoise:
 
@@ -0,0 +1,142 @@
+import pickle
+import numpy as np
+import pytest
+from pymatching import Matching
+from panqec.codes import (
+    Toric2DCode, Toric3DCode, get_code_cache_dir, set_code_cache_dir
+)
+from panqec.error_models import PauliErrorModel, DeformedXZZXErrorModel
+from panqec.decoders import (
+    BeliefPropagationOSDDecoder, Toric3DMatchingDecoder, SweepMatchDecoder,
+    DeformedSweepMatchDecoder, UnionFindDecoder, CascadeDecoder,
+    MemoizedDecoder
+)
+
+
+@pytest.fixture(autouse=True)
+def no_code_cache():
+    cache_dir = get_code_cache_dir()
+    set_code_cache_dir(None)
+    yield
+    set_code_cache_dir(cache_dir)
+
+
+class TestPickleCode:
+
+    def test_unbuilt_code(self):
+        code = Toric2DCode(3, 4)
+        unpickled = pickle.loads(pickle.dumps(code))
+        assert unpickled.size == code.size
+        assert unpickled.label == code.label
+        assert (unpickled.stabilizer_matrix != code.stabilizer_matrix).nnz == 0
+
+    def test_built_matrices_pickled(self):
+        code = Toric2DCode(3, deformed_axis='x')
+        code.stabilizer_matrix
+        code.logicals_x
+        state = code.__getstate__()
+        assert 'stabilizer_matrix' in state
+        unpickled = pickle.loads(pickle.dumps(code))
+        assert unpickled._deformed_axis == 'x'
+        assert not unpickled.is_css
+        assert np.all(unpickled.logicals_x == code.logicals_x)
+
+    def test_only_size_pickled_with_code_cache(self, tmp_path):
+        set_code_cache_dir(str(tmp_path))
+        code = Toric3DCode(3)
+        assert code.__getstate__() == {
+            'size': (3, 3, 3), 'deformed_axis': None
+        }
+        unpickled = pickle.loads(pickle.dumps(code))
+        assert np.all(unpickled.logicals_z == code.logicals_z)
+
+
+@pytest.mark.parametrize('decoder_class, error_model', [
+    (Toric3DMatchingDecoder, PauliErrorModel(1/3, 1/3, 1/3)),
+    (SweepMatchDecoder, PauliErrorModel(1/3, 1/3, 1/3)),
+    (DeformedSweepMatchDecoder, DeformedXZZXErrorModel(0.1, 0.2, 0.7)),
+    (BeliefPropagationOSDDecoder, PauliErrorModel(1/3, 1/3, 1/3)),
+    (UnionFindDecoder, PauliErrorModel(1/3, 1/3, 1/3)),
+    (CascadeDecoder, PauliErrorModel(1/3, 1/3, 1/3)),
+])
+def test_unpickled_decoder_same_corrections(decoder_class, error_model):
+    code = Toric3DCode(3)
+    decoder = decoder_class(code, error_model, 0.05)
+    errors = error_model.generate_batch(
+        code, 0.05, n_shots=10, rng=np.random.default_rng(0)
+    )
+    syndromes = code.measure_syndrome(errors)
+
+    unpickled = pickle.loads(pickle.dumps(decoder))
+    assert unpickled.label == decoder.label
+    assert np.all(
+        unpickled.decode_batch(syndromes) == decoder.decode_batch(syndromes)
+    )
+
+
+def test_unpickled_decoder_native_objects_rebuilt():
+    code = Toric3DCode(3)
+    decoder = Toric3DMatchingDecoder(
+        code, PauliErrorModel(1/3, 1/3, 1/3), 0.1
+    )
+    assert 'matcher' not in decoder.__getstate__()
+    unpickled = pickle.loads(pickle.dumps(decoder))
+    assert isinstance(unpickled.matcher, Matching)
+    assert unpickled.error_rate == 0.1
+    assert unpickled.code.size == (3, 3, 3)
+
+    # An unpickled decoder can be pickled again.
+    assert pickle.loads(pickle.dumps(unpickled)).error_rate == 0.1
+
+    with pytest.raises(AttributeError):
+        unpickled.missing_attribute
+
+
+def test_unpickled_decoder_keeps_state():
+    code = Toric3DCode(3)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    decoder = SweepMatchDecoder(code, error_model, 0.05)
+    errors = error_model.generate_batch(
+        code, 0.05, n_shots=10, rng=np.random.default_rng(0)
+    )
+    syndromes = code.measure_syndrome(errors)
+    decoder.decode_batch(syndromes)
+
+    # The random number generator of the sweeper continues where it was.
+    unpickled = pickle.loads(pickle.dumps(decoder))
+    assert np.all(
+        unpickled.decode_batch(syndromes) == decoder.decode_batch(syndromes)
+    )
+
+
+def test_bposd_statistics_pickled():
+    code = Toric2DCode(3)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    decoder = BeliefPropagationOSDDecoder(
+        code, error_model, 0.1, cluster_radius=1
+    )
+    error = code.to_bsf({code.qubit_coordinates[0]: 'X'})
+    decoder.decode(code.measure_syndrome(error))
+    unpickled = pickle.loads(pickle.dumps(decoder))
+    assert not unpickled._initialized
+    assert unpickled.statistics == decoder.statistics
+    assert np.all(
+        unpickled.decode(code.measure_syndrome(error))
+        == decoder.decode(code.measure_syndrome(error))
+    )
+
+
+def test_memoized_decoder_cache_pickled():
+    code = Toric2DCode(3)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    decoder = MemoizedDecoder(
+        BeliefPropagationOSDDecoder(code, error_model, 0.1), 8
+    )
+    error = code.to_bsf({code.qubit_coordinates[0]: 'X'})
+    decoder.decode(code.measure_syndrome(error))
+    unpickled = pickle.loads(pickle.dumps(decoder))
+    assert unpickled.cache_size == 8
+    assert len(unpickled._cache) == 1
+    assert unpickled.statistics['cache_misses'] == 1
+    unpickled.decode(code.measure_syndrome(error))
+    assert unpickled.statistics['cache_hits'] == 1
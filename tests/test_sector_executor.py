@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from panqec.codes import Toric3DCode, RotatedPlanar3DCode
+from panqec.error_models import PauliErrorModel, DeformedXZZXErrorModel
+from panqec.decoders import (
+    SweepMatchDecoder, RotatedSweepMatchDecoder, DeformedSweepMatchDecoder,
+    RotatedInfiniteZBiasDecoder, BeliefPropagationOSDDecoder
+)
+from panqec.decoders.base._sector_executor import run_sectors
+
+
+def test_run_sectors_keeps_order():
+    tasks = [lambda: 1, lambda: 2]
+    assert run_sectors(tasks) == [1, 2]
+    assert run_sectors(tasks, 'thread') == [1, 2]
+
+
+def test_unknown_sector_executor_raises_value_error():
+    with pytest.raises(ValueError):
+        run_sectors([lambda: 1], 'fork')
+    with pytest.raises(ValueError):
+        SweepMatchDecoder(
+            Toric3DCode(3), PauliErrorModel(1/3, 1/3, 1/3), 0.1,
+            sector_executor='fork'
+        )
+
+
+@pytest.mark.parametrize('decoder_class, code, error_model, parameters', [
+    (
+        SweepMatchDecoder, Toric3DCode(3),
+        PauliErrorModel(1/3, 1/3, 1/3), {}
+    ),
+    (
+        RotatedSweepMatchDecoder, RotatedPlanar3DCode(3),
+        PauliErrorModel(1/3, 1/3, 1/3), {}
+    ),
+    (
+        DeformedSweepMatchDecoder, Toric3DCode(3),
+        DeformedXZZXErrorModel(0.1, 0.2, 0.7), {}
+    ),
+    (
+        RotatedInfiniteZBiasDecoder, RotatedPlanar3DCode(3, 3, 3),
+        PauliErrorModel(0, 0, 1), {}
+    ),
+    (
+        BeliefPropagationOSDDecoder, Toric3DCode(3),
+        PauliErrorModel(1/3, 1/3, 1/3), {'osd_order': 0}
+    ),
+])
+def test_thread_executor_same_corrections(
+    decoder_class, code, error_model, parameters
+):
+    errors = error_model.generate_batch(
+        code, 0.05, n_shots=10, rng=np.random.default_rng(0)
+    )
+    syndromes = code.measure_syndrome(errors)
+    serial_decoder = decoder_class(code, error_model, 0.05, **parameters)
+    thread_decoder = decoder_class(
+        code, error_model, 0.05, sector_executor='thread', **parameters
+    )
+    for syndrome in syndromes:
+        assert np.all(
+            serial_decoder.decode(syndrome) == thread_decoder.decode(syndrome)
+        )
+    assert np.all(
+        serial_decoder.decode_batch(syndromes)
+        == thread_decoder.decode_batch(syndromes)
+    )
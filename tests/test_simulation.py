@@ -1,13 +1,18 @@
 import os
 import json
+import tempfile
 import pytest
 import numpy as np
 from panqec.error_models import PauliErrorModel
-from panqec.codes import Toric2DCode
-from panqec.decoders import BeliefPropagationOSDDecoder
+from panqec.codes import Toric2DCode, get_code_cache_dir, set_code_cache_dir
+from panqec.decoders import (
+    BeliefPropagationOSDDecoder, CascadeDecoder, MemoizedDecoder,
+    Toric2DMatchingDecoder
+)
 from panqec.simulation import (
-    read_input_json, run_once, Simulation, expand_input_ranges, run_file,
-    merge_results_dicts, filter_legacy_params
+    read_input_json, run_once, run_batch, Simulation, expand_input_ranges,
+    run_file, merge_results_dicts, filter_legacy_params, parse_run,
+    BatchSimulation
 )
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
@@ -77,6 +82,64 @@ class TestRunOnce:
             run_once(code, error_model, decoder, error_rate=error_rate)
 
 
+class TestRunBatch:
+    @pytest.fixture
+    def code(self):
+        return Toric2DCode(3, 3)
+
+    @pytest.fixture
+    def error_model(self):
+        return PauliErrorModel(1/3, 1/3, 1/3)
+
+    def test_run_batch(self, required_fields, code, error_model):
+        error_rate = 0.1
+        n_shots = 7
+        decoder = BeliefPropagationOSDDecoder(code, error_model, error_rate)
+        rng = np.random.default_rng(0)
+        results = run_batch(
+            code, error_model, decoder, error_rate=error_rate,
+            n_shots=n_shots, rng=rng
+        )
+        assert set(required_fields).issubset(results.keys())
+        assert results['error'].shape == (n_shots, 2*code.n)
+        assert results['syndrome'].shape == (
+            n_shots, code.stabilizer_matrix.shape[0]
+        )
+        assert results['correction'].shape == (n_shots, 2*code.n)
+        assert results['effective_error'].shape == (
+            n_shots, 2*code.logicals_x.shape[0]
+        )
+        assert results['success'].shape == (n_shots,)
+        assert results['codespace'].shape == (n_shots,)
+
+    def test_run_batch_matches_single_shots(self, code, error_model):
+        error_rate = 0.2
+        n_shots = 5
+        decoder = BeliefPropagationOSDDecoder(code, error_model, error_rate)
+        results = run_batch(
+            code, error_model, decoder, error_rate=error_rate,
+            n_shots=n_shots, rng=np.random.default_rng(0)
+        )
+        for i_shot in range(n_shots):
+            error = results['error'][i_shot]
+            assert np.all(
+                results['syndrome'][i_shot] == code.measure_syndrome(error)
+            )
+            total_error = (results['correction'][i_shot] + error) % 2
+            assert np.all(
+                results['effective_error'][i_shot]
+                == code.logical_errors(total_error)
+            )
+            assert results['codespace'][i_shot] == code.in_codespace(
+                total_error
+            )
+
+    def test_run_batch_invalid_probability(self, code, error_model):
+        decoder = BeliefPropagationOSDDecoder(code, error_model, 0.5)
+        with pytest.raises(ValueError):
+            run_batch(code, error_model, decoder, error_rate=2, n_shots=3)
+
+
 class TestSimulationToric2DCode():
 
     error_rate = 0.5
@@ -101,6 +164,92 @@ class TestSimulationToric2DCode():
         assert len(simulation._results['success']) == 10
         assert set(required_fields).issubset(simulation._results.keys())
 
+    def test_run_in_batches(self, code, error_model, decoder):
+        simulation = Simulation(
+            code, error_model, decoder, self.error_rate, batch_size=3
+        )
+        simulation.run(10)
+        assert simulation.n_results == 10
+        assert len(simulation._results['effective_error']) == 10
+        assert all(
+            isinstance(success, bool)
+            for success in simulation._results['success']
+        )
+
+    def test_save_results_without_statistics(
+        self, code, error_model, decoder, tmpdir
+    ):
+        simulation = Simulation(code, error_model, decoder, self.error_rate)
+        simulation.run(2)
+        simulation.save_results(str(tmpdir))
+        with open(simulation.get_file_path(str(tmpdir))) as f:
+            assert 'statistics' not in json.load(f)
+
+    def test_save_results_with_decoder_statistics(
+        self, code, error_model, tmpdir
+    ):
+        decoder = CascadeDecoder(code, error_model, self.error_rate)
+        simulation = Simulation(code, error_model, decoder, self.error_rate)
+        simulation.run(5)
+        simulation.save_results(str(tmpdir))
+        with open(simulation.get_file_path(str(tmpdir))) as f:
+            statistics = json.load(f)['statistics']
+        assert statistics['tier_attempts'][0] == 5
+
+    def test_save_results_with_cache_statistics(self, tmpdir):
+        simulation = parse_run({
+            'code': {'model': 'Toric2DCode', 'parameters': [3]},
+            'noise': {
+                'model': 'PauliErrorModel',
+                'parameters': {'r_x': 1/3, 'r_y': 1/3, 'r_z': 1/3}
+            },
+            'decoder': {
+                'model': 'BeliefPropagationOSDDecoder',
+                'parameters': {'cache_size': 16}
+            },
+            'probability': 0.05,
+        })
+        assert isinstance(simulation.decoder, MemoizedDecoder)
+        simulation.run(20)
+        simulation.save_results(str(tmpdir))
+        with open(simulation.get_file_path(str(tmpdir))) as f:
+            statistics = json.load(f)['statistics']
+        assert sum(
+            statistics[key]
+            for key in ['zero_syndromes', 'cache_hits', 'cache_misses']
+        ) == 20
+
+    def test_resumed_run_keeps_cache_statistics(self, tmpdir):
+        run = {
+            'code': {'model': 'Toric2DCode', 'parameters': [3]},
+            'noise': {
+                'model': 'PauliErrorModel',
+                'parameters': {'r_x': 1/3, 'r_y': 1/3, 'r_z': 1/3}
+            },
+            'decoder': {
+                'model': 'BeliefPropagationOSDDecoder',
+                'parameters': {'cache_size': 16}
+            },
+            'probability': 0.05,
+        }
+        simulation = parse_run(run)
+        simulation.run(50)
+        simulation.save_results(str(tmpdir))
+
+        # Loading the results twice must not count their statistics twice.
+        simulation = parse_run(run)
+        simulation.load_results(str(tmpdir))
+        simulation.load_results(str(tmpdir))
+        simulation.run(100 - simulation.n_results)
+        simulation.save_results(str(tmpdir))
+        with open(simulation.get_file_path(str(tmpdir))) as f:
+            data = json.load(f)
+        assert len(data['results']['success']) == 100
+        assert sum(
+            data['statistics'][key]
+            for key in ['zero_syndromes', 'cache_hits', 'cache_misses']
+        ) == 100
+
 
 @pytest.fixture
 def example_ranges():
@@ -194,3 +343,157 @@ def test_filter_legacy_params():
     }
     filtered_params = filter_legacy_params(old_params)
     assert 'joschka' not in filtered_params
+
+
+def test_run_file_parallel_workers(tmpdir):
+    input_json = os.path.join(DATA_DIR, 'single_input.json')
+    n_trials = 7
+    run_file(
+        input_json, n_trials, output_dir=tmpdir, batch_size=2, workers=2
+    )
+    batch_sim = read_input_json(input_json, output_dir=tmpdir)
+    batch_sim.load_results()
+    for simulation in batch_sim:
+        assert simulation.n_results == n_trials
+        assert len(simulation.results['effective_error']) == n_trials
+        assert simulation.wall_time > 0
+
+
+def test_parallel_runs_reproducible_with_seed(tmpdir):
+    input_json = os.path.join(DATA_DIR, 'single_input.json')
+    all_results = []
+    for i_run in range(2):
+        output_dir = os.path.join(tmpdir, str(i_run))
+        batch_sim = read_input_json(
+            input_json, output_dir=output_dir, batch_size=3, workers=2,
+            seed=1
+        )
+        batch_sim.run(8)
+        all_results.append([
+            simulation.results['effective_error']
+            for simulation in batch_sim
+        ])
+    assert np.array_equal(all_results[0], all_results[1])
+
+
+def test_parallel_run_ships_simulations(tmpdir):
+    # The simulations are pickled to the workers, without their results.
+    code = Toric2DCode(3)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    batch_sim = BatchSimulation(
+        output_dir=str(tmpdir), batch_size=2, workers=2, seed=0
+    )
+    batch_sim.append(Simulation(
+        code, error_model, Toric2DMatchingDecoder(code, error_model, 0.1),
+        0.1
+    ))
+    batch_sim.run(5)
+    assert batch_sim._simulations[0].n_results == 5
+
+
+def test_worker_input_from_input_file(tmpdir):
+    # Simulations read from an input file are not built again by the
+    # workers, which get the code, error model and decoder of each one.
+    input_json = os.path.join(DATA_DIR, 'range_input.json')
+    batch_sim = read_input_json(input_json, output_dir=str(tmpdir))
+    worker_input = batch_sim._get_worker_input()
+    assert len(worker_input) == len(batch_sim._simulations)
+    for simulation, (code, error_model, decoder, error_rate) in zip(
+        batch_sim._simulations, worker_input
+    ):
+        assert code is simulation.code
+        assert error_model is simulation.error_model
+        assert decoder is simulation.decoder
+        assert error_rate == simulation.error_rate
+
+
+def test_parallel_run_merges_decoder_statistics(tmpdir):
+    code = Toric2DCode(3)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    batch_sim = BatchSimulation(
+        output_dir=str(tmpdir), batch_size=4, workers=2, seed=0
+    )
+    batch_sim.append(Simulation(
+        code, error_model, CascadeDecoder(code, error_model, 0.1), 0.1
+    ))
+    batch_sim.run(10)
+    simulation = batch_sim._simulations[0]
+    with open(simulation.get_file_path(batch_sim._output_dir)) as f:
+        statistics = json.load(f)['statistics']
+    assert statistics['tier_attempts'][0] == 10
+    assert statistics['hit_rates'][0] is not None
+
+
+def test_parallel_run_merges_cache_statistics(tmpdir):
+    code = Toric2DCode(3)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    batch_sim = BatchSimulation(
+        output_dir=str(tmpdir), batch_size=5, workers=2, seed=0
+    )
+    decoder = MemoizedDecoder(
+        Toric2DMatchingDecoder(code, error_model, 0.05), 16
+    )
+    batch_sim.append(Simulation(code, error_model, decoder, 0.05))
+    batch_sim.run(20)
+    assert decoder.n_zero_syndromes > 0
+    assert decoder.n_cache_misses > 0
+    assert sum(
+        decoder.statistics[key]
+        for key in ['zero_syndromes', 'cache_hits', 'cache_misses']
+    ) == 20
+
+
+def test_parallel_run_removes_temporary_code_cache(tmpdir, monkeypatch):
+    cache_dirs = []
+
+    def mkdtemp(*args, **kwargs):
+        cache_dirs.append(tempfile_mkdtemp(*args, **kwargs))
+        return cache_dirs[-1]
+
+    tempfile_mkdtemp = tempfile.mkdtemp
+    monkeypatch.setattr(tempfile, 'mkdtemp', mkdtemp)
+    set_code_cache_dir(None)
+    code = Toric2DCode(3)
+    error_model = PauliErrorModel(1/3, 1/3, 1/3)
+    batch_sim = BatchSimulation(
+        output_dir=str(tmpdir), batch_size=2, workers=2, seed=0
+    )
+    batch_sim.append(Simulation(
+        code, error_model, Toric2DMatchingDecoder(code, error_model, 0.1),
+        0.1
+    ))
+    batch_sim.run(4)
+    assert batch_sim._simulations[0].n_results == 4
+    assert get_code_cache_dir() is None
+    assert len(cache_dirs) == 1
+    assert not os.path.exists(cache_dirs[0])
+
+
+@pytest.mark.parametrize('from_input', [True, False])
+def test_serial_run_uses_batch_size(tmpdir, monkeypatch, from_input):
+    import panqec.simulation
+    chunk_sizes = []
+
+    def counting_run_batch(*args, **kwargs):
+        chunk_sizes.append(kwargs['n_shots'])
+        return run_batch(*args, **kwargs)
+
+    monkeypatch.setattr(panqec.simulation, 'run_batch', counting_run_batch)
+    if from_input:
+        batch_sim = read_input_json(
+            os.path.join(DATA_DIR, 'single_input.json'),
+            output_dir=str(tmpdir), batch_size=100
+        )
+    else:
+        code = Toric2DCode(3)
+        error_model = PauliErrorModel(1/3, 1/3, 1/3)
+        batch_sim = BatchSimulation(output_dir=str(tmpdir), batch_size=100)
+        batch_sim.append(Simulation(
+            code, error_model,
+            Toric2DMatchingDecoder(code, error_model, 0.1), 0.1
+        ))
+    assert batch_sim._simulations[0].batch_size == (
+        100 if from_input else 20
+    )
+    batch_sim.run(150)
+    assert chunk_sizes == [100, 50]
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from panqec.codes import (
+    Toric2DCode, Planar2DCode, Toric3DCode, Planar3DCode,
+    RotatedPlanar3DCode, XCubeCode, RhombicCode, RotatedToric3DCode
+)
+from panqec.codes.base._stencil import (
+    lattice_points, build_coordinate_grid, lookup_grid
+)
+from panqec.bsparse import to_array
+
+stencil_codes = [
+    (Toric2DCode, (3, 4)),
+    (Planar2DCode, (3, 4)),
+    (Toric3DCode, (2, 3, 4)),
+    (Planar3DCode, (2, 3, 4)),
+    (RotatedPlanar3DCode, (3, 4, 3)),
+    (XCubeCode, (2, 3, 4)),
+    (RhombicCode, (2, 4, 4)),
+]
+
+
+def test_lattice_points_same_order_as_product():
+    points = lattice_points(range(1, 6, 2), range(0, 4, 2), range(3))
+    expected = [
+        (x, y, z) for x in range(1, 6, 2) for y in range(0, 4, 2)
+        for z in range(3)
+    ]
+    assert [tuple(point) for point in points] == expected
+
+
+def test_lookup_grid_returns_minus_one_outside():
+    coordinates = np.array([[0, 1], [2, 3], [1, 0]])
+    grid = build_coordinate_grid(coordinates)
+    points = np.array([[2, 3], [1, 1], [-1, 0], [5, 5], [1, 0]])
+    assert np.all(lookup_grid(grid, points) == [1, -1, -1, -1, 2])
+
+
+@pytest.mark.parametrize('code_class, size', stencil_codes)
+@pytest.mark.parametrize('deformed_axis', [None, 'x', 'z'])
+def test_stencil_matrix_equals_dict_matrix(code_class, size, deformed_axis):
+    code = code_class(*size, deformed_axis=deformed_axis)
+    assert code.get_stencils() is not None
+    assert np.all(
+        to_array(code.stabilizer_matrix)
+        == to_array(code._build_stabilizer_matrix())
+    )
+
+
+@pytest.mark.parametrize('code_class, size', stencil_codes)
+def test_coordinates_are_tuples_of_ints(code_class, size):
+    code = code_class(*size)
+    for location in code.qubit_coordinates + code.stabilizer_coordinates:
+        assert isinstance(location, tuple)
+        assert all(isinstance(coordinate, int) for coordinate in location)
+
+
+def test_dict_based_codes_still_work():
+    code = RotatedToric3DCode(4, 4, 3)
+    assert code.get_stencils() is None
+    assert code.stabilizer_matrix.shape == (code.n_stabilizers, 2*code.n)
+
+
+@pytest.mark.parametrize('code_class, size', stencil_codes + [
+    (RotatedToric3DCode, (4, 4, 3))
+])
+def test_vectorized_lookups_match_dicts(code_class, size):
+    code = code_class(*size)
+
+    qubits = np.array(code.qubit_coordinates)
+    assert np.all(code.qubit_indices(qubits) == np.arange(code.n))
+    assert np.all(code.qubit_grid[tuple(qubits.T)] == np.arange(code.n))
+    assert np.sum(code.qubit_grid >= 0) == code.n
+
+    for location, index in code.stabilizer_index.items():
+        assert code.stabilizer_indices(np.array([location]))[0] == index
+
+    for index, location in enumerate(code.stabilizer_coordinates):
+        type_code = code.stabilizer_type_codes[index]
+        assert code.stabilizer_types[type_code] == (
+            code.stabilizer_type(location)
+        )
+
+
+def test_lookups_of_empty_sites():
+    code = Toric3DCode(3)
+    assert np.all(code.qubit_indices(np.array([
+        [0, 0, 0], [1, 1, 0], [-1, 0, 0], [7, 0, 0]
+    ])) == -1)
+    assert np.all(code.stabilizer_indices(np.array([[1, 0, 0]])) == -1)
+    assert np.all(code.stabilizer_indices(np.array([[0, 0, 0, 0]])) == -1)
+    assert not code.is_stabilizer((1, 0, 0))
+    assert code.is_stabilizer((0, 0, 0), 'vertex')
+    assert not code.is_stabilizer((0, 0, 0), 'face')
+
+
+def test_to_bsf_raises_on_non_qubit():
+    code = Toric3DCode(3)
+    with pytest.raises(KeyError):
+        code.to_bsf({(1, 0, 0): 'X', (1, 1, 0): 'Z'})
+
+
+def test_building_matrix_does_not_build_index_dicts():
+    code = Toric3DCode(3)
+    code.stabilizer_matrix
+    code.logicals_x
+    code.logicals_z
+    assert len(code._qubit_index) == 0
+    assert len(code._stabilizer_index) == 0
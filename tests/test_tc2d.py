@@ -44,3 +44,17 @@ class TestToric2DMatchingDecoder:
         assert np.all(bcommute(code.stabilizer_matrix, total_error) == 0), (
             'Total error should be in code space'
         )
+
+    def test_decode_batch_matches_decode(self, code):
+        error_model = PauliErrorModel(1/3, 1/3, 1/3)
+        error_rate = 0.1
+        decoder = Toric2DMatchingDecoder(code, error_model, error_rate)
+        errors = error_model.generate_batch(
+            code, error_rate=error_rate, n_shots=10,
+            rng=np.random.default_rng(0)
+        )
+        syndromes = code.measure_syndrome(errors)
+        corrections = decoder.decode_batch(syndromes)
+        assert corrections.shape == (10, 2*code.n)
+        for syndrome, correction in zip(syndromes, corrections):
+            assert np.all(correction == decoder.decode(syndrome))
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from panqec.codes import Toric2DCode, Toric3DCode, Planar2DCode, XCubeCode
+from panqec.config import DECODERS
+from panqec.error_models import PauliErrorModel
+from panqec.decoders import UnionFindDecoder
+from panqec.decoders.union_find._union_find_decoder import (
+    UnionFindSector, growth_lengths
+)
+
+
+def test_growth_lengths():
+    lengths = growth_lengths(np.array([0.1, 0.1**2, 0, 0.5, 0.9]), 16)
+    assert lengths.tolist() == [1, 2, 16, 1, 1]
+
+
+def test_growth_lengths_no_positive_weight():
+    assert growth_lengths(np.array([0.5, 0.7]), 16).tolist() == [1, 1]
+
+
+class TestUnionFindSector:
+
+    @pytest.fixture
+    def repetition_code(self):
+        # Repetition code on 5 bits, whose end bits touch the boundary.
+        check_matrix = np.zeros((4, 5), dtype=np.uint8)
+        for i in range(4):
+            check_matrix[i, i] = check_matrix[i, i + 1] = 1
+        return check_matrix
+
+    def test_peel_repetition_code(self, repetition_code):
+        sector = UnionFindSector(repetition_code, np.ones(5, dtype=int))
+        assert sector.is_graph
+        for error in np.eye(5, dtype=np.uint8):
+            syndrome = repetition_code.dot(error) % 2
+            correction = sector.decode(syndrome)
+            assert np.all(repetition_code.dot(correction) % 2 == syndrome)
+            assert correction.sum() == 1
+
+    def test_weighted_growth_avoids_unlikely_qubits(self, repetition_code):
+        syndrome = np.array([0, 1, 0, 1], dtype=np.uint8)
+        sector = UnionFindSector(repetition_code, np.ones(5, dtype=int))
+        assert sector.decode(syndrome).tolist() == [0, 0, 1, 1, 0]
+
+        # The defects are matched to the boundary through the likely bits.
+        sector = UnionFindSector(repetition_code, np.array([1, 1, 4, 4, 1]))
+        assert sector.decode(syndrome).tolist() == [1, 1, 0, 0, 1]
+
+
+class TestUnionFindDecoder:
+
+    def test_registered_in_config(self):
+        assert DECODERS['UnionFindDecoder'] is UnionFindDecoder
+
+    def test_non_css_code_raises_value_error(self):
+        code = Toric2DCode(3, deformed_axis='x')
+        with pytest.raises(ValueError):
+            UnionFindDecoder(code, PauliErrorModel(1/3, 1/3, 1/3), 0.1)
+
+    def test_decode_trivial_syndrome(self):
+        code = Toric2DCode(4)
+        decoder = UnionFindDecoder(code, PauliErrorModel(1/3, 1/3, 1/3), 0.1)
+        correction = decoder.decode(np.zeros(code.n_stabilizers, dtype=int))
+        assert correction.shape == (2*code.n,)
+        assert np.all(correction == 0)
+
+    @pytest.mark.parametrize('code', [
+        Toric2DCode(4), Planar2DCode(3), Toric3DCode(3)
+    ])
+    @pytest.mark.parametrize('pauli', ['X', 'Y', 'Z'])
+    def test_decode_single_qubit_errors(self, code, pauli):
+        decoder = UnionFindDecoder(code, PauliErrorModel(1/3, 1/3, 1/3), 0.1)
+        for location in code.qubit_coordinates:
+            error = code.to_bsf({location: pauli})
+            correction = decoder.decode(code.measure_syndrome(error))
+            total_error = (error + correction) % 2
+            assert code.in_codespace(total_error)
+            assert not code.is_logical_error(total_error)
+
+    @pytest.mark.parametrize('code', [Toric3DCode(4), XCubeCode(3)])
+    def test_corrections_in_codespace(self, code):
+        error_model = PauliErrorModel(1/3, 1/3, 1/3)
+        decoder = UnionFindDecoder(code, error_model, 0.05)
+        errors = error_model.generate_batch(
+            code, 0.05, n_shots=10, rng=np.random.default_rng(0)
+        )
+        corrections = decoder.decode_batch(code.measure_syndrome(errors))
+        total_errors = (errors + corrections) % 2
+        assert not np.any(code.measure_syndrome(total_errors))